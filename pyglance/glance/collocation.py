@@ -8,7 +8,7 @@ Created by evas Apr 2010.
 Copyright (c) 2010 University of Wisconsin SSEC. All rights reserved.
 """
 
-import logging
+import os, logging, hashlib
 import numpy as np
 
 import glance.delta as delta
@@ -16,6 +16,400 @@ import glance.delta as delta
 
 LOG = logging.getLogger(__name__)
 
+# the smallest size (in degrees) of the longitude/latitude cells used to find nearby points,
+# the cells are normally sized to match the longitude/latitude epsilon, but very small
+# epsilons would make an unreasonable number of cells
+MINIMUM_CELL_SIZE = 0.0001
+
+# the maximum number of candidate point pairs that will be examined at one time,
+# this bounds the size of the temporary arrays used when searching for matches
+MAX_CANDIDATE_PAIRS_PER_PASS = 5000000
+
+# saved colocation matchings are stored in files named with this prefix and the md5 of their inputs;
+# the version should be changed whenever the matching algorithm changes the pairs it produces
+COLOCATION_CACHE_FILE_PREFIX = 'colocation-cache-'
+COLOCATION_CACHE_VERSION     = 'index-pairs-1'
+
+def _wrapped_longitude_difference (longitudeA, longitudeB) :
+    """
+    get the absolute difference between two sets of longitudes in degrees,
+    taking into account that longitude wraps around at the antimeridian
+    """
+
+    return np.abs(np.mod((longitudeB - longitudeA) + 180.0, 360.0) - 180.0)
+
+def _expand_runs (runStarts, runLengths) :
+    """
+    given the start and length of a run of positions for each of a set of owners,
+    expand the runs into two arrays listing each (owner, position) pair explicitly
+    """
+
+    ownerPositions = np.repeat(np.arange(runStarts.size), runLengths)
+    runPositions   = np.repeat(runStarts - (np.cumsum(runLengths) - runLengths), runLengths) + np.arange(runLengths.sum())
+
+    return ownerPositions, runPositions
+
+def _find_candidate_runs (aKeys, bSortedKeys, keyOffsetsFunction, numOffsets) :
+    """
+    for each a key, find the runs of sorted b keys that match each of the neighboring keys
+    produced by keyOffsetsFunction(aKeys, offsetNumber)
+    """
+
+    runStarts  = np.zeros((numOffsets, aKeys.size), dtype=np.int64)
+    runLengths = np.zeros((numOffsets, aKeys.size), dtype=np.int64)
+    for offsetNum in range(numOffsets) :
+        neighborKeys          = keyOffsetsFunction(aKeys, offsetNum)
+        runStarts [offsetNum] = np.searchsorted(bSortedKeys, neighborKeys, side='left')
+        runLengths[offsetNum] = np.searchsorted(bSortedKeys, neighborKeys, side='right') - runStarts[offsetNum]
+
+    return runStarts, runLengths
+
+def _match_candidate_runs (aIndexes, bSortedIndexes, runStarts, runLengths, isMatchFunction) :
+    """
+    expand the candidate runs found by _find_candidate_runs into pairs of flat indexes
+    and keep the pairs for which isMatchFunction(aCandidates, bCandidates) is True
+
+    the a points are processed in passes so that no more than MAX_CANDIDATE_PAIRS_PER_PASS
+    pairs are examined at once
+    """
+
+    candidatesBefore = np.concatenate(([0], np.cumsum(runLengths.sum(axis=0))))
+
+    aMatchList = [ ]
+    bMatchList = [ ]
+    passStart  = 0
+    while passStart < aIndexes.size :
+        passEnd = np.searchsorted(candidatesBefore, candidatesBefore[passStart] + MAX_CANDIDATE_PAIRS_PER_PASS, side='right') - 1
+        passEnd = min(max(passEnd, passStart + 1), aIndexes.size)
+
+        for offsetNum in range(runStarts.shape[0]) :
+
+            lengths = runLengths[offsetNum, passStart:passEnd]
+            if lengths.sum() <= 0 :
+                continue
+
+            aPositions, bPositions = _expand_runs(runStarts[offsetNum, passStart:passEnd], lengths)
+            aCandidates = aIndexes[aPositions + passStart]
+            bCandidates = bSortedIndexes[bPositions]
+
+            isMatch = isMatchFunction(aCandidates, bCandidates)
+            aMatchList.append(aCandidates[isMatch])
+            bMatchList.append(bCandidates[isMatch])
+
+        passStart = passEnd
+
+    return aMatchList, bMatchList
+
+def create_colocation_index_pairs_within_epsilon((alongitude, alatitude),
+                                                 (blongitude, blatitude),
+                                                 lonlatEpsilon,
+                                                 cellSize=None) :
+    """
+    match points together based on their longitude and latitude values
+    to match points must be within lonlatEpsilon degrees in both longitude and latitude
+
+    this is a vectorized version of create_colocation_mapping_within_epsilon; rather than
+    building dictionaries of points, the points in each set are hashed into cells and the
+    matches are found by searching the sorted B cells for each A point's cell and its 8 neighbors
+
+    the cells are lonlatEpsilon degrees on a side (or cellSize, if a larger size is passed in),
+    so the number of candidates examined for each point stays small regardless of the epsilon;
+    the longitude cells wrap around at the antimeridian, so points on either side of 180/-180
+    degrees can be matched to each other
+
+    since the longitude of a point becomes meaningless as it approaches a pole, two points
+    that both fall within lonlatEpsilon of the same pole will be matched if their latitudes
+    are within lonlatEpsilon, no matter what their longitudes are
+
+    the return will be in the form of two numpy arrays of equal length, the first holding
+    flat indexes into the A data and the second holding flat indexes into the B data, so
+    that aMatchIndexes[n] and bMatchIndexes[n] describe the n-th matched pair; the pairs
+    are sorted by A index and then by B index
+
+    Note: as with create_colocation_mapping_within_epsilon, all pairs of points that match
+    will be returned, so an individual a or b point may be repeated. Points with non-finite
+    longitude or latitude can never match and are ignored. Spatially invalid points are not
+    excluded here, they are filtered out when the data itself is colocated.
+    """
+    assert(alongitude.shape == alatitude.shape)
+    assert(blongitude.shape == blatitude.shape)
+    assert(lonlatEpsilon >= 0.0)
+
+    LOG.debug("Preparing to colocate longitude and latitude points (acceptable epsilon: " + str(lonlatEpsilon) + " degrees)")
+    LOG.debug("size of A: " + str(alongitude.shape))
+    LOG.debug("size of B: " + str(blongitude.shape))
+
+    # make flat versions of our longitude and latitude
+    # so that our index correlations will be simple
+    flatALatitude  =  alatitude.ravel()
+    flatALongitude = alongitude.ravel()
+    flatBLatitude  =  blatitude.ravel()
+    flatBLongitude = blongitude.ravel()
+
+    # only points with finite positions can ever be matched
+    aIndexes = np.flatnonzero(np.isfinite(flatALatitude) & np.isfinite(flatALongitude))
+    bIndexes = np.flatnonzero(np.isfinite(flatBLatitude) & np.isfinite(flatBLongitude))
+
+    if (aIndexes.size <= 0) or (bIndexes.size <= 0) :
+        LOG.debug('Found 0 matched pairs.')
+        return np.array([ ], dtype=np.int64), np.array([ ], dtype=np.int64)
+
+    # the cells must be at least epsilon wide or some matching points will not be found;
+    # the longitude cells are stretched a little so that a whole number of them fits around the globe
+    cellSize         = max(lonlatEpsilon, cellSize if cellSize is not None else 0.0, MINIMUM_CELL_SIZE)
+    numLonCells      = int(np.floor(360.0 / cellSize))
+    lonCellOffsets   = (-1, 0, 1) if numLonCells >= 3 else (0, )
+    if numLonCells < 3 :
+        numLonCells  = 1
+    lonCellSize      = 360.0 / numLonCells
+    LOG.debug("Using longitude/latitude cells of " + str(lonCellSize) + " by " + str(cellSize) + " degrees")
+
+    # the points within epsilon of the poles are matched separately
+    polarLatitude = 90.0 - lonlatEpsilon
+    aIsPolar = np.abs(flatALatitude) >= polarLatitude
+    bIsPolar = np.abs(flatBLatitude) >= polarLatitude
+    def _is_same_polar_cap (aCandidates, bCandidates) :
+        return ( aIsPolar[aCandidates] & bIsPolar[bCandidates] &
+                 (np.sign(flatALatitude[aCandidates]) == np.sign(flatBLatitude[bCandidates])) )
+
+    # figure out which cell each point falls into
+    def _get_cell_keys (indexes, flatLongitude, flatLatitude) :
+        latCells = np.floor(flatLatitude[indexes] / cellSize).astype(np.int64)
+        lonCells = np.floor(np.mod(flatLongitude[indexes], 360.0) / lonCellSize).astype(np.int64)
+        lonCells = np.clip(lonCells, 0, numLonCells - 1) # guard against rounding at 360.0
+        return latCells, lonCells
+    aLatCells, aLonCells = _get_cell_keys(aIndexes, flatALongitude, flatALatitude)
+    bLatCells, bLonCells = _get_cell_keys(bIndexes, flatBLongitude, flatBLatitude)
+    minLatCell = min(aLatCells.min(), bLatCells.min())
+    aKeys = ((aLatCells - minLatCell) * numLonCells) + aLonCells
+    bKeys = ((bLatCells - minLatCell) * numLonCells) + bLonCells
+    del bLatCells, bLonCells
+
+    # sort the A points by cell so the searches below walk through the B cells in order
+    aOrder    = np.argsort(aKeys, kind='mergesort')
+    aKeys     = aKeys[aOrder]
+    aLonCells = aLonCells[aOrder]
+    aIndexes  = aIndexes[aOrder]
+    del aOrder
+
+    # sort the B points by cell (a stable sort keeps the B indexes in order within each cell)
+    bOrder         = np.argsort(bKeys, kind='mergesort')
+    bSortedKeys    = bKeys[bOrder]
+    bSortedIndexes = bIndexes[bOrder]
+    del bKeys, bOrder
+
+    # for each A point, find the run of sorted B points in each of the nearby cells,
+    # wrapping the longitude cells around the antimeridian
+    cellOffsets = [(latOffset, lonOffset) for latOffset in (-1, 0, 1) for lonOffset in lonCellOffsets]
+    def _get_neighbor_keys (keys, offsetNum) :
+        latOffset, lonOffset = cellOffsets[offsetNum]
+        return keys + (latOffset * numLonCells) + (np.mod(aLonCells + lonOffset, numLonCells) - aLonCells)
+    runStarts, runLengths = _find_candidate_runs(aKeys, bSortedKeys, _get_neighbor_keys, len(cellOffsets))
+    del aKeys, aLatCells
+
+    # if the difference is is less than or equal to epsilon, this is an acceptable match;
+    # pairs of points in the same polar cap are left for the polar matching below
+    def _is_match (aCandidates, bCandidates) :
+        return ( (np.abs(flatBLatitude[bCandidates] - flatALatitude[aCandidates]) <= lonlatEpsilon) &
+                 (_wrapped_longitude_difference(flatALongitude[aCandidates], flatBLongitude[bCandidates]) <= lonlatEpsilon) &
+                 ~_is_same_polar_cap(aCandidates, bCandidates) )
+    aMatchList, bMatchList = _match_candidate_runs(aIndexes, bSortedIndexes, runStarts, runLengths, _is_match)
+    del runStarts, runLengths, bSortedKeys, bSortedIndexes
+
+    # match up the polar points using only their latitudes
+    aPolarIndexes = aIndexes[aIsPolar[aIndexes]]
+    bPolarIndexes = bIndexes[bIsPolar[bIndexes]]
+    if (aPolarIndexes.size > 0) and (bPolarIndexes.size > 0) :
+        LOG.debug("Matching " + str(aPolarIndexes.size) + " A points and " + str(bPolarIndexes.size) + " B points near the poles")
+
+        bPolarOrder          = np.argsort(flatBLatitude[bPolarIndexes], kind='mergesort')
+        bPolarSortedLatitude = flatBLatitude[bPolarIndexes][bPolarOrder]
+        bPolarSortedIndexes  = bPolarIndexes[bPolarOrder]
+
+        aPolarLatitude   = flatALatitude[aPolarIndexes]
+        polarRunStarts   = np.searchsorted(bPolarSortedLatitude, aPolarLatitude - lonlatEpsilon, side='left')
+        polarRunLengths  = np.searchsorted(bPolarSortedLatitude, aPolarLatitude + lonlatEpsilon, side='right') - polarRunStarts
+
+        def _is_polar_match (aCandidates, bCandidates) :
+            return ( (np.abs(flatBLatitude[bCandidates] - flatALatitude[aCandidates]) <= lonlatEpsilon) &
+                     _is_same_polar_cap(aCandidates, bCandidates) )
+        aPolarMatches, bPolarMatches = _match_candidate_runs(aPolarIndexes, bPolarSortedIndexes,
+                                                             polarRunStarts.reshape(1, -1), polarRunLengths.reshape(1, -1),
+                                                             _is_polar_match)
+        aMatchList.extend(aPolarMatches)
+        bMatchList.extend(bPolarMatches)
+
+    aMatchIndexes = np.concatenate(aMatchList) if len(aMatchList) > 0 else np.array([ ], dtype=np.int64)
+    bMatchIndexes = np.concatenate(bMatchList) if len(bMatchList) > 0 else np.array([ ], dtype=np.int64)
+
+    # put the pairs in A index order, then B index order
+    pairOrder     = np.lexsort((bMatchIndexes, aMatchIndexes))
+    aMatchIndexes = aMatchIndexes[pairOrder]
+    bMatchIndexes = bMatchIndexes[pairOrder]
+
+    LOG.debug('Found ' + str(aMatchIndexes.size) + ' matched pairs.')
+
+    return aMatchIndexes, bMatchIndexes
+
+def _get_colocation_cache_key ((alongitude, alatitude), (blongitude, blatitude), lonlatEpsilon) :
+    """
+    build an md5 hex digest that identifies a colocation problem from the longitude
+    and latitude contents and the longitude/latitude epsilon
+
+    these are the only inputs the matching uses (any lon/lat filters have already been
+    applied to the longitude and latitude), so nothing else goes into the key
+    """
+
+    keyHash = hashlib.md5()
+    keyHash.update(COLOCATION_CACHE_VERSION)
+    keyHash.update(repr(float(lonlatEpsilon)))
+    for array in (alongitude, alatitude, blongitude, blatitude) :
+        contiguousArray = np.ascontiguousarray(array)
+        keyHash.update(str(contiguousArray.dtype) + str(contiguousArray.shape))
+        keyHash.update(contiguousArray.view(np.uint8).ravel())
+
+    return keyHash.hexdigest()
+
+def create_colocation_index_pairs_with_cache ((alongitude, alatitude),
+                                              (blongitude, blatitude),
+                                              lonlatEpsilon,
+                                              cacheDirectory) :
+    """
+    get the matched index pairs from create_colocation_index_pairs_within_epsilon,
+    reusing a previously saved matching from the cacheDirectory if the same longitude,
+    latitude, and epsilon were colocated before
+
+    the cache files are named colocation-cache-<md5 of the inputs>.npz; if the cacheDirectory
+    is None the cache will not be used
+    """
+
+    if cacheDirectory is None :
+        return create_colocation_index_pairs_within_epsilon((alongitude, alatitude), (blongitude, blatitude), lonlatEpsilon)
+
+    cacheKey  = _get_colocation_cache_key((alongitude, alatitude), (blongitude, blatitude), lonlatEpsilon)
+    cachePath = os.path.join(cacheDirectory, COLOCATION_CACHE_FILE_PREFIX + cacheKey + '.npz')
+
+    # if we've seen these longitudes and latitudes before, use the saved matching
+    if os.path.exists(cachePath) :
+        try :
+            cacheFile = np.load(cachePath)
+            aMatchIndexes, bMatchIndexes = cacheFile['aMatchIndexes'], cacheFile['bMatchIndexes']
+            cacheFile.close()
+            LOG.info("Using cached colocation information from: " + cachePath)
+            return aMatchIndexes, bMatchIndexes
+        except (IOError, KeyError, ValueError), err :
+            LOG.warn("Unable to load cached colocation information from " + cachePath + " (" + str(err) + "), it will be recalculated.")
+
+    aMatchIndexes, bMatchIndexes = create_colocation_index_pairs_within_epsilon((alongitude, alatitude),
+                                                                                (blongitude, blatitude),
+                                                                                lonlatEpsilon)
+
+    # save the matching for next time, writing to a temporary file first
+    # so that an interrupted run won't leave a partial cache file behind
+    tempPath = os.path.join(cacheDirectory, COLOCATION_CACHE_FILE_PREFIX + cacheKey + '.' + str(os.getpid()) + '.tmp.npz')
+    try :
+        np.savez(tempPath, aMatchIndexes=aMatchIndexes, bMatchIndexes=bMatchIndexes)
+        os.rename(tempPath, cachePath)
+        LOG.debug("Saved colocation information to: " + cachePath)
+    except (IOError, OSError), err :
+        LOG.warn("Unable to save colocation information to " + cachePath + " (" + str(err) + ")")
+        if os.path.exists(tempPath) :
+            os.remove(tempPath)
+
+    return aMatchIndexes, bMatchIndexes
+
+def _count_matches_per_point (matchIndexes, numberOfPoints) :
+    """
+    count how many times each point was matched and
+    the total matches for points that were matched more than once
+    """
+
+    matchCounts     = np.bincount(matchIndexes, minlength=numberOfPoints) if matchIndexes.size > 0 else np.zeros(numberOfPoints, dtype=np.int64)
+    multipleMatches = np.sum(matchCounts[matchCounts > 1])
+
+    return matchCounts, multipleMatches
+
+def create_colocated_lonlat_with_index_pairs(aMatchIndexes, bMatchIndexes,
+                                             aLongitude, aLatitude,
+                                             bLongitude, bLatitude) :
+    """
+    given the matched index pairs from create_colocation_index_pairs_within_epsilon,
+    match up the longitude and latitude and return the colocated sets
+
+    the return is in the same form as create_colocated_lonlat_with_lon_lat_colocation
+    """
+
+    flatALongitude = aLongitude.ravel()
+    flatALatitude  =  aLatitude.ravel()
+    flatBLongitude = bLongitude.ravel()
+    flatBLatitude  =  bLatitude.ravel()
+
+    # our final data sets
+    matchedLongitude = ((flatALongitude[aMatchIndexes] + flatBLongitude[bMatchIndexes]) / 2).astype(aLongitude.dtype)
+    matchedLatitude  = ((flatALatitude [aMatchIndexes] + flatBLatitude [bMatchIndexes]) / 2).astype(aLatitude.dtype)
+
+    # some general statistics
+    aMatchCounts, multipleMatchesInA = _count_matches_per_point(aMatchIndexes, flatALongitude.size)
+    bMatchCounts, multipleMatchesInB = _count_matches_per_point(bMatchIndexes, flatBLongitude.size)
+
+    # the points that didn't match anything
+    unmatchedA = aMatchCounts <= 0
+    unmatchedB = bMatchCounts <= 0
+
+    LOG.debug("Total matched pairs of longitude/latitide: " + str(aMatchIndexes.size))
+
+    return (matchedLongitude, matchedLatitude, (multipleMatchesInA, multipleMatchesInB)), \
+           (flatALongitude[unmatchedA], flatALatitude[unmatchedA]), \
+           (flatBLongitude[unmatchedB], flatBLatitude[unmatchedB])
+
+def create_colocated_data_with_index_pairs(aMatchIndexes, bMatchIndexes,
+                                           aLongitude, aLatitude,
+                                           bLongitude, bLatitude,
+                                           aData, bData,
+                                           missingData, altMissingDataInB=None,
+                                           invalidAMask=None, invalidBMask=None) :
+    """
+    given the matched index pairs from create_colocation_index_pairs_within_epsilon,
+    match up the valid data in two data sets and return the list of valid data, padded with missing
+    values so that it will match the colocated longitude and latitude
+
+    the return is in the same form as create_colocated_data_with_lon_lat_colocation
+    """
+
+    assert(missingData is not None)
+
+    if altMissingDataInB is None :
+        altMissingDataInB = missingData
+
+    flatAData = aData.ravel()
+    flatBData = bData.ravel()
+    flatInvalidA = invalidAMask.ravel() if invalidAMask is not None else np.zeros(flatAData.shape, dtype=bool)
+    flatInvalidB = invalidBMask.ravel() if invalidBMask is not None else np.zeros(flatBData.shape, dtype=bool)
+
+    # if either of our data points is invalid, then the data doesn't match
+    validPairs   = ~(flatInvalidA[aMatchIndexes] | flatInvalidB[bMatchIndexes])
+    aValidIndexes = aMatchIndexes[validPairs]
+    bValidIndexes = bMatchIndexes[validPairs]
+
+    # our final data sets, with missing data wherever the pair wasn't valid
+    matchedAPoints = np.ones(aMatchIndexes.shape, dtype=aData.dtype) * missingData
+    matchedBPoints = np.ones(bMatchIndexes.shape, dtype=bData.dtype) * altMissingDataInB
+    matchedAPoints[validPairs] = flatAData[aValidIndexes]
+    matchedBPoints[validPairs] = flatBData[bValidIndexes]
+
+    # some general statistics
+    aMatchCounts, multipleMatchesInA = _count_matches_per_point(aValidIndexes, flatAData.size)
+    bMatchCounts, multipleMatchesInB = _count_matches_per_point(bValidIndexes, flatBData.size)
+
+    # the valid points that didn't match anything
+    unmatchedA = (aMatchCounts <= 0) & ~flatInvalidA
+    unmatchedB = (bMatchCounts <= 0) & ~flatInvalidB
+
+    LOG.debug("Total matched data point pairs found: " + str(aValidIndexes.size))
+
+    return (matchedAPoints, matchedBPoints, (multipleMatchesInA, multipleMatchesInB)), \
+           (flatAData[unmatchedA], aLongitude.ravel()[unmatchedA], aLatitude.ravel()[unmatchedA]), \
+           (flatBData[unmatchedB], bLongitude.ravel()[unmatchedB], bLatitude.ravel()[unmatchedB])
 
 def create_colocation_mapping_within_epsilon((alongitude, alatitude),
                                              (blongitude, blatitude),
@@ -39,7 +433,9 @@ def create_colocation_mapping_within_epsilon((alongitude, alatitude),
     
     Warning: This algorithm will fail to find all matching points if the lonlatEpsilon is set to a
     value greater than or equal to 1.0 degrees. This is related to the bin size used for searching
-    thoretically the bin size could be corrected to scale with the lonlatEpsilon in the future. TODO
+    thoretically the bin size could be corrected to scale with the lonlatEpsilon in the future.
+    It also does not match points across the antimeridian. Both of these problems are handled
+    by create_colocation_index_pairs_within_epsilon, this version is kept for comparison purposes.
     """
     assert(alongitude.shape == alatitude.shape)
     assert(blongitude.shape == blatitude.shape)
@@ -11,9 +11,11 @@ Copyright (c) 2009 University of Wisconsin SSEC. All rights reserved.
 
 #from pprint import pprint, pformat
 
-import os, sys, logging, re, datetime
+import os, sys, logging, re, datetime, multiprocessing, hashlib, inspect
 from numpy import *
 from urllib import quote
+from StringIO import StringIO
+from itertools import izip
 
 import matplotlib
 # this is a hack to keep glance from needing pyqt unless you run the gui
@@ -35,9 +37,10 @@ import glance.plot   as plot
 import glance.plotcreatefns as plotcreate
 import glance.collocation   as collocation
 import glance.config_organizer as config_organizer
+from glance.manifest    import ReportManifest
 
 from glance.util        import clean_path, rsync_or_copy_files, get_glance_version_string, get_run_identification_info, setup_dir_if_needed
-from glance.load        import get_UV_info_from_magnitude_direction_info, load_variable_data, open_and_process_files, handle_lon_lat_info, handle_lon_lat_info_for_one_file, ValueErrorStringToFloat
+from glance.load        import get_UV_info_from_magnitude_direction_info, load_variable_data, load_packed_variable_data, load_variable_chunks, VariablePrefetcher, load_variable_region, get_chunk_regions, open_and_process_files, handle_lon_lat_info, handle_lon_lat_info_for_one_file, log_and_clear_decoded_variable_cache, ValueErrorStringToFloat
 from glance.lonlat_util import VariableComparisonError
 from glance.constants   import *
 from glance.gui_constants import A_CONST, B_CONST
@@ -103,13 +106,13 @@ def colocateToFile_library_call(a_path, b_path, var_list=[ ],
     
     # open the files
     LOG.info("Processing File A:")
-    aFile = dataobj.FileInfo(pathsTemp[A_FILE_KEY], allowWrite=True)
-    if aFile is None:
+    aFile = dataobj.get_shared_file_info(pathsTemp[A_FILE_KEY], allowWrite=True, fastFingerprint=runInfo[USE_FAST_FINGERPRINT_KEY])
+    if aFile.file_object is None:
         LOG.warn("Unable to continue with comparison because file a (" + pathsTemp[A_FILE_KEY] + ") could not be opened.")
         sys.exit(1)
     LOG.info("Processing File B:")
-    bFile = dataobj.FileInfo(pathsTemp[B_FILE_KEY], allowWrite=True)
-    if bFile is None:
+    bFile = dataobj.get_shared_file_info(pathsTemp[B_FILE_KEY], allowWrite=True, fastFingerprint=runInfo[USE_FAST_FINGERPRINT_KEY])
+    if bFile.file_object is None:
         LOG.warn("Unable to continue with comparison because file b (" + pathsTemp[B_FILE_KEY] + ") could not be opened.")
         sys.exit(1)
     
@@ -138,19 +141,33 @@ def colocateToFile_library_call(a_path, b_path, var_list=[ ],
     
     # handle the longitude and latitude colocation
     LOG.info("Colocating raw longitude and latitude information")
-    aColocationInfomation, bColocationInformation, totalNumberOfMatchedPoints = \
-                    collocation.create_colocation_mapping_within_epsilon((lon_lat_data[A_FILE_KEY][LON_KEY], lon_lat_data[A_FILE_KEY][LAT_KEY]),
-                                                                         (lon_lat_data[B_FILE_KEY][LON_KEY], lon_lat_data[B_FILE_KEY][LAT_KEY]),
-                                                                         runInfo[LON_LAT_EPSILON_KEY],
-                                                                         invalidAMask=lon_lat_data[A_FILE_KEY][INVALID_MASK_KEY],
-                                                                         invalidBMask=lon_lat_data[B_FILE_KEY][INVALID_MASK_KEY])
-    (colocatedLongitude, colocatedLatitude, (numMultipleMatchesInA, numMultipleMatchesInB)), \
-    (unmatchedALongitude, unmatchedALatitude), \
-    (unmatchedBLongitude, unmatchedBLatitude) = \
-                collocation.create_colocated_lonlat_with_lon_lat_colocation(aColocationInfomation, bColocationInformation,
-                                                                            totalNumberOfMatchedPoints,
-                                                                            lon_lat_data[A_FILE_KEY][LON_KEY], lon_lat_data[A_FILE_KEY][LAT_KEY],
-                                                                            lon_lat_data[B_FILE_KEY][LON_KEY], lon_lat_data[B_FILE_KEY][LAT_KEY])
+    if runInfo[USE_LEGACY_COLOCATION_KEY] :
+        LOG.debug("Using the legacy point by point colocation algorithm")
+        aColocationInfomation, bColocationInformation, totalNumberOfMatchedPoints = \
+                        collocation.create_colocation_mapping_within_epsilon((lon_lat_data[A_FILE_KEY][LON_KEY], lon_lat_data[A_FILE_KEY][LAT_KEY]),
+                                                                             (lon_lat_data[B_FILE_KEY][LON_KEY], lon_lat_data[B_FILE_KEY][LAT_KEY]),
+                                                                             runInfo[LON_LAT_EPSILON_KEY],
+                                                                             invalidAMask=lon_lat_data[A_FILE_KEY][INVALID_MASK_KEY],
+                                                                             invalidBMask=lon_lat_data[B_FILE_KEY][INVALID_MASK_KEY])
+        (colocatedLongitude, colocatedLatitude, (numMultipleMatchesInA, numMultipleMatchesInB)), \
+        (unmatchedALongitude, unmatchedALatitude), \
+        (unmatchedBLongitude, unmatchedBLatitude) = \
+                    collocation.create_colocated_lonlat_with_lon_lat_colocation(aColocationInfomation, bColocationInformation,
+                                                                                totalNumberOfMatchedPoints,
+                                                                                lon_lat_data[A_FILE_KEY][LON_KEY], lon_lat_data[A_FILE_KEY][LAT_KEY],
+                                                                                lon_lat_data[B_FILE_KEY][LON_KEY], lon_lat_data[B_FILE_KEY][LAT_KEY])
+    else :
+        aMatchIndexes, bMatchIndexes = \
+                        collocation.create_colocation_index_pairs_with_cache((lon_lat_data[A_FILE_KEY][LON_KEY], lon_lat_data[A_FILE_KEY][LAT_KEY]),
+                                                                             (lon_lat_data[B_FILE_KEY][LON_KEY], lon_lat_data[B_FILE_KEY][LAT_KEY]),
+                                                                             runInfo[LON_LAT_EPSILON_KEY],
+                                                                             pathsTemp[OUT_FILE_KEY] if runInfo[USE_COLOCATION_CACHE_KEY] else None)
+        (colocatedLongitude, colocatedLatitude, (numMultipleMatchesInA, numMultipleMatchesInB)), \
+        (unmatchedALongitude, unmatchedALatitude), \
+        (unmatchedBLongitude, unmatchedBLatitude) = \
+                    collocation.create_colocated_lonlat_with_index_pairs(aMatchIndexes, bMatchIndexes,
+                                                                         lon_lat_data[A_FILE_KEY][LON_KEY], lon_lat_data[A_FILE_KEY][LAT_KEY],
+                                                                         lon_lat_data[B_FILE_KEY][LON_KEY], lon_lat_data[B_FILE_KEY][LAT_KEY])
     
     # TODO, based on unmatched, issue warnings and record info in the file?
     LOG.debug("colocated shape of the longitude: " + str(colocatedLongitude.shape))
@@ -178,13 +195,13 @@ def colocateToFile_library_call(a_path, b_path, var_list=[ ],
                                    dataFilter = varRunInfo[FILTER_FUNCTION_A_KEY] if FILTER_FUNCTION_A_KEY in varRunInfo else None,
                                    variableToFilterOn = varRunInfo[VAR_FILTER_NAME_A_KEY] if VAR_FILTER_NAME_A_KEY in varRunInfo else None,
                                    variableBasedFilter = varRunInfo[VAR_FILTER_FUNCTION_A_KEY] if VAR_FILTER_FUNCTION_A_KEY in varRunInfo else None,
-                                   altVariableFileObject = dataobj.FileInfo(varRunInfo[VAR_FILTER_ALT_FILE_A_KEY]).file_object if VAR_FILTER_ALT_FILE_A_KEY in varRunInfo else None,
+                                   altVariableFileObject = dataobj.get_shared_file_info(varRunInfo[VAR_FILTER_ALT_FILE_A_KEY]).file_object if VAR_FILTER_ALT_FILE_A_KEY in varRunInfo else None,
                                    fileDescriptionForDisplay = "file A")
         bData = load_variable_data(bFile.file_object, b_variable_technical_name,
                                    dataFilter = varRunInfo[FILTER_FUNCTION_B_KEY] if FILTER_FUNCTION_B_KEY in varRunInfo else None,
                                    variableToFilterOn = varRunInfo[VAR_FILTER_NAME_B_KEY] if VAR_FILTER_NAME_B_KEY in varRunInfo else None,
                                    variableBasedFilter = varRunInfo[VAR_FILTER_FUNCTION_B_KEY] if VAR_FILTER_FUNCTION_B_KEY in varRunInfo else None,
-                                   altVariableFileObject = dataobj.FileInfo(varRunInfo[VAR_FILTER_ALT_FILE_B_KEY]).file_object if VAR_FILTER_ALT_FILE_B_KEY in varRunInfo else None,
+                                   altVariableFileObject = dataobj.get_shared_file_info(varRunInfo[VAR_FILTER_ALT_FILE_B_KEY]).file_object if VAR_FILTER_ALT_FILE_B_KEY in varRunInfo else None,
                                    fileDescriptionForDisplay = "file B")
         
         # colocate the data for this variable if we have longitude/latitude data
@@ -195,16 +212,29 @@ def colocateToFile_library_call(a_path, b_path, var_list=[ ],
             invalidB = lon_lat_data[B_FILE_KEY][INVALID_MASK_KEY] | (bData == varRunInfo[FILL_VALUE_ALT_IN_B_KEY])
             
             # match up our points in A and B
-            (aData, bData, (numberOfMultipleMatchesInA, numberOfMultipleMatchesInB)), \
-            (aUnmatchedData,             unmatchedALongitude, unmatchedALatitude), \
-            (bUnmatchedData,             unmatchedBLongitude, unmatchedBLatitude) = \
-                    collocation.create_colocated_data_with_lon_lat_colocation(aColocationInfomation, bColocationInformation,
-                                                                              colocatedLongitude, colocatedLatitude,
-                                                                              aData, bData,
-                                                                              missingData=varRunInfo[FILL_VALUE_KEY],
-                                                                              altMissingDataInB=varRunInfo[FILL_VALUE_ALT_IN_B_KEY],
-                                                                              invalidAMask=invalidA,
-                                                                              invalidBMask=invalidB)
+            if runInfo[USE_LEGACY_COLOCATION_KEY] :
+                (aData, bData, (numberOfMultipleMatchesInA, numberOfMultipleMatchesInB)), \
+                (aUnmatchedData,             unmatchedALongitude, unmatchedALatitude), \
+                (bUnmatchedData,             unmatchedBLongitude, unmatchedBLatitude) = \
+                        collocation.create_colocated_data_with_lon_lat_colocation(aColocationInfomation, bColocationInformation,
+                                                                                  colocatedLongitude, colocatedLatitude,
+                                                                                  aData, bData,
+                                                                                  missingData=varRunInfo[FILL_VALUE_KEY],
+                                                                                  altMissingDataInB=varRunInfo[FILL_VALUE_ALT_IN_B_KEY],
+                                                                                  invalidAMask=invalidA,
+                                                                                  invalidBMask=invalidB)
+            else :
+                (aData, bData, (numberOfMultipleMatchesInA, numberOfMultipleMatchesInB)), \
+                (aUnmatchedData,             unmatchedALongitude, unmatchedALatitude), \
+                (bUnmatchedData,             unmatchedBLongitude, unmatchedBLatitude) = \
+                        collocation.create_colocated_data_with_index_pairs(aMatchIndexes, bMatchIndexes,
+                                                                           lon_lat_data[A_FILE_KEY][LON_KEY], lon_lat_data[A_FILE_KEY][LAT_KEY],
+                                                                           lon_lat_data[B_FILE_KEY][LON_KEY], lon_lat_data[B_FILE_KEY][LAT_KEY],
+                                                                           aData, bData,
+                                                                           missingData=varRunInfo[FILL_VALUE_KEY],
+                                                                           altMissingDataInB=varRunInfo[FILL_VALUE_ALT_IN_B_KEY],
+                                                                           invalidAMask=invalidA,
+                                                                           invalidBMask=invalidB)
             
             LOG.debug(str(numberOfMultipleMatchesInA) + " data pairs contain A data points used for multiple matches.")
             LOG.debug(str(numberOfMultipleMatchesInB) + " data pairs contain B data points used for multiple matches.")
@@ -237,8 +267,9 @@ def colocateToFile_library_call(a_path, b_path, var_list=[ ],
     # the end of the loop to examine all the variables
     
     # we're done with the files, so close them up
-    aFile.file_object.close()
-    bFile.file_object.close()
+    dataobj.close_shared_file(pathsTemp[A_FILE_KEY])
+    dataobj.close_shared_file(pathsTemp[B_FILE_KEY])
+    log_and_clear_decoded_variable_cache()
     
     return
 
@@ -421,7 +452,7 @@ def inspect_library_call (a_path, var_list=[ ],
     # open the file
     files = {}
     LOG.info("Processing File A:")
-    aFile = dataobj.FileInfo(pathsTemp[A_FILE_KEY])
+    aFile = dataobj.get_shared_file_info(pathsTemp[A_FILE_KEY], fastFingerprint=runInfo[USE_FAST_FINGERPRINT_KEY])
     files[A_FILE_TITLE_KEY] = aFile.get_old_info_dictionary() # FUTURE move to actually using the file object to generate the report
     if aFile.file_object is None:
         LOG.warn("Unable to continue with examination because file (" + pathsTemp[A_FILE_KEY] + ") could not be opened.")
@@ -455,7 +486,9 @@ def inspect_library_call (a_path, var_list=[ ],
     
     # go through each of the possible variables in our files
     # and make a report section with images for whichever ones we can
+    # (the images for all the variables are made by one figure renderer)
     variableInspections = { }
+    figureRenderer      = _make_figure_renderer(runInfo)
     for displayName in finalNames:
         
         # pull out the information for this variable analysis run
@@ -477,7 +510,7 @@ def inspect_library_call (a_path, var_list=[ ],
                                    dataFilter = varRunInfo[FILTER_FUNCTION_A_KEY] if FILTER_FUNCTION_A_KEY in varRunInfo else None,
                                    variableToFilterOn = varRunInfo[VAR_FILTER_NAME_A_KEY] if VAR_FILTER_NAME_A_KEY in varRunInfo else None,
                                    variableBasedFilter = varRunInfo[VAR_FILTER_FUNCTION_A_KEY] if VAR_FILTER_FUNCTION_A_KEY in varRunInfo else None,
-                                   altVariableFileObject = dataobj.FileInfo(varRunInfo[VAR_FILTER_ALT_FILE_A_KEY]).file_object if VAR_FILTER_ALT_FILE_A_KEY in varRunInfo else None,
+                                   altVariableFileObject = dataobj.get_shared_file_info(varRunInfo[VAR_FILTER_ALT_FILE_A_KEY]).file_object if VAR_FILTER_ALT_FILE_A_KEY in varRunInfo else None,
                                    fileDescriptionForDisplay = "file A")
         
         # pre-check if this data should be plotted and if it should be compared to the longitude and latitude
@@ -584,7 +617,8 @@ def inspect_library_call (a_path, var_list=[ ],
                              thumbDPI=      runInfo[THUMBNAIL_DPI_KEY],
                              units_a=       varRunInfo[VAR_UNITS_A_KEY] if VAR_UNITS_A_KEY in varRunInfo else None,
                              useBData=False,
-                             histRange=varRunInfo[HISTOGRAM_RANGE_KEY] if HISTOGRAM_RANGE_KEY in varRunInfo else None)
+                             histRange=varRunInfo[HISTOGRAM_RANGE_KEY] if HISTOGRAM_RANGE_KEY in varRunInfo else None,
+                             figureRenderer=figureRenderer)
                 
                 LOG.info("\tfinished creating figures for: " + explanationName)
             
@@ -611,6 +645,7 @@ def inspect_library_call (a_path, var_list=[ ],
             LOG.warn(message)
         
     # the end of the loop to examine all the variables
+    figureRenderer.close()
     
     # generate our general report pages once we've analyzed all the variables
     if (runInfo[DO_MAKE_REPORT_KEY]) :
@@ -632,14 +667,617 @@ def inspect_library_call (a_path, var_list=[ ],
         LOG.info ('generating glossary')
         report.generate_and_save_doc_page(statistics.StatisticalInspectionAnalysis.doc_strings(), pathsTemp[OUT_FILE_KEY])
     
+    log_and_clear_decoded_variable_cache()
+    
     return 0
 
+# the information shared with worker processes; the parent process fills this in before
+# the worker pool is created so that the (forked) workers inherit it without pickling
+_worker_state = { }
+
+def _init_worker ( ) :
+    """
+    open this worker process's own handles on the files it will analyze
+    """
+    
+    for fileKey in (A_FILE_KEY, B_FILE_KEY) :
+        if fileKey in _worker_state['paths'] :
+            _worker_state[fileKey] = io.open(_worker_state['paths'][fileKey])
+
+def _run_with_worker_pool (numberOfWorkers, workerTask, taskArguments, sharedState) :
+    """
+    run the workerTask on each of the taskArguments in a pool of worker processes and
+    yield the results in the same order as the taskArguments
+    
+    the sharedState will be available to the workers in _worker_state, it must include a
+    'paths' dictionary with the A_FILE_KEY and/or B_FILE_KEY paths each worker should open
+    """
+    
+    _worker_state.update(sharedState)
+    workerPool = multiprocessing.Pool(numberOfWorkers, initializer=_init_worker)
+    try :
+        for result in workerPool.imap(workerTask, taskArguments) :
+            yield result
+        workerPool.close()
+    except :
+        workerPool.terminate()
+        raise
+    finally :
+        workerPool.join()
+        _worker_state.clear()
+
+def _make_figure_renderer (runInfo, sharedBy=1) :
+    """
+    make the plot.FigureRenderer that will create the images for a run
+    
+    if each of sharedBy worker processes makes its own renderer, the figure processes
+    (one per cpu unless the run info says otherwise) are split between them, so that
+    the workers don't fork sharedBy times as many figure processes between them
+    """
+    
+    numberOfWorkers = runInfo.get(FIGURE_WORKERS_KEY, None)
+    if sharedBy > 1 :
+        totalWorkers    = numberOfWorkers if (numberOfWorkers is not None) and (numberOfWorkers > 0) else multiprocessing.cpu_count()
+        numberOfWorkers = totalWorkers // sharedBy if totalWorkers // sharedBy > 1 else 1
+    
+    return plot.make_figure_renderer(doFork=runInfo[DO_MAKE_FORKS_KEY],
+                                     shouldClearMemoryWithThreads=runInfo[DO_CLEAR_MEM_THREADED_KEY],
+                                     numberOfWorkers=numberOfWorkers,
+                                     jobTimeout=runInfo.get(FIGURE_TIMEOUT_KEY, None))
+
+# run information that can change from run to run without changing any results (such as
+# timestamps and how the work is run), these entries are left out when describing the inputs to a result
+# (the projection cache that travels with the lon/lat is left out the same way)
+_UNTRACKED_RUN_INFO_KEYS = (TIME_INFO_KEY, REUSED_OUTPUT_COUNT_KEY, REGENERATED_OUTPUT_COUNT_KEY,
+                            NUM_WORKERS_KEY, DO_MAKE_FORKS_KEY, DO_CLEAR_MEM_THREADED_KEY,
+                            USE_STATISTICS_CACHE_KEY, USE_INCREMENTAL_REPORT_KEY, PREFETCH_DEPTH_KEY,
+                            FIGURE_WORKERS_KEY, FIGURE_TIMEOUT_KEY, PROJECTION_CACHE_KEY)
+
+def _describe_for_cache (value) :
+    """
+    get a string that identifies a value for a cache key; arrays are identified by
+    an md5 of their contents (since their repr is abbreviated), functions by
+    _function_fingerprint, and dictionaries and sequences by their contents
+    """
+    
+    if isinstance(value, dataobj.FileFingerprint) :
+        value = value.result()
+    if isinstance(value, unicode) :
+        value = value.encode('utf-8')
+    if isinstance(value, dict) :
+        return '{' + ', '.join(_describe_for_cache(key) + ': ' + _describe_for_cache(value[key])
+                               for key in sorted(value.keys()) if key not in _UNTRACKED_RUN_INFO_KEYS) + '}'
+    if isinstance(value, (list, tuple)) :
+        return '[' + ', '.join(_describe_for_cache(item) for item in value) + ']'
+    if isinstance(value, ndarray) :
+        contiguousArray = ascontiguousarray(value)
+        return (str(contiguousArray.dtype) + str(contiguousArray.shape)
+                + hashlib.md5(contiguousArray.view(uint8).ravel()).hexdigest())
+    if callable(value) :
+        return _function_fingerprint(value)
+    
+    return repr(value)
+
+def _function_fingerprint (function) :
+    """
+    get an md5 that identifies a filter function well enough to notice when it changes
+    between runs: its source (if that can be found), its compiled code and constants,
+    and any values it closes over (but not the values of any globals it uses)
+    
+    functions that aren't plain python functions are identified by their repr, which
+    will usually change from run to run (so results using them won't be reused)
+    """
+    
+    code = getattr(function, 'func_code', None)
+    if code is None :
+        return hashlib.md5(repr(function)).hexdigest()
+    
+    description = [code.co_code, repr(code.co_consts), repr(code.co_names),
+                   repr(getattr(function, 'func_defaults', None))]
+    try :
+        description.append(inspect.getsource(function))
+    except (IOError, TypeError) :
+        pass
+    for cell in (function.func_closure or ( )) :
+        description.append(_describe_for_cache(cell.cell_contents))
+    
+    return hashlib.md5('\n'.join(description)).hexdigest()
+
+def _get_statistics_cache_key (technical_name, b_variable_technical_name, varRunInfo, files,
+                               mask_a_to_use, mask_b_to_use, glanceVersion) :
+    """
+    build an md5 that identifies everything that goes into the statistics for a variable
+    in a reportGen run: the fingerprints of the files, the variable names, the epsilons,
+    fill values and filters, the longitude/latitude invalid masks, and the glance version
+    and statistics code that calculate them
+    
+    if any of the files couldn't be fingerprinted, None will be returned
+    """
+    
+    fingerprints = [dataobj.resolve_fingerprint(files[fileKey].get(MD5SUM_KEY)) for fileKey in (A_FILE_TITLE_KEY, B_FILE_TITLE_KEY)]
+    for altFileKey in (VAR_FILTER_ALT_FILE_A_KEY, VAR_FILTER_ALT_FILE_B_KEY) :
+        if altFileKey in varRunInfo :
+            fingerprints.append(dataobj.get_shared_file_info(varRunInfo[altFileKey]).md5_sum)
+    if None in fingerprints :
+        return None
+    
+    keyParts = fingerprints + [technical_name, b_variable_technical_name, mask_a_to_use, mask_b_to_use,
+                               glanceVersion, statistics.get_statistics_code_fingerprint()]
+    for settingKey in (EPSILON_KEY,           EPSILON_PERCENT_KEY,
+                       FILL_VALUE_KEY,        FILL_VALUE_ALT_IN_B_KEY,
+                       FILTER_FUNCTION_A_KEY, FILTER_FUNCTION_B_KEY,
+                       VAR_FILTER_NAME_A_KEY, VAR_FILTER_FUNCTION_A_KEY,
+                       VAR_FILTER_NAME_B_KEY, VAR_FILTER_FUNCTION_B_KEY) :
+        keyParts.append(varRunInfo.get(settingKey))
+    
+    keyHash = hashlib.md5()
+    for part in keyParts :
+        keyHash.update(_describe_for_cache(part) + '\n')
+    
+    return keyHash.hexdigest()
+
+# the variable run information that changes the data after it's loaded from the file
+_DATA_FILTER_KEYS = (FILTER_FUNCTION_A_KEY, VAR_FILTER_NAME_A_KEY, VAR_FILTER_FUNCTION_A_KEY,
+                     FILTER_FUNCTION_B_KEY, VAR_FILTER_NAME_B_KEY, VAR_FILTER_FUNCTION_B_KEY)
+
+def _can_load_packed_pair (aFileObject, bFileObject, varRunInfo) :
+    """
+    should a variable with the given run information be loaded as packed data?
+    """
+    
+    return ( (not any(filterKey in varRunInfo for filterKey in _DATA_FILTER_KEYS)) and
+             hasattr(aFileObject, 'get_variable_region_packed') and hasattr(bFileObject, 'get_variable_region_packed') )
+
+def _plan_report_reads (finalNames, aFileObject, bFileObject) :
+    """
+    list the reads (see load.VariablePrefetcher) that loading each of the variables
+    in a reportGen run will need, in the order the variables will be analyzed
+    """
+    
+    plannedReads = [ ]
+    for displayName in finalNames :
+        varRunInfo = finalNames[displayName]
+        technical_name, b_variable_technical_name, _ = _get_name_info_for_variable(displayName, varRunInfo)
+        packed = _can_load_packed_pair(aFileObject, bFileObject, varRunInfo)
+        reads  = [(aFileObject, technical_name, packed), (bFileObject, b_variable_technical_name, packed)]
+        if not packed :
+            for fileObject, filterNameKey, altFileKey in ((aFileObject, VAR_FILTER_NAME_A_KEY, VAR_FILTER_ALT_FILE_A_KEY),
+                                                          (bFileObject, VAR_FILTER_NAME_B_KEY, VAR_FILTER_ALT_FILE_B_KEY)) :
+                if (filterNameKey in varRunInfo) and (altFileKey not in varRunInfo) :
+                    reads.append((fileObject, varRunInfo[filterNameKey], False))
+        plannedReads.append(reads)
+    
+    return plannedReads
+
+def _get_alt_file_object (varRunInfo, altFileKey, prefetcher=None) :
+    """
+    get the file object for the alternate file a filter variable is loaded from, or None if there isn't one
+    
+    the pooled alternate file may be the same file object as one that's being read ahead,
+    so while there's a load.VariablePrefetcher it's only used through an io.LockedFile
+    """
+    
+    if altFileKey not in varRunInfo :
+        return None
+    altFileObject = dataobj.get_shared_file_info(varRunInfo[altFileKey]).file_object
+    if (prefetcher is not None) and (altFileObject is not None) :
+        altFileObject = io.LockedFile(altFileObject)
+    
+    return altFileObject
+
+def _load_variable_pair_for_report (aFileObject, bFileObject, technical_name, b_variable_technical_name, varRunInfo,
+                                    prefetcher=None) :
+    """
+    load the A and B data for a variable, applying any filters in its run information
+    
+    returns (aData, bData, aPacking, bPacking); if neither variable is filtered and both files
+    can provide packed data, the packings are the io.PackedData the data was unpacked from so
+    the comparison can be done on the packed integers, otherwise they are None
+    
+    if a load.VariablePrefetcher is given, the data will be taken from it
+    """
+    
+    if _can_load_packed_pair(aFileObject, bFileObject, varRunInfo) :
+        aPacking = load_packed_variable_data(aFileObject, technical_name,            fileDescriptionForDisplay="file A", prefetcher=prefetcher)
+        bPacking = load_packed_variable_data(bFileObject, b_variable_technical_name, fileDescriptionForDisplay="file B", prefetcher=prefetcher)
+        return aPacking.unpack(), bPacking.unpack(), aPacking, bPacking
+    
+    aData = load_variable_data(aFileObject, technical_name,
+                               dataFilter = varRunInfo[FILTER_FUNCTION_A_KEY] if FILTER_FUNCTION_A_KEY in varRunInfo else None,
+                               variableToFilterOn = varRunInfo[VAR_FILTER_NAME_A_KEY] if VAR_FILTER_NAME_A_KEY in varRunInfo else None,
+                               variableBasedFilter = varRunInfo[VAR_FILTER_FUNCTION_A_KEY] if VAR_FILTER_FUNCTION_A_KEY in varRunInfo else None,
+                               altVariableFileObject = _get_alt_file_object(varRunInfo, VAR_FILTER_ALT_FILE_A_KEY, prefetcher),
+                               fileDescriptionForDisplay = "file A",
+                               prefetcher = prefetcher)
+    bData = load_variable_data(bFileObject, b_variable_technical_name,
+                               dataFilter = varRunInfo[FILTER_FUNCTION_B_KEY] if FILTER_FUNCTION_B_KEY in varRunInfo else None,
+                               variableToFilterOn = varRunInfo[VAR_FILTER_NAME_B_KEY] if VAR_FILTER_NAME_B_KEY in varRunInfo else None,
+                               variableBasedFilter = varRunInfo[VAR_FILTER_FUNCTION_B_KEY] if VAR_FILTER_FUNCTION_B_KEY in varRunInfo else None,
+                               altVariableFileObject = _get_alt_file_object(varRunInfo, VAR_FILTER_ALT_FILE_B_KEY, prefetcher),
+                               fileDescriptionForDisplay = "file B",
+                               prefetcher = prefetcher)
+    
+    return aData, bData, None, None
+
+def _analyze_variable_for_report (displayName, varRunInfo, runInfo, defaultValues, outputPath,
+                                  aFileObject, bFileObject, files, lon_lat_data, spatialInfo,
+                                  lonLatKey=None, prefetcher=None, figureRenderer=None) :
+    """
+    load, analyze, plot, and write the report page for a single variable as part of a reportGen run
+    
+    this takes the same arguments as _start_variable_report, but it waits for the variable's
+    figures itself and returns what _start_variable_report's finishReport function does
+    """
+    
+    figureJobs, finishReport = _start_variable_report(displayName, varRunInfo, runInfo, defaultValues, outputPath,
+                                                      aFileObject, bFileObject, files, lon_lat_data, spatialInfo,
+                                                      lonLatKey=lonLatKey, prefetcher=prefetcher, figureRenderer=figureRenderer)
+    
+    return finishReport()
+
+def _no_report_to_finish ( ) :
+    return None
+
+def _start_variable_report (displayName, varRunInfo, runInfo, defaultValues, outputPath,
+                            aFileObject, bFileObject, files, lon_lat_data, spatialInfo,
+                            lonLatKey=None, prefetcher=None, figureRenderer=None) :
+    """
+    load, analyze, and plot a single variable as part of a reportGen run, returning
+    (figureJobs, finishReport); the variable's figures may still be being made by the
+    figureRenderer when this returns, figureJobs holds their plot.FigureJobs
+    
+    finishReport waits for the figures and then writes the report page for the variable
+    
+    varRunInfo should be a copy of the variable's run information, it will be updated with the
+    information (directories, pass/fail status, etc.) that the summary report needs
+    
+    if the variable could not be compared, finishReport will return None, otherwise its return will be
+    in the form (didPass, comparisonSummary), where comparisonSummary holds the information for
+    the summary report (without the variable run info) or is None if no report is being made
+    
+    lonLatKey should describe the lon_lat_data (see _describe_for_cache) if this is an incremental run
+    
+    if a load.VariablePrefetcher is given, the variable's data will be taken from it
+    
+    if a plot.FigureRenderer is given, it will be used to make the variable's images
+    (otherwise one will be made from the fork settings just for this variable, and
+    the images will be finished before this returns)
+    """
+    
+    # if there is an approved lon/lat shape, hang on to that for future checks
+    good_shape_from_lon_lat = None
+    if len(lon_lat_data.keys()) > 0:
+        good_shape_from_lon_lat = lon_lat_data[COMMON_KEY][LON_KEY].shape
+    
+    try:
+        # get the various names
+        technical_name, b_variable_technical_name, \
+                explanationName = _get_name_info_for_variable(displayName, varRunInfo)
+        
+        # make sure that it's possible to load this variable
+        if not(aFileObject.is_loadable_type(technical_name)) or not(bFileObject.is_loadable_type(b_variable_technical_name)) :
+            LOG.warn(displayName + " is of a type that cannot be loaded using current file handling libraries included with Glance." +
+                    " Skipping " + displayName + ".")
+            return [ ], _no_report_to_finish
+        
+        LOG.info('analyzing: ' + explanationName)
+        
+        # pre-check if this data should be plotted and if it should be compared to the longitude and latitude
+        include_images_for_this_variable = ((not(DO_MAKE_IMAGES_KEY in runInfo)) or (runInfo[DO_MAKE_IMAGES_KEY]))
+        if DO_MAKE_IMAGES_KEY in varRunInfo :
+            include_images_for_this_variable = varRunInfo[DO_MAKE_IMAGES_KEY]
+        do_not_test_with_lon_lat = (not include_images_for_this_variable) or (len(lon_lat_data.keys()) <= 0)
+        
+        # handle vector data
+        isVectorData = ( (MAGNITUDE_VAR_NAME_KEY   in varRunInfo) and (DIRECTION_VAR_NAME_KEY   in varRunInfo) and
+                         (MAGNITUDE_B_VAR_NAME_KEY in varRunInfo) and (DIRECTION_B_VAR_NAME_KEY in varRunInfo) )
+        
+        # figure out the masks we want for our statistical analysis
+        mask_a_to_use = None if do_not_test_with_lon_lat else lon_lat_data[A_FILE_KEY][INVALID_MASK_KEY]
+        mask_b_to_use = None if do_not_test_with_lon_lat else lon_lat_data[B_FILE_KEY][INVALID_MASK_KEY]
+        
+        # identify the data and settings our statistics depend on, if we need to recognize them from earlier runs
+        variableDir    = os.path.join(outputPath, './' + displayName)
+        statsCacheKey  = None
+        if runInfo[USE_STATISTICS_CACHE_KEY] or runInfo[USE_INCREMENTAL_REPORT_KEY] :
+            statsCacheKey = _get_statistics_cache_key(technical_name, b_variable_technical_name, varRunInfo, files,
+                                                      mask_a_to_use, mask_b_to_use, runInfo[GLANCE_VERSION_INFO_KEY])
+        variableManifest = ReportManifest(variableDir) if runInfo[USE_INCREMENTAL_REPORT_KEY] else None
+        
+        # if this variable was analyzed before with the same files and settings, reuse those statistics
+        variable_stats = None
+        if runInfo[USE_STATISTICS_CACHE_KEY] and (statsCacheKey is not None) :
+            variable_stats, savedShapes = statistics.load_saved_analysis(variableDir, statsCacheKey)
+        
+        # load the variable data, unless we have saved statistics (then it will only be loaded if it needs to be plotted)
+        aData, bData, aPacking, bPacking = None, None, None, None
+        if variable_stats is None :
+            aData, bData, aPacking, bPacking = _load_variable_pair_for_report(aFileObject, bFileObject, technical_name, b_variable_technical_name, varRunInfo,
+                                                                              prefetcher=prefetcher)
+            aShape, bShape = aData.shape, bData.shape
+        else :
+            aShape, bShape = savedShapes
+        
+        # check if this data can be displayed but
+        # don't compare lon/lat sizes if we won't be plotting
+        if ( (aShape == bShape) 
+             and 
+             ( do_not_test_with_lon_lat
+              or
+              ((aShape == good_shape_from_lon_lat) and (bShape == good_shape_from_lon_lat)) ) ) :
+            
+            # check to see if there is a directory to put information about this variable in,
+            # if not then create it
+            varRunInfo[VARIABLE_DIRECTORY_KEY] = variableDir
+            varRunInfo[VAR_REPORT_PATH_KEY] = quote(os.path.join(displayName, 'index.html'))
+            LOG.debug ("Directory selected for variable information: " + varRunInfo[VAR_REPORT_PATH_KEY])
+            setup_dir_if_needed(variableDir, "variable")
+            
+            # form the doc and config paths relative to where the variable is
+            upwardPath = './'
+            for number in range(len(displayName.split('/'))) : # TODO this is not general to windows
+                upwardPath = os.path.join(upwardPath, '../')
+            varRunInfo[DOCUMENTATION_PATH_KEY]   = quote(os.path.join(upwardPath, 'doc.html'))
+            if CONFIG_FILE_NAME_KEY in runInfo :
+                varRunInfo[CONFIG_FILE_PATH_KEY] = quote(os.path.join(upwardPath, runInfo[CONFIG_FILE_NAME_KEY]))
+            
+            # do our statistical analysis, if we don't already have it
+            if variable_stats is None :
+                LOG.debug("Analyzing " + displayName + " statistically.")
+                variable_stats = statistics.StatisticalAnalysis.withSimpleData(aData, bData,
+                                                                               varRunInfo[FILL_VALUE_KEY], varRunInfo[FILL_VALUE_ALT_IN_B_KEY],
+                                                                               mask_a_to_use, mask_b_to_use,
+                                                                               varRunInfo[EPSILON_KEY], varRunInfo[EPSILON_PERCENT_KEY],
+                                                                               a_packing=aPacking, b_packing=bPacking)
+                # the packed integers are only needed for the comparison, don't hold them while plotting
+                aPacking, bPacking = None, None
+                if runInfo[USE_STATISTICS_CACHE_KEY] and (statsCacheKey is not None) :
+                    statistics.save_analysis(variableDir, statsCacheKey, variable_stats, (aShape, bShape))
+            
+            # add a little additional info to our variable run info before we squirrel it away
+            varRunInfo[TIME_INFO_KEY] = datetime.datetime.ctime(datetime.datetime.now())  # todo is this needed?
+            didPass, epsilon_failed_fraction, \
+                     non_finite_fail_fraction, \
+                     r_squared_value = variable_stats.check_pass_or_fail(epsilon_failure_tolerance=varRunInfo[EPSILON_FAIL_TOLERANCE_KEY] if EPSILON_FAIL_TOLERANCE_KEY in varRunInfo else numpy.nan,
+                                                epsilon_failure_tolerance_default=defaultValues[EPSILON_FAIL_TOLERANCE_KEY],
+                                                non_finite_data_tolerance=varRunInfo[NONFINITE_TOLERANCE_KEY]  if NONFINITE_TOLERANCE_KEY in varRunInfo else numpy.nan,
+                                                non_finite_data_tolerance_default=defaultValues[NONFINITE_TOLERANCE_KEY],
+                                                total_data_failure_tolerance=varRunInfo[TOTAL_FAIL_TOLERANCE_KEY] if TOTAL_FAIL_TOLERANCE_KEY in varRunInfo else numpy.nan,
+                                                total_data_failure_tolerance_default=defaultValues[TOTAL_FAIL_TOLERANCE_KEY],
+                                                min_acceptable_r_squared=varRunInfo[MIN_OK_R_SQUARED_COEFF_KEY] if MIN_OK_R_SQUARED_COEFF_KEY in varRunInfo else numpy.nan,
+                                                min_acceptable_r_squared_default=defaultValues[MIN_OK_R_SQUARED_COEFF_KEY],
+                                                )
+            
+            varRunInfo[DID_VARIABLE_PASS_KEY] = didPass
+            
+            # based on the settings and whether the variable passsed or failed,
+            # should we include images for this variable?
+            if (DO_IMAGES_ONLY_ON_FAIL_KEY in varRunInfo) and varRunInfo[DO_IMAGES_ONLY_ON_FAIL_KEY] :
+                include_images_for_this_variable = include_images_for_this_variable and (not didPass)
+                varRunInfo[DO_MAKE_IMAGES_KEY] = include_images_for_this_variable
+            
+            # to hold the names of any images created
+            image_names = {
+                            ORIGINAL_IMAGES_KEY: [ ],
+                            COMPARED_IMAGES_KEY: [ ]
+                            }
+            
+            # if the images from an earlier run were made from the same data and settings, reuse them
+            imagesKey    = None
+            reusedImages = False
+            if include_images_for_this_variable and (variableManifest is not None) and (statsCacheKey is not None) :
+                imagesKey = hashlib.md5(_describe_for_cache([statsCacheKey, varRunInfo, isVectorData,
+                                                             None if do_not_test_with_lon_lat else lonLatKey,
+                                                             [runInfo[key] for key in (DETAIL_DPI_KEY, THUMBNAIL_DPI_KEY, USE_SHARED_ORIG_RANGE_KEY,
+                                                                                       GLANCE_VERSION_INFO_KEY)]])).hexdigest()
+                if variableManifest.is_up_to_date('images', imagesKey) :
+                    LOG.info("\treusing up to date figures for: " + explanationName)
+                    reusedImages = True
+                    for listKey, savedNames in variableManifest.get_info('images').items() :
+                        image_names[str(listKey)] = [str(imageName) for imageName in savedNames]
+            
+            # create the images for this variable (or queue them up, if there's a figure renderer to wait for them)
+            madeImages         = False
+            variableFigureJobs = [ ]
+            if (include_images_for_this_variable) and (not reusedImages) :
+                
+                # we may not have needed the data before now
+                if aData is None :
+                    aData, bData, _, _ = _load_variable_pair_for_report(aFileObject, bFileObject, technical_name, b_variable_technical_name, varRunInfo,
+                                                                        prefetcher=prefetcher)
+                
+                plotFunctionGenerationObjects = [ ]
+                
+                # if there's magnitude and direction data, figure out the u and v, otherwise these will be None
+                aUData, aVData = get_UV_info_from_magnitude_direction_info (aFileObject,
+                                                                            varRunInfo[MAGNITUDE_VAR_NAME_KEY] if (MAGNITUDE_VAR_NAME_KEY) in varRunInfo else None,
+                                                                            varRunInfo[DIRECTION_VAR_NAME_KEY] if (DIRECTION_VAR_NAME_KEY) in varRunInfo else None,
+                                                                            lon_lat_data[A_FILE_KEY][INVALID_MASK_KEY]
+                                                                            if (A_FILE_KEY in lon_lat_data) and (INVALID_MASK_KEY in lon_lat_data[A_FILE_KEY]) else None)
+                bUData, bVData = get_UV_info_from_magnitude_direction_info (bFileObject,
+                                                                            varRunInfo[MAGNITUDE_B_VAR_NAME_KEY] if (MAGNITUDE_B_VAR_NAME_KEY) in varRunInfo else None,
+                                                                            varRunInfo[DIRECTION_B_VAR_NAME_KEY] if (DIRECTION_B_VAR_NAME_KEY) in varRunInfo else None,
+                                                                            lon_lat_data[B_FILE_KEY][INVALID_MASK_KEY]
+                                                                            if (B_FILE_KEY in lon_lat_data) and (INVALID_MASK_KEY in lon_lat_data[B_FILE_KEY]) else None)
+                
+                # if the data is the same size, we can always make our basic statistical comparison plots
+                if (aData.shape == bData.shape) :
+                    plotFunctionGenerationObjects.append(plotcreate.BasicComparisonPlotsFunctionFactory())
+                
+                # if the bin and tuple are defined, try to analyze the data as complex
+                # multidimentional information requiring careful sampling
+                if (BIN_INDEX_KEY in varRunInfo) and (TUPLE_INDEX_KEY in varRunInfo) :
+                    plotFunctionGenerationObjects.append(plotcreate.BinTupleAnalysisFunctionFactory())
+                    
+                else : # if it's not bin/tuple, there are lots of other posibilities
+                    
+                    # if it's vector data with longitude and latitude, quiver plot it on the Earth
+                    if isVectorData and (not do_not_test_with_lon_lat) :
+                        plotFunctionGenerationObjects.append(plotcreate.MappedQuiverPlotFunctionFactory())
+                    
+                    # if the data is one dimensional we can plot it as lines
+                    elif   (len(aData.shape) is 1) : 
+                        plotFunctionGenerationObjects.append(plotcreate.LinePlotsFunctionFactory())
+                    
+                    # if the data is 2D we have some options based on the type of data
+                    elif (len(aData.shape) is 2) :
+                        
+                        # if the data is not mapped to a longitude and latitude, just show it as an image
+                        if (do_not_test_with_lon_lat) :
+                            plotFunctionGenerationObjects.append(plotcreate.IMShowPlotFunctionFactory())
+                        
+                        # if it's 2D and mapped to the Earth, contour plot it on the earth
+                        else :
+                            plotFunctionGenerationObjects.append(plotcreate.MappedContourPlotFunctionFactory())
+                
+                # plot our lon/lat related info
+                image_names[ORIGINAL_IMAGES_KEY], image_names[COMPARED_IMAGES_KEY] = \
+                    plot.plot_and_save_comparison_figures \
+                            (aData, bData,
+                             plotFunctionGenerationObjects,
+                             varRunInfo[VARIABLE_DIRECTORY_KEY],
+                             displayName,
+                             varRunInfo[EPSILON_KEY],
+                             varRunInfo[FILL_VALUE_KEY],
+                             missingValueAltInB = varRunInfo[FILL_VALUE_ALT_IN_B_KEY] if FILL_VALUE_ALT_IN_B_KEY in varRunInfo else None,
+                             lonLatDataDict=lon_lat_data,
+                             dataRanges     = varRunInfo[DISPLAY_RANGES_KEY]       if DISPLAY_RANGES_KEY       in varRunInfo else None,
+                             dataRangeNames = varRunInfo[DISPLAY_RANGE_NAMES_KEY]  if DISPLAY_RANGE_NAMES_KEY  in varRunInfo else None,
+                             dataColors     = varRunInfo[DISPLAY_RANGE_COLORS_KEY] if DISPLAY_RANGE_COLORS_KEY in varRunInfo else None,
+                             makeSmall=True,
+                             doFork=runInfo[DO_MAKE_FORKS_KEY],
+                             shouldClearMemoryWithThreads=runInfo[DO_CLEAR_MEM_THREADED_KEY],
+                             shouldUseSharedRangeForOriginal=runInfo[USE_SHARED_ORIG_RANGE_KEY],
+                             doPlotSettingsDict = varRunInfo,
+                             aUData=aUData, aVData=aVData,
+                             bUData=bUData, bVData=bVData,
+                             binIndex=      varRunInfo[BIN_INDEX_KEY]       if BIN_INDEX_KEY       in varRunInfo else None,
+                             tupleIndex=    varRunInfo[TUPLE_INDEX_KEY]     if TUPLE_INDEX_KEY     in varRunInfo else None,
+                             binName=       varRunInfo[BIN_NAME_KEY]        if BIN_NAME_KEY        in varRunInfo else 'bin',
+                             tupleName=     varRunInfo[TUPLE_NAME_KEY]      if TUPLE_NAME_KEY      in varRunInfo else 'tuple',
+                             epsilonPercent=varRunInfo[EPSILON_PERCENT_KEY] if EPSILON_PERCENT_KEY in varRunInfo else None,
+                             fullDPI=       runInfo[DETAIL_DPI_KEY],
+                             thumbDPI=      runInfo[THUMBNAIL_DPI_KEY],
+                             units_a=       varRunInfo[VAR_UNITS_A_KEY]     if VAR_UNITS_A_KEY     in varRunInfo else None,
+                             units_b=       varRunInfo[VAR_UNITS_B_KEY]     if VAR_UNITS_B_KEY     in varRunInfo else None,
+                             figureRenderer=figureRenderer,
+                             figureJobs=variableFigureJobs if figureRenderer is not None else None,
+                            )#histRange=     varRunInfo[HISTOGRAM_RANGE_KEY] if HISTOGRAM_RANGE_KEY in varRunInfo else None)
+                
+                madeImages = True
+            
+            # the rest of the variable's report needs the figures to be finished, so it's done in
+            # finishReport (which our caller may put off while the figures are being made)
+            def finishReport ( ) :
+                
+                if len(variableFigureJobs) > 0 :
+                    LOG.info ("waiting for completion of " + explanationName + " images...")
+                    figureRenderer.wait(variableFigureJobs)
+                if madeImages :
+                    LOG.info("\tfinished creating figures for: " + explanationName)
+                    if imagesKey is not None :
+                        variableManifest.record('images', imagesKey,
+                                                image_names[ORIGINAL_IMAGES_KEY] + image_names[COMPARED_IMAGES_KEY], image_names)
+                
+                # create the report page for this variable
+                comparisonSummary = None
+                if (runInfo[DO_MAKE_REPORT_KEY]) :
+                    
+                    # hang on to our good % and other info to describe our comparison
+                    epsilonPassedPercent = (1.0 -  epsilon_failed_fraction) * 100.0
+                    finitePassedPercent  = (1.0 - non_finite_fail_fraction) * 100.0 
+                    comparisonSummary = {
+                                         PASSED_EPSILON_PERCENT_KEY: epsilonPassedPercent,
+                                         FINITE_SIMILAR_PERCENT_KEY: finitePassedPercent,
+                                         R_SQUARED_COEFF_VALUE_KEY:  r_squared_value,
+                                         }
+                    
+                    # only make the page if it would be different from the one made in an earlier run
+                    statsDictionary = variable_stats.dictionary_form()
+                    pageKey         = None
+                    if variableManifest is not None :
+                        pageKey = hashlib.md5(_describe_for_cache([files, varRunInfo, runInfo, statsDictionary, spatialInfo,
+                                                                   image_names, report.get_template_fingerprint()])).hexdigest()
+                    if (pageKey is not None) and variableManifest.is_up_to_date('index.html', pageKey) :
+                        LOG.info ('\treusing up to date report for: ' + explanationName)
+                    else :
+                        LOG.info ('\tgenerating report for: ' + explanationName) 
+                        report.generate_and_save_variable_report(files,
+                                                                 varRunInfo, runInfo,
+                                                                 statsDictionary,
+                                                                 spatialInfo,
+                                                                 image_names,
+                                                                 varRunInfo[VARIABLE_DIRECTORY_KEY], "index.html")
+                        if pageKey is not None :
+                            variableManifest.record('index.html', pageKey, ['index.html'])
+                
+                # note how much we were able to reuse
+                if variableManifest is not None :
+                    varRunInfo[REUSED_OUTPUT_COUNT_KEY]      = variableManifest.reused
+                    varRunInfo[REGENERATED_OUTPUT_COUNT_KEY] = variableManifest.regenerated
+                
+                return didPass, comparisonSummary
+            
+            return variableFigureJobs, finishReport
+        
+        # if we can't compare the variable, we should tell the user 
+        else :
+            message = (explanationName + ' ' + 
+                     'could not be compared. This may be because the data for this variable does not match in shape ' +
+                     'between the two files (file A data shape: ' + str(aShape) + '; file B data shape: '
+                     + str(bShape) + ')')
+            if do_not_test_with_lon_lat :
+                message = message + '.'
+            else :
+                message = (message + ' or the data may not match the shape of the selected '
+                     + 'longitude ' + str(good_shape_from_lon_lat) + ' and '
+                     + 'latitude '  + str(good_shape_from_lon_lat) + ' variables.')
+            LOG.warn(message)
+    except ValueErrorStringToFloat as e:
+        LOG.warn("Unable to compare "+displayName+": "+str(e))
+    
+    return [ ], _no_report_to_finish
+
+def _report_worker_task (displayName) :
+    """
+    analyze one variable in a reportGen worker process
+    
+    since the variable run info may hold functions that can't be pickled, only the
+    entries the analysis added or changed are sent back to the parent process
+    """
+    
+    originalRunInfo = _worker_state['finalNames'][displayName]
+    varRunInfo      = originalRunInfo.copy()
+    figureRenderer  = _make_figure_renderer(_worker_state['runInfo'], sharedBy=_worker_state['numberOfWorkers'])
+    try :
+        result = _analyze_variable_for_report(displayName, varRunInfo,
+                                              _worker_state['runInfo'],
+                                              _worker_state['defaultValues'],
+                                              _worker_state['paths'][OUT_FILE_KEY],
+                                              _worker_state[A_FILE_KEY],
+                                              _worker_state[B_FILE_KEY],
+                                              _worker_state['files'],
+                                              _worker_state['lon_lat_data'],
+                                              _worker_state['spatialInfo'],
+                                              lonLatKey=_worker_state['lonLatKey'],
+                                              figureRenderer=figureRenderer)
+    finally :
+        figureRenderer.close()
+    
+    changedRunInfo = { }
+    for key in varRunInfo :
+        if (key not in originalRunInfo) or (originalRunInfo[key] is not varRunInfo[key]) :
+            changedRunInfo[key] = varRunInfo[key]
+    
+    return displayName, result, changedRunInfo
+
 def reportGen_library_call (a_path, b_path, var_list=[ ],
                             options_set={ },
                             # todo, this doesn't yet do anything
                             do_document=False,
                             # todo, the output channel does nothing at the moment
-                            output_channel=sys.stdout) :
+                            output_channel=sys.stdout,
+                            loaded_config=None) :
     """
     this method handles the actual work of the reportGen command line tool
     and can also be used as a library routine, pass in the slightly parsed
@@ -649,6 +1287,9 @@ def reportGen_library_call (a_path, b_path, var_list=[ ],
     or this method will fail badly (note: the addition of some glance defaults
     has minimized the problem, but you still need to be careful when dealing with
     optional boolean values. this needs more work.)
+    
+    if the settings have already been loaded (see config_organizer.copy_loaded_config_for_files)
+    they may be passed in as loaded_config and the options will not be loaded again
     """
     
     # have all the variables passed test criteria set for them?
@@ -657,9 +1298,9 @@ def reportGen_library_call (a_path, b_path, var_list=[ ],
     do_pass_fail = options_set[DO_TEST_PASSFAIL_KEY] # todo, this is a temporary hack, should be loaded with other options
     
     # load the user settings from either the command line or a user defined config file
-    pathsTemp, runInfo, defaultValues, requestedNames, usedConfigFile = config_organizer.load_config_or_options(a_path, b_path,
-                                                                                                                options_set,
-                                                                                                                requestedVars = var_list)
+    if loaded_config is None :
+        loaded_config = config_organizer.load_config_or_options(a_path, b_path, options_set, requestedVars = var_list)
+    pathsTemp, runInfo, defaultValues, requestedNames, usedConfigFile = loaded_config
     
     # note some of this information for debugging purposes
     LOG.debug('paths: ' +           str(pathsTemp))
@@ -683,13 +1324,13 @@ def reportGen_library_call (a_path, b_path, var_list=[ ],
     # open the files
     files = {}
     LOG.info("Processing File A:")
-    aFile = dataobj.FileInfo(pathsTemp[A_FILE_KEY])
+    aFile = dataobj.get_shared_file_info(pathsTemp[A_FILE_KEY], fastFingerprint=runInfo[USE_FAST_FINGERPRINT_KEY])
     files[A_FILE_TITLE_KEY] = aFile.get_old_info_dictionary() # FUTURE move to actually using the file object to generate the report
     if aFile.file_object is None:
         LOG.warn("Unable to continue with comparison because file a (" + pathsTemp[A_FILE_KEY] + ") could not be opened.")
         sys.exit(1)
     LOG.info("Processing File B:")
-    bFile = dataobj.FileInfo(pathsTemp[B_FILE_KEY]) 
+    bFile = dataobj.get_shared_file_info(pathsTemp[B_FILE_KEY], fastFingerprint=runInfo[USE_FAST_FINGERPRINT_KEY])
     files[B_FILE_TITLE_KEY] = bFile.get_old_info_dictionary() # FUTURE move to actually using the file object to generate the report
     if bFile.file_object is None:
         LOG.warn("Unable to continue with comparison because file b (" + pathsTemp[B_FILE_KEY] + ") could not be opened.")
@@ -722,10 +1363,10 @@ def reportGen_library_call (a_path, b_path, var_list=[ ],
         LOG.warn(str(vce))
         exit(1)
     
-    # if there is an approved lon/lat shape, hang on to that for future checks
-    good_shape_from_lon_lat = None
-    if len(lon_lat_data.keys()) > 0:
-        good_shape_from_lon_lat = lon_lat_data[COMMON_KEY][LON_KEY].shape
+    # if we may reuse images from an earlier run, we need to be able to tell if the lon/lat changed
+    lonLatKey = None
+    if runInfo[USE_INCREMENTAL_REPORT_KEY] :
+        lonLatKey = hashlib.md5(_describe_for_cache(lon_lat_data)).hexdigest()
     
     # this will hold information for the summary report
     # it will be in the form
@@ -739,231 +1380,104 @@ def reportGen_library_call (a_path, b_path, var_list=[ ],
     
     # go through each of the possible variables in our files
     # and make a report section with images for whichever ones we can
-    for displayName in finalNames:
-        try:
-            # pull out the information for this variable analysis run
-            varRunInfo = finalNames[displayName].copy()
-            
-            # get the various names
-            technical_name, b_variable_technical_name, \
-                    explanationName = _get_name_info_for_variable(displayName, varRunInfo)
-            
-            # make sure that it's possible to load this variable
-            if not(aFile.file_object.is_loadable_type(technical_name)) or not(bFile.file_object.is_loadable_type(b_variable_technical_name)) :
-                LOG.warn(displayName + " is of a type that cannot be loaded using current file handling libraries included with Glance." +
-                        " Skipping " + displayName + ".")
-                continue
-            
-            LOG.info('analyzing: ' + explanationName)
-            
-            # load the variable data
-            aData = load_variable_data(aFile.file_object, technical_name,
-                                       dataFilter = varRunInfo[FILTER_FUNCTION_A_KEY] if FILTER_FUNCTION_A_KEY in varRunInfo else None,
-                                       variableToFilterOn = varRunInfo[VAR_FILTER_NAME_A_KEY] if VAR_FILTER_NAME_A_KEY in varRunInfo else None,
-                                       variableBasedFilter = varRunInfo[VAR_FILTER_FUNCTION_A_KEY] if VAR_FILTER_FUNCTION_A_KEY in varRunInfo else None,
-                                       altVariableFileObject = dataobj.FileInfo(varRunInfo[VAR_FILTER_ALT_FILE_A_KEY]).file_object if VAR_FILTER_ALT_FILE_A_KEY in varRunInfo else None,
-                                       fileDescriptionForDisplay = "file A")
-            bData = load_variable_data(bFile.file_object, b_variable_technical_name,
-                                       dataFilter = varRunInfo[FILTER_FUNCTION_B_KEY] if FILTER_FUNCTION_B_KEY in varRunInfo else None,
-                                       variableToFilterOn = varRunInfo[VAR_FILTER_NAME_B_KEY] if VAR_FILTER_NAME_B_KEY in varRunInfo else None,
-                                       variableBasedFilter = varRunInfo[VAR_FILTER_FUNCTION_B_KEY] if VAR_FILTER_FUNCTION_B_KEY in varRunInfo else None,
-                                       altVariableFileObject = dataobj.FileInfo(varRunInfo[VAR_FILTER_ALT_FILE_B_KEY]).file_object if VAR_FILTER_ALT_FILE_B_KEY in varRunInfo else None,
-                                       fileDescriptionForDisplay = "file B")
-            
-            # pre-check if this data should be plotted and if it should be compared to the longitude and latitude
-            include_images_for_this_variable = ((not(DO_MAKE_IMAGES_KEY in runInfo)) or (runInfo[DO_MAKE_IMAGES_KEY]))
-            if DO_MAKE_IMAGES_KEY in varRunInfo :
-                include_images_for_this_variable = varRunInfo[DO_MAKE_IMAGES_KEY]
-            do_not_test_with_lon_lat = (not include_images_for_this_variable) or (len(lon_lat_data.keys()) <= 0)
-            
-            # handle vector data
-            isVectorData = ( (MAGNITUDE_VAR_NAME_KEY   in varRunInfo) and (DIRECTION_VAR_NAME_KEY   in varRunInfo) and
-                             (MAGNITUDE_B_VAR_NAME_KEY in varRunInfo) and (DIRECTION_B_VAR_NAME_KEY in varRunInfo) )
-            
-            # check if this data can be displayed but
-            # don't compare lon/lat sizes if we won't be plotting
-            if ( (aData.shape == bData.shape) 
-                 and 
-                 ( do_not_test_with_lon_lat
-                  or
-                  ((aData.shape == good_shape_from_lon_lat) and (bData.shape == good_shape_from_lon_lat)) ) ) :
-                
-                # check to see if there is a directory to put information about this variable in,
-                # if not then create it
-                variableDir = os.path.join(pathsTemp[OUT_FILE_KEY], './' + displayName)
-                varRunInfo[VARIABLE_DIRECTORY_KEY] = variableDir
-                varRunInfo[VAR_REPORT_PATH_KEY] = quote(os.path.join(displayName, 'index.html'))
-                LOG.debug ("Directory selected for variable information: " + varRunInfo[VAR_REPORT_PATH_KEY])
-                setup_dir_if_needed(variableDir, "variable")
-                
-                # form the doc and config paths relative to where the variable is
-                upwardPath = './'
-                for number in range(len(displayName.split('/'))) : # TODO this is not general to windows
-                    upwardPath = os.path.join(upwardPath, '../')
-                varRunInfo[DOCUMENTATION_PATH_KEY]   = quote(os.path.join(upwardPath, 'doc.html'))
-                if CONFIG_FILE_NAME_KEY in runInfo :
-                    varRunInfo[CONFIG_FILE_PATH_KEY] = quote(os.path.join(upwardPath, runInfo[CONFIG_FILE_NAME_KEY]))
-                
-                # figure out the masks we want, and then do our statistical analysis
-                mask_a_to_use = None if do_not_test_with_lon_lat else lon_lat_data[A_FILE_KEY][INVALID_MASK_KEY]
-                mask_b_to_use = None if do_not_test_with_lon_lat else lon_lat_data[B_FILE_KEY][INVALID_MASK_KEY]
-                LOG.debug("Analyzing " + displayName + " statistically.")
-                variable_stats = statistics.StatisticalAnalysis.withSimpleData(aData, bData,
-                                                                               varRunInfo[FILL_VALUE_KEY], varRunInfo[FILL_VALUE_ALT_IN_B_KEY],
-                                                                               mask_a_to_use, mask_b_to_use,
-                                                                               varRunInfo[EPSILON_KEY], varRunInfo[EPSILON_PERCENT_KEY])
-                
-                # add a little additional info to our variable run info before we squirrel it away
-                varRunInfo[TIME_INFO_KEY] = datetime.datetime.ctime(datetime.datetime.now())  # todo is this needed?
-                didPass, epsilon_failed_fraction, \
-                         non_finite_fail_fraction, \
-                         r_squared_value = variable_stats.check_pass_or_fail(epsilon_failure_tolerance=varRunInfo[EPSILON_FAIL_TOLERANCE_KEY] if EPSILON_FAIL_TOLERANCE_KEY in varRunInfo else numpy.nan,
-                                                    epsilon_failure_tolerance_default=defaultValues[EPSILON_FAIL_TOLERANCE_KEY],
-                                                    non_finite_data_tolerance=varRunInfo[NONFINITE_TOLERANCE_KEY]  if NONFINITE_TOLERANCE_KEY in varRunInfo else numpy.nan,
-                                                    non_finite_data_tolerance_default=defaultValues[NONFINITE_TOLERANCE_KEY],
-                                                    total_data_failure_tolerance=varRunInfo[TOTAL_FAIL_TOLERANCE_KEY] if TOTAL_FAIL_TOLERANCE_KEY in varRunInfo else numpy.nan,
-                                                    total_data_failure_tolerance_default=defaultValues[TOTAL_FAIL_TOLERANCE_KEY],
-                                                    min_acceptable_r_squared=varRunInfo[MIN_OK_R_SQUARED_COEFF_KEY] if MIN_OK_R_SQUARED_COEFF_KEY in varRunInfo else numpy.nan,
-                                                    min_acceptable_r_squared_default=defaultValues[MIN_OK_R_SQUARED_COEFF_KEY],
-                                                    )
-                
-                varRunInfo[DID_VARIABLE_PASS_KEY] = didPass
-                # update the overall pass status
-                if didPass is not None :
-                    didPassAll = didPassAll & didPass
+    # (the next few variables may be read on background threads while each one is analyzed, and
+    # the figures for each variable are made while the variables after it are analyzed; a variable's
+    # report page is written once its figures are done, or when the figures that are still waiting
+    # would hold on to more than plot.FIGURE_MEMORY_BUDGET bytes of data)
+    def _analyze_variables_serially ( ) :
+        prefetcher = None
+        aFileObject, bFileObject = aFile.file_object, bFile.file_object
+        if runInfo[PREFETCH_DEPTH_KEY] > 0 :
+            # while the files are being read on other threads, everything done with them has to take turns
+            aFileObject, bFileObject = io.LockedFile(aFileObject), io.LockedFile(bFileObject)
+            prefetcher = VariablePrefetcher(_plan_report_reads(finalNames, aFileObject, bFileObject),
+                                            runInfo[PREFETCH_DEPTH_KEY])
+        figureRenderer  = _make_figure_renderer(runInfo)
+        waitingReports  = [ ]
+        def _is_done (figureJobs) :
+            return len([job for job in figureJobs if not job.is_done]) <= 0
+        try :
+            for index, displayName in enumerate(finalNames) :
+                if prefetcher is not None :
+                    prefetcher.advance(index)
+                # pull out the information for this variable analysis run
+                varRunInfo = finalNames[displayName].copy()
+                figureJobs, finishReport = _start_variable_report(displayName, varRunInfo, runInfo, defaultValues,
+                                                                  pathsTemp[OUT_FILE_KEY],
+                                                                  aFileObject, bFileObject,
+                                                                  files, lon_lat_data, spatialInfo,
+                                                                  lonLatKey=lonLatKey, prefetcher=prefetcher,
+                                                                  figureRenderer=figureRenderer)
+                waitingReports.append((displayName, varRunInfo, figureJobs, finishReport))
                 
-                # based on the settings and whether the variable passsed or failed,
-                # should we include images for this variable?
-                if (DO_IMAGES_ONLY_ON_FAIL_KEY in varRunInfo) and varRunInfo[DO_IMAGES_ONLY_ON_FAIL_KEY] :
-                    include_images_for_this_variable = include_images_for_this_variable and (not didPass)
-                    varRunInfo[DO_MAKE_IMAGES_KEY] = include_images_for_this_variable
-                
-                # to hold the names of any images created
-                image_names = {
-                                ORIGINAL_IMAGES_KEY: [ ],
-                                COMPARED_IMAGES_KEY: [ ]
-                                }
-                
-                # create the images for this variable
-                if (include_images_for_this_variable) :
-                    
-                    plotFunctionGenerationObjects = [ ]
-                    
-                    # if there's magnitude and direction data, figure out the u and v, otherwise these will be None
-                    aUData, aVData = get_UV_info_from_magnitude_direction_info (aFile.file_object,
-                                                                                varRunInfo[MAGNITUDE_VAR_NAME_KEY] if (MAGNITUDE_VAR_NAME_KEY) in varRunInfo else None,
-                                                                                varRunInfo[DIRECTION_VAR_NAME_KEY] if (DIRECTION_VAR_NAME_KEY) in varRunInfo else None,
-                                                                                lon_lat_data[A_FILE_KEY][INVALID_MASK_KEY]
-                                                                                if (A_FILE_KEY in lon_lat_data) and (INVALID_MASK_KEY in lon_lat_data[A_FILE_KEY]) else None)
-                    bUData, bVData = get_UV_info_from_magnitude_direction_info (bFile.file_object,
-                                                                                varRunInfo[MAGNITUDE_B_VAR_NAME_KEY] if (MAGNITUDE_B_VAR_NAME_KEY) in varRunInfo else None,
-                                                                                varRunInfo[DIRECTION_B_VAR_NAME_KEY] if (DIRECTION_B_VAR_NAME_KEY) in varRunInfo else None,
-                                                                                lon_lat_data[B_FILE_KEY][INVALID_MASK_KEY]
-                                                                                if (B_FILE_KEY in lon_lat_data) and (INVALID_MASK_KEY in lon_lat_data[B_FILE_KEY]) else None)
-                    
-                    # if the data is the same size, we can always make our basic statistical comparison plots
-                    if (aData.shape == bData.shape) :
-                        plotFunctionGenerationObjects.append(plotcreate.BasicComparisonPlotsFunctionFactory())
-                    
-                    # if the bin and tuple are defined, try to analyze the data as complex
-                    # multidimentional information requiring careful sampling
-                    if (BIN_INDEX_KEY in varRunInfo) and (TUPLE_INDEX_KEY in varRunInfo) :
-                        plotFunctionGenerationObjects.append(plotcreate.BinTupleAnalysisFunctionFactory())
-                        
-                    else : # if it's not bin/tuple, there are lots of other posibilities
-                        
-                        # if it's vector data with longitude and latitude, quiver plot it on the Earth
-                        if isVectorData and (not do_not_test_with_lon_lat) :
-                            plotFunctionGenerationObjects.append(plotcreate.MappedQuiverPlotFunctionFactory())
-                        
-                        # if the data is one dimensional we can plot it as lines
-                        elif   (len(aData.shape) is 1) : 
-                            plotFunctionGenerationObjects.append(plotcreate.LinePlotsFunctionFactory())
-                        
-                        # if the data is 2D we have some options based on the type of data
-                        elif (len(aData.shape) is 2) :
-                            
-                            # if the data is not mapped to a longitude and latitude, just show it as an image
-                            if (do_not_test_with_lon_lat) :
-                                plotFunctionGenerationObjects.append(plotcreate.IMShowPlotFunctionFactory())
-                            
-                            # if it's 2D and mapped to the Earth, contour plot it on the earth
-                            else :
-                                plotFunctionGenerationObjects.append(plotcreate.MappedContourPlotFunctionFactory())
-                    
-                    # plot our lon/lat related info
-                    image_names[ORIGINAL_IMAGES_KEY], image_names[COMPARED_IMAGES_KEY] = \
-                        plot.plot_and_save_comparison_figures \
-                                (aData, bData,
-                                 plotFunctionGenerationObjects,
-                                 varRunInfo[VARIABLE_DIRECTORY_KEY],
-                                 displayName,
-                                 varRunInfo[EPSILON_KEY],
-                                 varRunInfo[FILL_VALUE_KEY],
-                                 missingValueAltInB = varRunInfo[FILL_VALUE_ALT_IN_B_KEY] if FILL_VALUE_ALT_IN_B_KEY in varRunInfo else None,
-                                 lonLatDataDict=lon_lat_data,
-                                 dataRanges     = varRunInfo[DISPLAY_RANGES_KEY]       if DISPLAY_RANGES_KEY       in varRunInfo else None,
-                                 dataRangeNames = varRunInfo[DISPLAY_RANGE_NAMES_KEY]  if DISPLAY_RANGE_NAMES_KEY  in varRunInfo else None,
-                                 dataColors     = varRunInfo[DISPLAY_RANGE_COLORS_KEY] if DISPLAY_RANGE_COLORS_KEY in varRunInfo else None,
-                                 makeSmall=True,
-                                 doFork=runInfo[DO_MAKE_FORKS_KEY],
-                                 shouldClearMemoryWithThreads=runInfo[DO_CLEAR_MEM_THREADED_KEY],
-                                 shouldUseSharedRangeForOriginal=runInfo[USE_SHARED_ORIG_RANGE_KEY],
-                                 doPlotSettingsDict = varRunInfo,
-                                 aUData=aUData, aVData=aVData,
-                                 bUData=bUData, bVData=bVData,
-                                 binIndex=      varRunInfo[BIN_INDEX_KEY]       if BIN_INDEX_KEY       in varRunInfo else None,
-                                 tupleIndex=    varRunInfo[TUPLE_INDEX_KEY]     if TUPLE_INDEX_KEY     in varRunInfo else None,
-                                 binName=       varRunInfo[BIN_NAME_KEY]        if BIN_NAME_KEY        in varRunInfo else 'bin',
-                                 tupleName=     varRunInfo[TUPLE_NAME_KEY]      if TUPLE_NAME_KEY      in varRunInfo else 'tuple',
-                                 epsilonPercent=varRunInfo[EPSILON_PERCENT_KEY] if EPSILON_PERCENT_KEY in varRunInfo else None,
-                                 fullDPI=       runInfo[DETAIL_DPI_KEY],
-                                 thumbDPI=      runInfo[THUMBNAIL_DPI_KEY],
-                                 units_a=       varRunInfo[VAR_UNITS_A_KEY]     if VAR_UNITS_A_KEY     in varRunInfo else None,
-                                 units_b=       varRunInfo[VAR_UNITS_B_KEY]     if VAR_UNITS_B_KEY     in varRunInfo else None,
-                                )#histRange=     varRunInfo[HISTOGRAM_RANGE_KEY] if HISTOGRAM_RANGE_KEY in varRunInfo else None)
-                    
-                    LOG.info("\tfinished creating figures for: " + explanationName)
-                
-                # create the report page for this variable
-                if (runInfo[DO_MAKE_REPORT_KEY]) :
-                    
-                    # hang on to our good % and other info to describe our comparison
-                    epsilonPassedPercent = (1.0 -  epsilon_failed_fraction) * 100.0
-                    finitePassedPercent  = (1.0 - non_finite_fail_fraction) * 100.0 
-                    variableComparisons[displayName] = {
-                                                        PASSED_EPSILON_PERCENT_KEY: epsilonPassedPercent,
-                                                        FINITE_SIMILAR_PERCENT_KEY: finitePassedPercent,
-                                                        R_SQUARED_COEFF_VALUE_KEY:  r_squared_value,
-                                                        VARIABLE_RUN_INFO_KEY:      varRunInfo
-                                                        }
-                    
-                    LOG.info ('\tgenerating report for: ' + explanationName) 
-                    report.generate_and_save_variable_report(files,
-                                                             varRunInfo, runInfo,
-                                                             variable_stats.dictionary_form(),
-                                                             spatialInfo,
-                                                             image_names,
-                                                             varRunInfo[VARIABLE_DIRECTORY_KEY], "index.html")
+                # finish the reports we can, in order
+                while (len(waitingReports) > 0) and (_is_done(waitingReports[0][2]) or
+                                                     (figureRenderer.outstanding_data_bytes() > plot.FIGURE_MEMORY_BUDGET)) :
+                    waitingDisplayName, waitingRunInfo, _, waitingFinish = waitingReports.pop(0)
+                    yield waitingDisplayName, waitingRunInfo, waitingFinish()
             
-            # if we can't compare the variable, we should tell the user 
-            else :
-                message = (explanationName + ' ' + 
-                         'could not be compared. This may be because the data for this variable does not match in shape ' +
-                         'between the two files (file A data shape: ' + str(aData.shape) + '; file B data shape: '
-                         + str(bData.shape) + ')')
-                if do_not_test_with_lon_lat :
-                    message = message + '.'
-                else :
-                    message = (message + ' or the data may not match the shape of the selected '
-                         + 'longitude ' + str(good_shape_from_lon_lat) + ' and '
-                         + 'latitude '  + str(good_shape_from_lon_lat) + ' variables.')
-                LOG.warn(message)
-        except ValueErrorStringToFloat as e:
-            LOG.warn("Unable to compare "+displayName+": "+str(e))
-
+            # then wait for the rest of the figures
+            for waitingDisplayName, waitingRunInfo, _, waitingFinish in waitingReports :
+                yield waitingDisplayName, waitingRunInfo, waitingFinish()
+        finally :
+            figureRenderer.close()
+            if prefetcher is not None :
+                prefetcher.close()
+    
+    # or hand the variables out to a pool of worker processes, each of which will
+    # open its own copies of the files; the results come back in the same order
+    def _analyze_variables_in_parallel (numberOfWorkers) :
+        sharedState = {
+                       'paths':           pathsTemp,
+                       'finalNames':      finalNames,
+                       'runInfo':         runInfo,
+                       'defaultValues':   defaultValues,
+                       'files':           files,
+                       'lon_lat_data':    lon_lat_data,
+                       'spatialInfo':     spatialInfo,
+                       'lonLatKey':       lonLatKey,
+                       'numberOfWorkers': numberOfWorkers,
+                      }
+        for displayName, result, changedRunInfo in _run_with_worker_pool(numberOfWorkers, _report_worker_task,
+                                                                          list(finalNames), sharedState) :
+            varRunInfo = finalNames[displayName].copy()
+            varRunInfo.update(changedRunInfo)
+            yield displayName, varRunInfo, result
+    
+    numberOfWorkers = runInfo[NUM_WORKERS_KEY] if NUM_WORKERS_KEY in runInfo else 1
+    if (numberOfWorkers > 1) and (len(finalNames) > 1) :
+        LOG.info("Analyzing variables using " + str(numberOfWorkers) + " worker processes.")
+        variableResults = _analyze_variables_in_parallel(numberOfWorkers)
+    else :
+        variableResults = _analyze_variables_serially()
+    
+    reusedCount, regeneratedCount = 0, 0
+    for displayName, varRunInfo, result in variableResults :
+        
+        # skip any variables that couldn't be compared
+        if result is None :
+            continue
+        didPass, comparisonSummary = result
+        
+        # keep track of how much of the output was reused
+        reusedCount      += varRunInfo.get(REUSED_OUTPUT_COUNT_KEY,      0)
+        regeneratedCount += varRunInfo.get(REGENERATED_OUTPUT_COUNT_KEY, 0)
+        
+        # update the overall pass status
+        if didPass is not None :
+            didPassAll = didPassAll & didPass
+        
+        # hang on to the info for the summary report
+        if comparisonSummary is not None :
+            comparisonSummary[VARIABLE_RUN_INFO_KEY] = varRunInfo
+            variableComparisons[displayName] = comparisonSummary
+    
     # the end of the loop to examine all the variables
     
+    if runInfo[USE_INCREMENTAL_REPORT_KEY] :
+        LOG.info("Reused " + str(reusedCount) + " up to date variable report pages and sets of figures, regenerated "
+                 + str(regeneratedCount) + ".")
+    
     # generate our general report pages once we've analyzed all the variables
     if (runInfo[DO_MAKE_REPORT_KEY]) :
         
@@ -983,6 +1497,11 @@ def reportGen_library_call (a_path, b_path, var_list=[ ],
         LOG.info ('generating glossary')
         report.generate_and_save_doc_page(statistics.StatisticalAnalysis.doc_strings(), pathsTemp[OUT_FILE_KEY])
     
+    # we're done with the files, so close them up
+    dataobj.close_shared_file(pathsTemp[A_FILE_KEY])
+    dataobj.close_shared_file(pathsTemp[B_FILE_KEY])
+    log_and_clear_decoded_variable_cache()
+    
     returnCode = 0 if didPassAll else 2 # return 2 only if some of the variables failed
     
     # if we are reporting the pass / fail, return an appropriate status code
@@ -990,6 +1509,155 @@ def reportGen_library_call (a_path, b_path, var_list=[ ],
         LOG.debug("Pass/Fail return code: " + str(returnCode))
         return returnCode
 
+def _get_stats_text_for_variable (name, epsilon, missing, aFile, bFile, do_pass_fail, doc_each, chunk_settings=None, prefetcher=None) :
+    """
+    load and compare one variable for the stats command
+    
+    if the variable can't be loaded, None will be returned, otherwise the return will
+    be in the form (statsText, didPass), where statsText is the text that stats should
+    print for this variable and didPass is None if pass/fail testing isn't being done
+    
+    if chunk_settings are given, variables with more data points than the CHUNKED_COMPARISON_KEY
+    size will be read and compared a chunk at a time rather than being loaded all at once; the
+    chunk_settings should also include the QUANTILE_ERROR_KEY and the NUM_WORKERS_KEY to use
+    for the chunks, as well as the A_FILE_KEY and B_FILE_KEY paths if more than one worker is used
+    
+    if a load.VariablePrefetcher is given, variables that aren't compared in chunks will be taken from it
+    """
+    
+    # information for testing pass/fail if needed
+    epsilon_fail_tolerance   = 0.0
+    nonfinite_fail_tolerance = 0.0
+    
+    # make sure that it's possible to load this variable
+    if not(aFile.is_loadable_type(name)) or not(bFile.is_loadable_type(name)) :
+        LOG.warn(name + " is of a type that cannot be loaded using current file handling libraries included with Glance." +
+                " Skipping " + name + ".")
+        return None
+    
+    # buffer the output so it can be printed in order
+    output_channel = StringIO()
+    
+    if missing is None:
+        amiss = aFile.missing_value(name)
+        bmiss = bFile.missing_value(name)
+    else:
+        amiss,bmiss = missing,missing
+    LOG.debug('comparing %s with epsilon %s and missing %s,%s' % (name,epsilon,amiss,bmiss))
+    print >> output_channel, '-'*32
+    print >> output_channel, name
+    print >> output_channel, ''
+    
+    # if the variable is too big to comfortably hold in memory, compare it a chunk at a time
+    shape = None
+    if chunk_settings is not None :
+        chunk_size = chunk_settings[CHUNKED_COMPARISON_KEY]
+        shape      = aFile.variable(name).shape
+        if (shape != bFile.variable(name).shape) or (prod(shape) <= chunk_size) :
+            shape = None
+    if shape is not None :
+        LOG.info("comparing " + name + " in chunks of up to " + str(chunk_size) + " points")
+        
+        # summarize the chunks in a pool of worker processes and put the summaries together
+        if chunk_settings[NUM_WORKERS_KEY] > 1 :
+            sharedState = {
+                           'paths':          {A_FILE_KEY: chunk_settings[A_FILE_KEY], B_FILE_KEY: chunk_settings[B_FILE_KEY]},
+                           'quantile_error': chunk_settings[QUANTILE_ERROR_KEY],
+                          }
+            chunkTasks  = ((name, chunkIndex, region, amiss, bmiss, epsilon) for chunkIndex, region in
+                           enumerate(get_chunk_regions(shape, chunk_size)))
+            summaries   = _run_with_worker_pool(chunk_settings[NUM_WORKERS_KEY], _stats_chunk_worker_task, chunkTasks, sharedState)
+            variable_stats = statistics.StatisticalAnalysis.withChunkSummaries(summaries, shape, amiss, bmiss, epsilon=epsilon)
+        
+        # or go through the chunks one at a time
+        else :
+            dataChunks = ((aChunk, bChunk) for (_, aChunk), (_, bChunk) in
+                          izip(load_variable_chunks(aFile, name, chunk_size, fileDescriptionForDisplay="file A"),
+                               load_variable_chunks(bFile, name, chunk_size, fileDescriptionForDisplay="file B")))
+            variable_stats = statistics.StatisticalAnalysis.withChunkedData(dataChunks, shape, amiss, bmiss, epsilon=epsilon,
+                                                                            quantile_error=chunk_settings[QUANTILE_ERROR_KEY])
+    else :
+        aPacking = load_packed_variable_data(aFile, name, fileDescriptionForDisplay="file A", prefetcher=prefetcher)
+        bPacking = load_packed_variable_data(bFile, name, fileDescriptionForDisplay="file B", prefetcher=prefetcher)
+        if prefetcher is not None :
+            aData = aPacking.unpack() if aPacking is not None else prefetcher.get(aFile, name)
+            bData = bPacking.unpack() if bPacking is not None else prefetcher.get(bFile, name)
+        else :
+            aData = aPacking.unpack() if aPacking is not None else aFile[name]
+            bData = bPacking.unpack() if bPacking is not None else bFile[name]
+        variable_stats = statistics.StatisticalAnalysis.withSimpleData(aData, bData, amiss, bmiss, epsilon=epsilon,
+                                                                       a_packing=aPacking, b_packing=bPacking)
+    # if we're doing pass/fail testing, do that now
+    didPass = None
+    if do_pass_fail :
+        
+        tempDefaults = config_organizer.get_simple_variable_defaults()
+        didPass, _, _, _ = variable_stats.check_pass_or_fail(epsilon_failure_tolerance=epsilon_fail_tolerance,
+                                                             epsilon_failure_tolerance_default=tempDefaults[EPSILON_FAIL_TOLERANCE_KEY],
+                                                             non_finite_data_tolerance=nonfinite_fail_tolerance,
+                                                             non_finite_data_tolerance_default=tempDefaults[NONFINITE_TOLERANCE_KEY],
+                                                             total_data_failure_tolerance_default=tempDefaults[TOTAL_FAIL_TOLERANCE_KEY],
+                                                             min_acceptable_r_squared_default=tempDefaults[MIN_OK_R_SQUARED_COEFF_KEY],
+                                                            )
+    lal = list(variable_stats.dictionary_form().items())
+    #lal = list(statistics.summarize(aData, bData, epsilon, (amiss,bmiss)).items()) 
+    lal.sort()
+    for dictionary_title, dict_data in lal:
+        print >> output_channel, '%s' %  dictionary_title
+        dict_data
+        for each_stat in sorted(list(dict_data)):
+            print >> output_channel, '  %s: %s' % (each_stat, dict_data[each_stat])
+            if doc_each: print >> output_channel, ('    ' + statistics.StatisticalAnalysis.doc_strings()[each_stat])
+        print >> output_channel, '' 
+    
+    return output_channel.getvalue(), didPass
+
+def _get_stats_text_serially (sortedNames, aFile, bFile, do_pass_fail, doc_each, chunk_settings, prefetchDepth) :
+    """
+    yield the results of _get_stats_text_for_variable for each of the variables in turn; if the
+    prefetch depth is more than 0 (and the variables aren't being compared in chunks) the next few
+    variables are read on background threads while each one is compared
+    """
+    
+    prefetcher = None
+    if (prefetchDepth > 0) and (chunk_settings is None) :
+        # while the files are being read on other threads, everything done with them has to take turns
+        aFile, bFile = io.LockedFile(aFile), io.LockedFile(bFile)
+        packed       = hasattr(aFile, 'get_variable_region_packed') and hasattr(bFile, 'get_variable_region_packed')
+        plannedReads = [[(aFile, name, packed), (bFile, name, packed)] for name, _, _ in sortedNames]
+        prefetcher   = VariablePrefetcher(plannedReads, prefetchDepth)
+    
+    try :
+        for index, (name, epsilon, missing) in enumerate(sortedNames) :
+            if prefetcher is not None :
+                prefetcher.advance(index)
+            yield _get_stats_text_for_variable(name, epsilon, missing, aFile, bFile, do_pass_fail, doc_each,
+                                               chunk_settings, prefetcher=prefetcher)
+    finally :
+        if prefetcher is not None :
+            prefetcher.close()
+
+def _stats_worker_task ((name, epsilon, missing)) :
+    """
+    compare one variable in a stats worker process
+    """
+    
+    return _get_stats_text_for_variable(name, epsilon, missing,
+                                        _worker_state[A_FILE_KEY], _worker_state[B_FILE_KEY],
+                                        _worker_state['do_pass_fail'], _worker_state['doc_each'])
+
+def _stats_chunk_worker_task ((name, chunkIndex, region, amiss, bmiss, epsilon)) :
+    """
+    load one region of a variable from this worker's files and summarize the comparison
+    of that chunk, so the summaries of all the chunks can be merged by the stats command
+    """
+    
+    aChunk = load_variable_region(_worker_state[A_FILE_KEY], name, region, fileDescriptionForDisplay="file A")
+    bChunk = load_variable_region(_worker_state[B_FILE_KEY], name, region, fileDescriptionForDisplay="file B")
+    
+    return statistics.summarize_data_chunks([(aChunk, bChunk)], amiss, bmiss, epsilon=epsilon,
+                                            quantile_error=_worker_state['quantile_error'], seed=chunkIndex)
+
 def stats_library_call(afn, bfn, var_list=[ ],
                        options_set={ },
                        do_document=False,
@@ -1005,6 +1673,9 @@ def stats_library_call(afn, bfn, var_list=[ ],
     epsilon_val  = options_set[EPSILON_KEY]
     missing_val  = options_set[OPTIONS_FILL_VALUE_KEY]
     do_pass_fail = options_set[DO_TEST_PASSFAIL_KEY]
+    chunk_size   = options_set[CHUNKED_COMPARISON_KEY] if CHUNKED_COMPARISON_KEY in options_set else None
+    quant_error  = options_set[QUANTILE_ERROR_KEY]     if QUANTILE_ERROR_KEY     in options_set else None
+    prefetch     = options_set[PREFETCH_DEPTH_KEY]     if PREFETCH_DEPTH_KEY     in options_set else 0
     
     LOG.debug ("file a: " + afn)
     LOG.debug ("file b: " + bfn)
@@ -1016,8 +1687,6 @@ def stats_library_call(afn, bfn, var_list=[ ],
     
     # information for testing pass/fail if needed
     has_failed = False
-    epsilon_fail_tolerance   = 0.0
-    nonfinite_fail_tolerance = 0.0
     
     # figure out the variable names and their individual settings
     if len(var_list) <= 0 :
@@ -1027,51 +1696,53 @@ def stats_library_call(afn, bfn, var_list=[ ],
     doc_each  = do_document and len(names)==1
     doc_atend = do_document and len(names)!=1
 
-    for name, epsilon, missing in sorted(names, key=lambda X:X[0]):
+    # analyze the variables one at a time, or in a pool of worker processes
+    # that each open their own copies of the files; either way the output for
+    # each variable is buffered and printed in sorted order
+    sortedNames     = sorted(names, key=lambda X:X[0])
+    numberOfWorkers = options_set[NUM_WORKERS_KEY] if NUM_WORKERS_KEY in options_set else 1
+    
+    # when large variables are compared in chunks, the workers split up the chunks instead
+    chunk_settings  = None
+    if chunk_size is not None :
+        chunk_settings = {
+                          CHUNKED_COMPARISON_KEY: chunk_size,
+                          QUANTILE_ERROR_KEY:     quant_error if quant_error is not None else statistics.DEFAULT_QUANTILE_ERROR,
+                          NUM_WORKERS_KEY:        numberOfWorkers,
+                          A_FILE_KEY:             afn,
+                          B_FILE_KEY:             bfn,
+                         }
+    
+    if (numberOfWorkers > 1) and (len(sortedNames) > 1) and (chunk_settings is None) :
+        LOG.info("Analyzing variables using " + str(numberOfWorkers) + " worker processes.")
+        sharedState = {
+                       'paths':        {A_FILE_KEY: afn, B_FILE_KEY: bfn},
+                       'do_pass_fail': do_pass_fail,
+                       'doc_each':     doc_each,
+                      }
+        variableResults = _run_with_worker_pool(numberOfWorkers, _stats_worker_task, sortedNames, sharedState)
+    else :
+        variableResults = _get_stats_text_serially(sortedNames, aFile, bFile, do_pass_fail, doc_each, chunk_settings, prefetch)
+    
+    for result in variableResults :
         
-        # make sure that it's possible to load this variable
-        if not(aFile.is_loadable_type(name)) or not(bFile.is_loadable_type(name)) :
-            LOG.warn(name + " is of a type that cannot be loaded using current file handling libraries included with Glance." +
-                    " Skipping " + name + ".")
+        # skip any variables that couldn't be loaded
+        if result is None :
             continue
+        statsText, didPass = result
         
-        aData = aFile[name]
-        bData = bFile[name]
-        if missing is None:
-            amiss = aFile.missing_value(name)
-            bmiss = bFile.missing_value(name)
-        else:
-            amiss,bmiss = missing,missing
-        LOG.debug('comparing %s with epsilon %s and missing %s,%s' % (name,epsilon,amiss,bmiss))
-        print >> output_channel, '-'*32
-        print >> output_channel, name
-        print >> output_channel, ''
-        variable_stats = statistics.StatisticalAnalysis.withSimpleData(aData, bData, amiss, bmiss, epsilon=epsilon)
-        # if we're doing pass/fail testing, do that now
+        output_channel.write(statsText)
         if do_pass_fail :
-            
-            tempDefaults = config_organizer.get_simple_variable_defaults()
-            didPass, _, _, _ = variable_stats.check_pass_or_fail(epsilon_failure_tolerance=epsilon_fail_tolerance,
-                                                                 epsilon_failure_tolerance_default=tempDefaults[EPSILON_FAIL_TOLERANCE_KEY],
-                                                                 non_finite_data_tolerance=nonfinite_fail_tolerance,
-                                                                 non_finite_data_tolerance_default=tempDefaults[NONFINITE_TOLERANCE_KEY],
-                                                                 total_data_failure_tolerance_default=tempDefaults[TOTAL_FAIL_TOLERANCE_KEY],
-                                                                 min_acceptable_r_squared_default=tempDefaults[MIN_OK_R_SQUARED_COEFF_KEY],
-                                                                )
             has_failed = has_failed or not(didPass)
-        lal = list(variable_stats.dictionary_form().items())
-        #lal = list(statistics.summarize(aData, bData, epsilon, (amiss,bmiss)).items()) 
-        lal.sort()
-        for dictionary_title, dict_data in lal:
-            print >> output_channel, '%s' %  dictionary_title
-            dict_data
-            for each_stat in sorted(list(dict_data)):
-                print >> output_channel, '  %s: %s' % (each_stat, dict_data[each_stat])
-                if doc_each: print >> output_channel, ('    ' + statistics.StatisticalAnalysis.doc_strings()[each_stat])
-            print >> output_channel, '' 
     if doc_atend:
         print >> output_channel, ('\n\n' + statistics.STATISTICS_DOC_STR)
     
+    # we're done with the files, so close them up (if a file was compared to itself it was only opened once)
+    for fileName in set([afn, bfn]) :
+        if hasattr(filesInfo[fileName][FILE_OBJECT_KEY], 'close') :
+            filesInfo[fileName][FILE_OBJECT_KEY].close()
+    log_and_clear_decoded_variable_cache()
+    
     # if we are doing pass/fail, we need to return a status code
     if do_pass_fail :
         status_code = 0
@@ -1136,6 +1807,162 @@ def inspect_stats_library_call (afn, var_list=[ ], options_set={ }, do_document=
     if doc_atend:
         print >> output_channel, ('\n\n' + statistics.INSP_STATISTICS_DOC_STR)
 
+def read_batch_manifest (manifestPath) :
+    """
+    read a batch manifest listing the pairs of files to compare
+    
+    each line of the manifest should hold the path to an A file, the path to a B file,
+    and the path to the output directory for that pair, separated by whitespace;
+    blank lines and lines starting with # will be ignored
+    
+    the return will be a list of (aPath, bPath, outputPath) tuples
+    """
+    
+    filePairs = [ ]
+    manifestFile = open(manifestPath, 'r')
+    for lineNumber, line in enumerate(manifestFile) :
+        line = line.strip()
+        if (len(line) <= 0) or line.startswith('#') :
+            continue
+        
+        parts = line.split()
+        if len(parts) != 3 :
+            manifestFile.close()
+            raise ValueError("Line " + str(lineNumber + 1) + " of batch manifest " + manifestPath +
+                             " should contain an A file, a B file, and an output directory.")
+        filePairs.append(tuple(clean_path(part) for part in parts))
+    manifestFile.close()
+    
+    return filePairs
+
+def _describe_variable_for_info (fileObject, name) :
+    """
+    get the shape and type of a variable as strings for parsable info output,
+    without reading the variable's data; either may be empty if the file can't
+    tell us cheaply
+    """
+    
+    shape = None
+    varType = None
+    
+    # h5 files keep an inventory with all of this already in it
+    if hasattr(fileObject, 'get_variable_info') :
+        variableInfo = fileObject.get_variable_info(name)
+        if variableInfo is not None :
+            shape = variableInfo.shape
+            varType = variableInfo.dtype
+    
+    try :
+        if shape is None :
+            shape = fileObject.get_variable_shape(name)
+        if varType is None :
+            varType = getattr(fileObject.get_variable_object(name), 'dtype', None)
+    except Exception, e :
+        LOG.debug('Unable to describe variable ' + name + ': ' + str(e))
+    
+    shapeText = 'x'.join(str(size) for size in shape) if shape is not None else ''
+    typeText  = str(dtype(varType)) if varType is not None else ''
+    
+    return shapeText, typeText
+
+def _compare_batch_pair (commandName, aPath, bPath, outputPath) :
+    """
+    run one pair of files from a batch with the given command ('reportGen' or 'stats')
+    
+    the return will be the command's pass/fail status code or None if
+    the comparison could not be completed
+    """
+    
+    LOG.info("Comparing " + aPath + " and " + bPath + " (output in " + outputPath + ")")
+    try :
+        if commandName == 'reportGen' :
+            loadedConfig = config_organizer.copy_loaded_config_for_files(_worker_state['loaded_config'],
+                                                                         aPath, bPath, outputPath)
+            return reportGen_library_call(aPath, bPath, _worker_state['var_list'], _worker_state['options'],
+                                          loaded_config=loadedConfig)
+        else :
+            setup_dir_if_needed(outputPath, "output")
+            statsFile = open(os.path.join(outputPath, "stats.txt"), "w")
+            try :
+                return stats_library_call(aPath, bPath, _worker_state['var_list'], _worker_state['options'],
+                                          output_channel=statsFile)
+            finally :
+                statsFile.close()
+    # library calls exit when they can't open files, so catch that along with everything else
+    except (Exception, SystemExit), err :
+        LOG.warn("Unable to compare " + aPath + " and " + bPath + ": " + str(err))
+        return None
+
+def _batch_worker_task ((commandName, aPath, bPath, outputPath)) :
+    """
+    compare one pair of files in a batch worker process
+    """
+    
+    return _compare_batch_pair(commandName, aPath, bPath, outputPath)
+
+def batch_library_call (commandName, filePairs, var_list=[ ], options_set={ }, output_channel=sys.stdout) :
+    """
+    run the reportGen or stats command on each of a list of (aPath, bPath, outputPath) file pairs
+    in a single process (or a single pool of worker processes if the options request more than one
+    worker), loading the settings and any config file only once
+    
+    a tab separated summary line will be printed to the output_channel for each pair in the form:
+        status  returnCode  aPath  bPath  outputPath
+    where the status is PASS, FAIL, or ERROR (if the pair could not be compared)
+    
+    the return will be 0 if all the pairs passed, 1 if any could not be compared,
+    or otherwise the failing return code of the command
+    """
+    
+    assert(commandName in ('reportGen', 'stats'))
+    
+    # everything is tested for pass/fail so the summary can be made
+    options_set = options_set.copy()
+    options_set[DO_TEST_PASSFAIL_KEY] = True
+    numberOfWorkers = options_set[NUM_WORKERS_KEY] if NUM_WORKERS_KEY in options_set else 1
+    
+    # load the settings once; the individual pairs are each handled by a single process
+    sharedState = {
+                   'paths':    { },
+                   'var_list': var_list,
+                   'options':  options_set,
+                  }
+    if (commandName == 'reportGen') and (len(filePairs) > 0) :
+        firstA, firstB, firstOut = filePairs[0]
+        loadedConfig = config_organizer.load_config_or_options(firstA, firstB, options_set, requestedVars = var_list)
+        loadedConfig[1][NUM_WORKERS_KEY] = 1
+        sharedState['loaded_config'] = loadedConfig
+    options_set[NUM_WORKERS_KEY] = 1
+    
+    taskArguments = [(commandName, aPath, bPath, outputPath) for aPath, bPath, outputPath in filePairs]
+    if (numberOfWorkers > 1) and (len(filePairs) > 1) :
+        LOG.info("Comparing file pairs using " + str(numberOfWorkers) + " worker processes.")
+        pairResults = _run_with_worker_pool(numberOfWorkers, _batch_worker_task, taskArguments, sharedState)
+    else :
+        _worker_state.update(sharedState)
+        pairResults = (_compare_batch_pair(*taskArgument) for taskArgument in taskArguments)
+    
+    batchReturnCode = 0
+    try :
+        for (aPath, bPath, outputPath), returnCode in izip(filePairs, pairResults) :
+            
+            if returnCode is None :
+                status = 'ERROR'
+                batchReturnCode = 1
+            elif returnCode == 0 :
+                status = 'PASS'
+            else :
+                status = 'FAIL'
+                if batchReturnCode == 0 :
+                    batchReturnCode = returnCode
+            
+            print >> output_channel, '\t'.join([status, str(returnCode), aPath, bPath, outputPath])
+            output_channel.flush()
+    finally :
+        _worker_state.clear()
+    
+    return batchReturnCode
+
 def main():
     import optparse
     usage = """
@@ -1189,10 +2016,12 @@ glance inspectStats A.hdf
         problems = 0
         for fn in args:
             try :
-                lal = list(io.open(fn)())
+                fileObject = io.open(fn)
+                lal = list(fileObject())
                 lal.sort()
                 if options.parsable_output:
-                    print "".join(map(lambda x: fn+"\t"+x+"\n", lal))
+                    # file, variable name, shape (like 500x400) and type, tab separated
+                    print "".join(map(lambda x: "\t".join((fn, x) + _describe_variable_for_info(fileObject, x)) + "\n", lal))
                 else:
                     print fn + ': ' + ('\n  ' + ' '*len(fn)).join(lal)
             except KeyError :
@@ -1438,6 +2267,45 @@ glance inspectStats A.hdf
         
         colocateToFile_library_call(a_path, b_path, args[2:], tempOptions)
     
+    def batch(*args) :
+        """compare many pairs of files
+        This option runs the reportGen or stats command on each pair of files listed in a manifest file,
+        loading glance and any configuration file only once.
+        
+        Each line of the manifest should hold the path to an A file, the path to a B file, and the path to
+        the output directory for that pair, separated by whitespace. Blank lines and lines starting with #
+        will be ignored. reportGen will put its report in the output directory for each pair and stats will
+        put its output in a stats.txt file in the output directory for each pair.
+        
+        Variables to be compared may be specified after the manifest file, as they would be for the reportGen
+        or stats commands. A configuration file given with --configfile will be used for every pair.
+        Pass/fail testing is always done; use --workers to compare more than one pair at a time.
+        
+        A tab separated summary line will be printed for each pair in the form:
+            status  returnCode  fileA  fileB  outputDirectory
+        where the status is PASS, FAIL, or ERROR (if the pair could not be compared).
+        
+        Examples:
+         glance batch reportGen manifest.txt
+         glance batch stats manifest.txt variable_name_1:epsilon1: variable_name_2
+         glance batch --workers=8 --configfile=config.py reportGen manifest.txt
+        """
+        
+        commandName = { 'reportgen': 'reportGen', 'stats': 'stats' }.get(args[0].lower(), None) if len(args) > 0 else None
+        if (commandName is None) or (len(args) < 2) :
+            LOG.warn("The batch command requires a command (reportGen or stats) and a manifest file.")
+            return 1
+        
+        tempOptions = config_organizer.convert_options_to_dict(options)
+        
+        try :
+            filePairs = read_batch_manifest(clean_path(args[1]))
+        except (IOError, ValueError), err :
+            LOG.warn("Unable to read batch manifest: " + str(err))
+            return 1
+        
+        return batch_library_call(commandName, filePairs, list(args[2:]), tempOptions)
+    
     # Note: the figure plotting in the GUI is dependant on having selected an interactive renderer in the first "use"
     # statement at the beginning of this module. (It had to be moved into this module to pre-empt other use statempents
     # from imports of other glance modules.)
@@ -10,7 +10,7 @@ Created by evas Dec 2012.
 Copyright (c) 2012 University of Wisconsin SSEC. All rights reserved.
 """
 
-import os, sys, imp, logging, re
+import os, sys, imp, logging, re, copy
 
 import glance.io as io
 from glance.constants import *
@@ -24,9 +24,18 @@ glance_setting_defaults = {
                            DO_MAKE_REPORT_KEY:         True,
                            DO_MAKE_IMAGES_KEY:         False,
                            DO_MAKE_FORKS_KEY:          False,
+                           NUM_WORKERS_KEY:            1,
                            DO_CLEAR_MEM_THREADED_KEY:  False,
                            USE_SHARED_ORIG_RANGE_KEY:  False,
                            USE_NO_LON_OR_LAT_VARS_KEY: False,
+                           USE_LEGACY_COLOCATION_KEY:  False,
+                           USE_COLOCATION_CACHE_KEY:   True,
+                           USE_FAST_FINGERPRINT_KEY:   False,
+                           USE_STATISTICS_CACHE_KEY:   False,
+                           USE_INCREMENTAL_REPORT_KEY: False,
+                           PREFETCH_DEPTH_KEY:         0,
+                           FIGURE_WORKERS_KEY:         None,
+                           FIGURE_TIMEOUT_KEY:         None,
                            DETAIL_DPI_KEY:             150,
                            THUMBNAIL_DPI_KEY:          50
                           }
@@ -402,6 +411,15 @@ def load_config_or_options(aPath, bPath, optionsSet, requestedVars = [ ]) :
         runInfo[DO_MAKE_REPORT_KEY] = not optionsSet[OPTIONS_NO_REPORT_KEY]
         runInfo[DO_MAKE_IMAGES_KEY] = not optionsSet[OPTIONS_NO_IMAGES_KEY]
         runInfo[DO_MAKE_FORKS_KEY]  =     optionsSet[DO_MAKE_FORKS_KEY]
+        runInfo[NUM_WORKERS_KEY]    =     optionsSet[NUM_WORKERS_KEY] if NUM_WORKERS_KEY in optionsSet else 1
+        runInfo[USE_LEGACY_COLOCATION_KEY] = optionsSet[USE_LEGACY_COLOCATION_KEY] if USE_LEGACY_COLOCATION_KEY in optionsSet else False
+        runInfo[USE_COLOCATION_CACHE_KEY]  = optionsSet[USE_COLOCATION_CACHE_KEY]  if USE_COLOCATION_CACHE_KEY  in optionsSet else True
+        runInfo[USE_FAST_FINGERPRINT_KEY]  = optionsSet[USE_FAST_FINGERPRINT_KEY]  if USE_FAST_FINGERPRINT_KEY  in optionsSet else False
+        runInfo[USE_STATISTICS_CACHE_KEY]  = optionsSet[USE_STATISTICS_CACHE_KEY]  if USE_STATISTICS_CACHE_KEY  in optionsSet else False
+        runInfo[USE_INCREMENTAL_REPORT_KEY] = optionsSet[USE_INCREMENTAL_REPORT_KEY] if USE_INCREMENTAL_REPORT_KEY in optionsSet else False
+        runInfo[PREFETCH_DEPTH_KEY]        = optionsSet[PREFETCH_DEPTH_KEY]        if PREFETCH_DEPTH_KEY        in optionsSet else 0
+        runInfo[FIGURE_WORKERS_KEY]        = optionsSet[FIGURE_WORKERS_KEY]        if FIGURE_WORKERS_KEY        in optionsSet else None
+        runInfo[FIGURE_TIMEOUT_KEY]        = optionsSet[FIGURE_TIMEOUT_KEY]        if FIGURE_TIMEOUT_KEY        in optionsSet else None
         
         # only record these if we are using lon/lat
         runInfo[USE_NO_LON_OR_LAT_VARS_KEY] = optionsSet[USE_NO_LON_OR_LAT_VARS_KEY]
@@ -421,6 +439,23 @@ def load_config_or_options(aPath, bPath, optionsSet, requestedVars = [ ]) :
     
     return paths, runInfo, defaultsToUse, requestedNames, usedConfigFile
 
+def copy_loaded_config_for_files (loadedConfig, aPath, bPath, outputPath) :
+    """
+    given the results of load_config_or_options, make an independent copy of them
+    that will be used to compare a different pair of files
+
+    this allows the configuration to be loaded once and reused for many file pairs
+    """
+
+    paths, runInfo, defaultsToUse, requestedNames, usedConfigFile = loadedConfig
+
+    # note: deepcopy will leave any filtering functions from the config file as they are
+    newPaths = { A_FILE_KEY: aPath, OUT_FILE_KEY: outputPath }
+    if bPath is not None :
+        newPaths[B_FILE_KEY] = bPath
+
+    return newPaths, copy.deepcopy(runInfo), copy.deepcopy(defaultsToUse), copy.deepcopy(requestedNames), usedConfigFile
+
 def set_up_command_line_options (parser) :
     """
     given an optparse.OptionParser object, set the appropriate options for glance's command line
@@ -475,7 +510,51 @@ def set_up_command_line_options (parser) :
     # whether or not to do multiprocessing
     parser.add_option('-f', '--fork', dest=DO_MAKE_FORKS_KEY,
                       action="store_true", default=False, help="start multiple processes to create images in parallel")
+    parser.add_option('--workers', dest=NUM_WORKERS_KEY, type='int', default=1,
+                      help="set the number of worker processes used to analyze variables in parallel. 'reportGen' and 'stats' only")
+    parser.add_option('--figureworkers', dest=FIGURE_WORKERS_KEY, type='int', default=None,
+                      help="set the number of processes used to create images with --fork (defaults to one per cpu); "
+                      + "with --workers they are split between the worker processes")
+    parser.add_option('--figuretimeout', dest=FIGURE_TIMEOUT_KEY, type='float', default=None,
+                      help="give up on any image that takes more than this many seconds to create; "
+                      + "only used with --fork or when images are made in a separate process")
+    
+    # which colocation algorithm to use
+    parser.add_option('--legacycolocation', dest=USE_LEGACY_COLOCATION_KEY,
+                      action="store_true", default=False, help="use the original (slower) point by point colocation algorithm. 'colocateData' only")
+    parser.add_option('--nocolocationcache', dest=USE_COLOCATION_CACHE_KEY,
+                      action="store_false", default=True,
+                      help="do not save or reuse longitude/latitude matchings in the output directory. 'colocateData' only")
+    
+    # how the input files are fingerprinted for the reports
+    parser.add_option('--fastfingerprint', dest=USE_FAST_FINGERPRINT_KEY,
+                      action="store_true", default=False,
+                      help="identify the input files in reports with a fast fingerprint (xxh64 if available, otherwise "
+                      + "a hash of the file size, modification time and sampled blocks) instead of a full md5 sum")
+    
+    # whether statistics from earlier runs can be reused
+    parser.add_option('--statscache', dest=USE_STATISTICS_CACHE_KEY,
+                      action="store_true", default=False,
+                      help="save each variable's statistics in the output directory and reuse them in later runs "
+                      + "if the files and the variable's analysis settings haven't changed. 'reportGen' only")
+    parser.add_option('--incremental', dest=USE_INCREMENTAL_REPORT_KEY,
+                      action="store_true", default=False,
+                      help="only regenerate the variable report pages and images in the output directory that "
+                      + "are out of date with the files and settings. 'reportGen' only")
+    
+    # whether variables are read ahead of when they're needed
+    parser.add_option('--prefetch', dest=PREFETCH_DEPTH_KEY, type='int', default=0,
+                      help="read up to this many of the next variables from both files on background threads "
+                      + "while the current variable is analyzed (0 turns this off). 'reportGen' and 'stats' only")
 
+    parser.add_option('--chunked', dest=CHUNKED_COMPARISON_KEY, type='int', default=None,
+                      help="compare variables with more than this many data points a chunk of this size at a time, "
+                      + "so they need not fit in memory (medians will be estimated). 'stats' only")
+    parser.add_option('--quantileerror', dest=QUANTILE_ERROR_KEY, type='float', default=None,
+                      help="set the largest acceptable error in the rank of estimated medians, as a fraction of "
+                      + "the number of data points, the median of the absolute differences can be off by twice this "
+                      + "(defaults to 0.001). 'stats' with --chunked only")
+    
     parser.add_option('--parsable', dest=PARSABLE_OUTPUT_KEY,
                       action="store_true", default=False, help="format output to be programmatically parsed. 'info' only")
 
@@ -512,6 +591,27 @@ def convert_options_to_dict (options) :
     
     # whether or not to do multiprocessing
     tempOptions[DO_MAKE_FORKS_KEY]          = options.doFork
+    tempOptions[NUM_WORKERS_KEY]            = options.num_workers
+    tempOptions[FIGURE_WORKERS_KEY]         = options.figure_workers
+    tempOptions[FIGURE_TIMEOUT_KEY]         = options.figure_timeout
+    
+    # which colocation algorithm to use
+    tempOptions[USE_LEGACY_COLOCATION_KEY]  = options.use_legacy_colocation
+    tempOptions[USE_COLOCATION_CACHE_KEY]   = options.use_colocation_cache
+    
+    # how the input files are fingerprinted
+    tempOptions[USE_FAST_FINGERPRINT_KEY]   = options.use_fast_fingerprint
+    
+    # whether statistics from earlier runs can be reused
+    tempOptions[USE_STATISTICS_CACHE_KEY]   = options.use_statistics_cache
+    tempOptions[USE_INCREMENTAL_REPORT_KEY] = options.use_incremental_report
+    
+    # how many variables are read ahead
+    tempOptions[PREFETCH_DEPTH_KEY]         = options.prefetch_depth
+    
+    # how big a variable can get before it's compared in chunks
+    tempOptions[CHUNKED_COMPARISON_KEY]     = options.chunked_comparison_size
+    tempOptions[QUANTILE_ERROR_KEY]         = options.quantile_error
     
     return tempOptions
 
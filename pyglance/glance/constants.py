@@ -17,6 +17,7 @@ DO_MAKE_IMAGES_KEY         = 'shouldIncludeImages'
 DO_MAKE_REPORT_KEY         = 'shouldIncludeReport'
 DO_COLOCATION_KEY          = 'doColocate'
 DO_MAKE_FORKS_KEY          = 'doFork'
+NUM_WORKERS_KEY            = 'num_workers'
 DO_CLEAR_MEM_THREADED_KEY  = 'useThreadsToControlMemory'
 USE_SHARED_ORIG_RANGE_KEY  = 'useSharedRangeForOriginal'
 DO_TEST_PASSFAIL_KEY       = 'usePassFail'
@@ -25,6 +26,16 @@ USE_NO_LON_OR_LAT_VARS_KEY = 'noLonLatVars'
 SHORT_CIRCUIT_DIFFS_KEY    = 'short_circuit_diffs'
 USE_CUSTOM_PROJ_KEY        = 'use_custom_projection'
 PARSABLE_OUTPUT_KEY        = 'parsable_output'
+CHUNKED_COMPARISON_KEY     = 'chunked_comparison_size'
+QUANTILE_ERROR_KEY         = 'quantile_error'
+USE_LEGACY_COLOCATION_KEY  = 'use_legacy_colocation'
+USE_COLOCATION_CACHE_KEY   = 'use_colocation_cache'
+USE_FAST_FINGERPRINT_KEY   = 'use_fast_fingerprint'
+USE_STATISTICS_CACHE_KEY   = 'use_statistics_cache'
+USE_INCREMENTAL_REPORT_KEY = 'use_incremental_report'
+PREFETCH_DEPTH_KEY         = 'prefetch_depth'
+FIGURE_WORKERS_KEY         = 'figure_workers'
+FIGURE_TIMEOUT_KEY         = 'figure_timeout'
 
 # constants related to storing information from the run
 
@@ -35,6 +46,11 @@ TIME_INFO_KEY              = 'time'
 
 DID_VARIABLE_PASS_KEY      = 'did_pass'
 
+# how many of a variable's pages and sets of images were reused from
+# an earlier run or generated again (only counted for incremental reports)
+REUSED_OUTPUT_COUNT_KEY      = 'reused_output_count'
+REGENERATED_OUTPUT_COUNT_KEY = 'regenerated_output_count'
+
 # the base directory where the variable is
 VARIABLE_DIRECTORY_KEY     = 'variable_dir'
 # the path to the variable report
@@ -164,6 +180,7 @@ INVALID_MASK_KEY           = 'inv_mask'
 OUT_FILE_KEY               = 'out'
 LON_FILL_VALUE_KEY         = 'lon_fill'
 LAT_FILL_VALUE_KEY         = 'lat_fill'
+PROJECTION_CACHE_KEY       = 'projection_cache'
 
 # constants for the files structure
 
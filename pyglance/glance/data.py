@@ -8,15 +8,27 @@ Copyright (c) 2010 University of Wisconsin SSEC. All rights reserved.
 """
 
 import logging
-import os, subprocess, datetime
+import os, datetime, hashlib, threading, collections
 import numpy as np
 
+try :
+    import xxhash
+except ImportError :
+    xxhash = None
+
 import glance.delta     as delta
 import glance.io        as io
 import glance.constants as constants
 
 LOG = logging.getLogger(__name__)
 
+# how many bytes of a file are read at a time while fingerprinting it
+FINGERPRINT_BLOCK_SIZE   = 8 * 1024 * 1024
+# how many blocks are sampled from a file to make a fast fingerprint
+FAST_FINGERPRINT_SAMPLES = 16
+# how many opened files the shared file pool will hang onto at once
+SHARED_FILE_POOL_SIZE    = 32
+
 class IncompatableDataObjects (ValueError) :
     """
     this exception represents a case where two data objects are completely incompatable
@@ -132,10 +144,12 @@ class DataObject (object) :
     override_fill_value - should the fill_value be used rather than the default_fill_value
                           (this defaults to True so the fill_value is used, insuring backwards compatability)
     default_fill_value  - the default fill value that will be used if override_fill_value is False
+    
+    packing - an io.PackedData holding the packed integers the data was unpacked from, or None
     """
     
     def __init__(self, dataArray, fillValue=None, ignoreMask=None,
-                 overrideFillValue=True, defaultFillValue=None) :
+                 overrideFillValue=True, defaultFillValue=None, packing=None) :
         """
         Create the data object.
         
@@ -143,10 +157,12 @@ class DataObject (object) :
         The fill value and mask sets are optional.
         If the fill value is provided it is expected to be of the same
         data type as the data array.
+        If the packing is provided, unpacking it must give exactly the data array.
         """
-        self.data       = dataArray if type(dataArray) == np.ndarray else np.array([dataArray])
+        self.data       = dataArray if isinstance(dataArray, np.ndarray) else np.array([dataArray])
         self.fill_value = fillValue
         self.masks      = BasicMaskSetObject(ignoreMask)
+        self.packing    = packing
         
         self.override_fill_value = overrideFillValue
         self.default_fill_value  = defaultFillValue
@@ -159,7 +175,8 @@ class DataObject (object) :
         """
         
         return DataObject(self.data.copy(), fillValue=self.fill_value, ignoreMask=self.masks.ignore_mask,
-                 overrideFillValue=self.override_fill_value, defaultFillValue=self.default_fill_value)
+                 overrideFillValue=self.override_fill_value, defaultFillValue=self.default_fill_value,
+                 packing=self.packing)
 
     def holding_array(self):
         """
@@ -279,6 +296,9 @@ class DiffInfoObject (object) :
     epsilon_value    - the epsilon value used for comparison or None
     epsilon_percent  - the percentage (of A) used for epsilon comparisons or None
     (if both a value and percent are present, two epsilon tests will be done)
+    
+    shared_packing   - (A packing, B packing) if both data sets were unpacked from integers
+                       packed the same way (see get_shared_packing), otherwise None
     """
     
     POSITIVE_UPCASTS = {
@@ -314,10 +334,14 @@ class DiffInfoObject (object) :
                    }
     
     def __init__(self, aDataObject, bDataObject,
-                 epsilonValue=0.0, epsilonPercent=None) :
+                 epsilonValue=0.0, epsilonPercent=None,
+                 diffDataObject=None) :
         """
         analyze the difference between these two data sets at the
         given epsilon values
+        
+        if the difference has already been analyzed, the diffDataObject
+        may be given and it will be used rather than analyzing the data
         """
         
         # set the basic values
@@ -325,9 +349,11 @@ class DiffInfoObject (object) :
         self.b_data_object   = bDataObject
         self.epsilon_value   = epsilonValue
         self.epsilon_percent = epsilonPercent
+        self.shared_packing  = DiffInfoObject.get_shared_packing(aDataObject, bDataObject)
         
         # analyze our data and get the difference object
-        self.diff_data_object = DiffInfoObject.analyze(aDataObject, bDataObject,
+        self.diff_data_object = diffDataObject if diffDataObject is not None else \
+                                DiffInfoObject.analyze(aDataObject, bDataObject,
                                                        epsilonValue, epsilonPercent)
     
     @staticmethod
@@ -389,6 +415,35 @@ class DiffInfoObject (object) :
         
         return type_to_return, fill_value_to_return
     
+    @staticmethod
+    def get_shared_packing (aDataObject, bDataObject) :
+        """
+        if both data objects were unpacked from integers with the same scale factor, add offset,
+        missing value, and unpacked type, return their (A packing, B packing), otherwise None
+        
+        data packed the same way gives exactly the same unpacked value wherever the packed
+        integers are equal, so those points can be compared without looking at the unpacked data
+        """
+        
+        aPacking = aDataObject.packing
+        bPacking = bDataObject.packing
+        if (aPacking is None) or (bPacking is None) :
+            return None
+        
+        aRaw = np.asarray(aPacking.data)
+        bRaw = np.asarray(bPacking.data)
+        if not (np.issubdtype(aRaw.dtype, np.integer) and (aRaw.dtype == bRaw.dtype)) :
+            return None
+        if (aRaw.shape != aDataObject.data.shape) or (bRaw.shape != bDataObject.data.shape) :
+            return None
+        if ( (aPacking.scale_factor  != bPacking.scale_factor)  or
+             (aPacking.add_offset    != bPacking.add_offset)    or
+             (aPacking.missing_value != bPacking.missing_value) or
+             (np.dtype(aPacking.unpacked_type) != np.dtype(bPacking.unpacked_type)) ) :
+            return None
+        
+        return aPacking, bPacking
+    
     @staticmethod
     def analyze(aDataObject, bDataObject,
                 epsilonValue=0.0, epsilonPercent=None):
@@ -396,6 +451,10 @@ class DiffInfoObject (object) :
         analyze the differences between the two data sets
         updates the two data objects with additional masks
         and returns data object containing diff data and masks
+        
+        if the data sets were unpacked from integers packed the same way, only the points where
+        the packed integers differ are subtracted and tested against the epsilon; everywhere
+        else the difference is exactly zero, so the results are the same either way
         """
         shape = aDataObject.data.shape
         assert(bDataObject.data.shape == shape)
@@ -422,16 +481,35 @@ class DiffInfoObject (object) :
         # construct our diff'ed data set
         raw_diff = np.zeros(shape, dtype=sharedType)
         raw_diff[~valid_in_both] = fill_data_value # throw away invalid data
+        
+        # if the data is packed the same way, a zero difference can't be outside a (non-negative) epsilon
+        # so only the points where the packed data differs need to be looked at, and only those points
+        # are unpacked (the same way the whole data set was) to get the values to subtract and test
+        sharedPacking = DiffInfoObject.get_shared_packing(aDataObject, bDataObject)
+        if (sharedPacking is not None) and not ((epsilonValue is not None) and (epsilonValue < 0)) :
+            aPacking, bPacking = sharedPacking
+            to_compare  = np.not_equal(aPacking.data, bPacking.data)
+            to_compare &= valid_in_both
+            LOG.debug('Comparing packed data, ' + str(np.count_nonzero(to_compare)) + ' of '
+                      + str(np.count_nonzero(valid_in_both)) + ' valid points differ.')
+            a_compared  = aPacking.unpack_points(to_compare)
+            b_compared  = bPacking.unpack_points(to_compare)
+        else :
+            to_compare  = valid_in_both
+            a_compared  = aDataObject.data[to_compare]
+            b_compared  = bDataObject.data[to_compare]
+        
         # compute difference, using shared type in computation
-        raw_diff[valid_in_both] = bDataObject.data[valid_in_both].astype(sharedType) -  \
-                                  aDataObject.data[valid_in_both].astype(sharedType)
+        compared_diff        = b_compared.astype(sharedType) - a_compared.astype(sharedType)
+        raw_diff[to_compare] = compared_diff
         
         # the valid data which is too different between the two sets according to the given epsilon
         outside_epsilon_mask = np.zeros(shape, dtype=np.bool)
+        np.abs(compared_diff, out=compared_diff)
         if (epsilonValue   is not None) :
-            outside_epsilon_mask |= (abs(raw_diff) > epsilonValue) & valid_in_both
+            outside_epsilon_mask[to_compare] |= compared_diff > epsilonValue
         if (epsilonPercent is not None) :
-            outside_epsilon_mask |= (abs(raw_diff) > abs(aDataObject.data * (float(epsilonPercent) / 100.0))) & valid_in_both
+            outside_epsilon_mask[to_compare] |= compared_diff > abs(a_compared * (float(epsilonPercent) / 100.0))
         
         # mismatch points = mismatched nans, mismatched missing-values, differences that are too large 
         mismatch_pt_mask = ( (aDataObject.masks.non_finite_mask ^ bDataObject.masks.non_finite_mask) |
@@ -461,6 +539,119 @@ class DiffInfoObject (object) :
         
         return
 
+def _md5_fingerprint (path) :
+    """
+    calculate the md5 sum of the whole file at the given path
+    """
+    
+    digest = hashlib.md5()
+    with open(path, 'rb') as fileToHash :
+        block = fileToHash.read(FINGERPRINT_BLOCK_SIZE)
+        while block :
+            digest.update(block)
+            block = fileToHash.read(FINGERPRINT_BLOCK_SIZE)
+    
+    return digest.hexdigest()
+
+def _fast_fingerprint (path) :
+    """
+    calculate a quick fingerprint of the file at the given path
+    
+    if the xxhash module is available the whole file is hashed with xxh64, which is
+    much faster than md5; otherwise the file's size, modification time and a few blocks
+    sampled evenly through the file are hashed with md5, which will not notice changes
+    that fall between the samples
+    
+    the fingerprint is labeled with how it was made so it won't be mistaken for an md5 sum
+    """
+    
+    if xxhash is not None :
+        digest = xxhash.xxh64()
+        with open(path, 'rb') as fileToHash :
+            block = fileToHash.read(FINGERPRINT_BLOCK_SIZE)
+            while block :
+                digest.update(block)
+                block = fileToHash.read(FINGERPRINT_BLOCK_SIZE)
+        return "xxh64:" + digest.hexdigest()
+    
+    statsForFile = os.stat(path)
+    digest       = hashlib.md5(str(statsForFile.st_size) + ":" + repr(statsForFile.st_mtime))
+    sampleSize   = min(FINGERPRINT_BLOCK_SIZE // FAST_FINGERPRINT_SAMPLES, statsForFile.st_size)
+    lastStart    = statsForFile.st_size - sampleSize
+    with open(path, 'rb') as fileToHash :
+        for sampleNum in range(FAST_FINGERPRINT_SAMPLES) :
+            fileToHash.seek((lastStart * sampleNum) // max(FAST_FINGERPRINT_SAMPLES - 1, 1))
+            digest.update(fileToHash.read(sampleSize))
+    
+    return "sampled-md5:" + digest.hexdigest()
+
+class FileFingerprint (object) :
+    """
+    This class represents a fingerprint of a file's contents that is calculated
+    in a background thread, so that other work can go on while a large file is read.
+    
+    The calculation starts when the object is created; result() waits for it to
+    finish and returns the fingerprint (or None if the file could not be read).
+    Pickling the object waits for the result, so copies sent to other processes
+    carry only the finished fingerprint.
+    """
+    
+    def __init__ (self, path, fast=False) :
+        """
+        start calculating the fingerprint of the file at the given path
+        
+        if fast is True a quicker but weaker fingerprint is made (see _fast_fingerprint),
+        otherwise the fingerprint is the md5 sum of the file
+        """
+        
+        self.path    = path
+        self.fast    = fast
+        self._digest = None
+        self._thread = threading.Thread(target=self._calculate, name="fingerprint " + path)
+        self._thread.daemon = True
+        self._thread.start()
+    
+    def _calculate (self) :
+        """
+        calculate the fingerprint, this is run in the background thread
+        """
+        
+        try :
+            self._digest = _fast_fingerprint(self.path) if self.fast else _md5_fingerprint(self.path)
+            LOG.info("File " + ("fingerprint" if self.fast else "md5sum") + " for " + self.path + ": " + self._digest)
+        except (IOError, OSError), e :
+            LOG.warn("Unable to calculate a fingerprint for " + self.path + ": " + str(e))
+    
+    def done (self) :
+        """
+        has the fingerprint finished being calculated?
+        """
+        
+        return (self._thread is None) or (not self._thread.is_alive())
+    
+    def result (self) :
+        """
+        wait for the fingerprint to be calculated and return it
+        """
+        
+        if self._thread is not None :
+            self._thread.join()
+        
+        return self._digest
+    
+    def __getstate__ (self) :
+        return {'path': self.path, 'fast': self.fast, '_digest': self.result(), '_thread': None}
+    
+    def __str__ (self) :
+        return str(self.result())
+
+def resolve_fingerprint (value) :
+    """
+    if the value is a FileFingerprint, wait for and return its result, otherwise return the value as is
+    """
+    
+    return value.result() if isinstance(value, FileFingerprint) else value
+
 class FileInfo (object) :
     """
     This class represents information about a file object. It may or may not include the actual file object.
@@ -468,17 +659,20 @@ class FileInfo (object) :
     The following member variables are available from this class:
     
     path          - the file path to reach the original file on disk
-    md5_sum       - an md5 sum calculated from the original file
+    md5_sum       - an md5 sum calculated from the original file (or a fast fingerprint of it, if one was requested);
+                    this is calculated in the background and reading it waits for the calculation to finish
     last_modified - the time that the file was last modified (TODO, what form should this be in?)
     file_object   - the file object that can be used to access the data in the file, may be None
     """
     
-    def __init__(self, pathToFile, md5sum=None, lastModifiedTime=None, fileObject=None, allowWrite=False) :
+    def __init__(self, pathToFile, md5sum=None, lastModifiedTime=None, fileObject=None, allowWrite=False, fastFingerprint=False) :
         """
         Create the file info object using the values given.
         
         If the md5 sum and last modified time aren't given, the initialization will figure them out.
         Note: if the md5 sum is not given, the file object will also be loaded.
+        The md5 sum is calculated in a background thread (see FileFingerprint); if fastFingerprint
+        is True a quicker, weaker fingerprint is calculated instead.
         """
         
         self.path = pathToFile
@@ -487,7 +681,7 @@ class FileInfo (object) :
         # TODO, is this the right strategy?
         if not os.path.exists(self.path) :
             LOG.warn("Requested file " + self.path + " could not be opened because it does not exist.")
-            self.md5_sum       = None
+            self._md5_sum      = None
             self.last_modified = None
             self.file_object   = None
             return
@@ -501,12 +695,10 @@ class FileInfo (object) :
             LOG.debug("Provided path after normalization and symbol expansion: " + tempPath)
             fileObject     = io.open(tempPath, allowWrite=allowWrite)
             
-            # figure out the md5 sum
-            tempSubProcess = subprocess.Popen("md5sum \'" + tempPath + "\'", shell=True, stdout=subprocess.PIPE)
-            md5sum         = tempSubProcess.communicate()[0].split()[0]
-            LOG.info("File md5sum: " + str(md5sum))
+            # start figuring out the md5 sum in the background
+            md5sum         = FileFingerprint(tempPath, fast=fastFingerprint)
             
-        self.md5_sum       = md5sum
+        self._md5_sum      = md5sum
         self.file_object   = fileObject
         
         # if the last modified time isn't given, figure it out
@@ -518,6 +710,14 @@ class FileInfo (object) :
             
         self.last_modified = lastModifiedTime
     
+    @property
+    def md5_sum (self) :
+        """
+        the md5 sum (or fingerprint) of the file, waiting for it to be calculated if needed
+        """
+        
+        return resolve_fingerprint(self._md5_sum)
+    
     def get_version_without_file_object (self) :
         """
         get a version of this object without a file object
@@ -528,7 +728,7 @@ class FileInfo (object) :
         if self.file_object is None:
             toReturn = self
         else:
-            toReturn = FileInfo(self.path, self.md5_sum, self.last_modified)
+            toReturn = FileInfo(self.path, self._md5_sum, self.last_modified)
         
         return toReturn
     
@@ -538,17 +738,145 @@ class FileInfo (object) :
         
         note: this is being used for compatability with the old code and should
         eventually be removed FUTURE
+        
+        note: the md5 sum in the dictionary may still be a FileFingerprint that is being
+        calculated, use resolve_fingerprint to get its value when it is needed
         """
         
         fileInfo = {constants.PATH_KEY: self.path}
         
-        if self.md5_sum is not None :
-            fileInfo[constants.MD5SUM_KEY] = self.md5_sum
+        if self._md5_sum is not None :
+            fileInfo[constants.MD5SUM_KEY] = self._md5_sum
         if self.last_modified is not None:
             fileInfo[constants.LAST_MODIFIED_KEY] = self.last_modified
         
         return fileInfo
 
+class FileInfoPool (object) :
+    """
+    This class represents a pool of opened FileInfo objects keyed by the absolute paths
+    of their files, so that a file that is referenced many times in a run is only opened
+    and fingerprinted once. Files opened for writing or with a fast fingerprint are pooled
+    separately from the others.
+    
+    When the pool is full the least recently used file is dropped from it. Dropped files
+    are not closed, since they may still be in use; they will be closed once nothing
+    refers to them any more. close and close_all explicitly close pooled files.
+    
+    A file that has been modified since it was pooled will be opened again (unless it
+    was opened for writing, since then we are probably the ones modifying it). A pool
+    inherited by a forked process is emptied, without closing anything, the first time
+    it is used in the new process, so file handles are never shared between processes.
+    """
+    
+    def __init__ (self, maxSize=SHARED_FILE_POOL_SIZE) :
+        """
+        create an empty pool that will hang onto at most maxSize files
+        """
+        
+        self.max_size = maxSize
+        self._files   = collections.OrderedDict() # (path, allowWrite, fastFingerprint) -> (FileInfo, modification time)
+        self._lock    = threading.RLock()
+        self._pid     = os.getpid()
+    
+    def _check_process (self) :
+        """
+        forget any files that were pooled by a different process
+        """
+        
+        if os.getpid() != self._pid :
+            self._files = collections.OrderedDict()
+            self._pid   = os.getpid()
+    
+    def get (self, pathToFile, allowWrite=False, fastFingerprint=False) :
+        """
+        get a FileInfo for the file at the given path, opening it if it isn't in the pool
+        
+        files that don't exist are not pooled; the FileInfo returned for them will have no file object
+        """
+        
+        fullPath = os.path.abspath(os.path.expanduser(pathToFile))
+        if not os.path.exists(fullPath) :
+            return FileInfo(pathToFile)
+        modifiedTime = os.stat(fullPath).st_mtime
+        # files fingerprinted the fast way are pooled separately, so callers always get the kind of fingerprint they asked for
+        poolKey      = (fullPath, allowWrite, fastFingerprint)
+        
+        with self._lock :
+            self._check_process()
+            
+            # if we already have the file, mark it as the most recently used
+            if poolKey in self._files :
+                fileInfo, pooledTime = self._files.pop(poolKey)
+                if allowWrite or (pooledTime == modifiedTime) :
+                    self._files[poolKey] = (fileInfo, pooledTime)
+                    return fileInfo
+                LOG.debug(fullPath + " was modified since it was opened and will be opened again.")
+            
+            fileInfo = FileInfo(pathToFile, allowWrite=allowWrite, fastFingerprint=fastFingerprint)
+            if fileInfo.file_object is not None :
+                self._files[poolKey] = (fileInfo, modifiedTime)
+                while len(self._files) > self.max_size :
+                    self._files.popitem(last=False)
+        
+        return fileInfo
+    
+    def close (self, pathToFile) :
+        """
+        close any pooled copies of the file at the given path and remove them from the pool
+        """
+        
+        fullPath = os.path.abspath(os.path.expanduser(pathToFile))
+        with self._lock :
+            self._check_process()
+            for poolKey in [key for key in self._files.keys() if key[0] == fullPath] :
+                fileInfo, _ = self._files.pop(poolKey)
+                _close_file_object(fileInfo.file_object)
+    
+    def close_all (self) :
+        """
+        close all the pooled files and empty the pool
+        """
+        
+        with self._lock :
+            self._check_process()
+            while len(self._files) > 0 :
+                _, (fileInfo, _) = self._files.popitem(last=False)
+                _close_file_object(fileInfo.file_object)
+
+def _close_file_object (fileObject) :
+    """
+    close a glance file object, if its type supports closing
+    (the other types will be closed when they are garbage collected)
+    """
+    
+    if hasattr(fileObject, 'close') :
+        fileObject.close()
+
+# the file pool shared by everything in this process
+_shared_file_pool = FileInfoPool()
+
+def get_shared_file_info (pathToFile, allowWrite=False, fastFingerprint=False) :
+    """
+    get a FileInfo for the given path from the process-wide file pool (see FileInfoPool)
+    """
+    
+    return _shared_file_pool.get(pathToFile, allowWrite=allowWrite, fastFingerprint=fastFingerprint)
+
+def close_shared_file (pathToFile) :
+    """
+    close the given file if it is in the process-wide file pool
+    """
+    
+    _shared_file_pool.close(pathToFile)
+
+def close_shared_files ( ) :
+    """
+    close all the files in the process-wide file pool
+    """
+    
+    _shared_file_pool.close_all()
+
 if __name__=='__main__':
     import doctest
     doctest.testmod()
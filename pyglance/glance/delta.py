@@ -108,6 +108,14 @@ def compute_correlation(xData, yData, goodMask, compute_r_function=pearsonr):
     good_x_data = xData[goodMask]
     good_y_data = yData[goodMask]
     
+    return compute_correlation_of_values(good_x_data, good_y_data, compute_r_function=compute_r_function)
+
+def compute_correlation_of_values(good_x_data, good_y_data, compute_r_function=pearsonr):
+    """
+    compute the correlation coefficient of two sets of good values that
+    have already been pulled out of their data sets (in matching order)
+    """
+    
     # make sure that there is no remaining bad data
     assert(numpy.all(numpy.isfinite(good_x_data)))
     assert(numpy.all(numpy.isfinite(good_y_data)))
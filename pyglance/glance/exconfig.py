@@ -17,8 +17,8 @@ import glance.constants as constants
 settings = {}
 # whether or not images should be generated and shown in the report
 settings[constants.DO_MAKE_IMAGES_KEY] = True
-# whether or not separate threads should be spawned to create each image
-# for the purpose of controlling python's memory usage.
+# whether or not images should be created in a separate process (which is
+# replaced every few images) for the purpose of controlling python's memory usage.
 # this feature should not be used in Mac OSX owing to a bug in multithreading
 # but at appears to work well in other Unix systems
 settings[constants.DO_CLEAR_MEM_THREADED_KEY] = False
@@ -28,10 +28,50 @@ settings[constants.DO_CLEAR_MEM_THREADED_KEY] = False
 # enough), but will speed up image generation in cases where your data set is
 # relatively small or your machine is very powerful
 settings[constants.DO_MAKE_FORKS_KEY] = False
+# how many processes should be used to create images when DO_MAKE_FORKS_KEY is True?
+# the images for all of the variables are handed out to this many processes as they
+# become free (None uses one process per cpu)
+settings[constants.FIGURE_WORKERS_KEY] = None
+# how many seconds can one image take before glance gives up on it? this is only used
+# when the images are made in separate processes (None lets images take as long as they need)
+settings[constants.FIGURE_TIMEOUT_KEY] = None
+# how many worker processes should be used to analyze variables at the same time?
+# each worker opens its own copies of the files and handles whole variables (loading,
+# statistics, images, and the variable's report page); the summary report is the same
+# as it would be if the variables were analyzed one at a time
+settings[constants.NUM_WORKERS_KEY] = 1
 # should the two original data sets for a variable be plotted in the same range?
 # by default each data set will be plotted in it's own range, if you set this
 # value to True, then the maximum of the two ranges will be used to plot both
 settings[constants.USE_SHARED_ORIG_RANGE_KEY] = False
+# when colocating data, should the original point by point colocation algorithm be used?
+# by default a much faster vectorized algorithm is used; the original algorithm is kept
+# only so that results can be checked against older versions of glance
+settings[constants.USE_LEGACY_COLOCATION_KEY] = False
+# when colocating data, should the matching between the longitude and latitude points
+# be saved in the output directory? if the same longitude and latitude are colocated
+# again with the same epsilon, the saved matching will be reused instead of recalculated
+settings[constants.USE_COLOCATION_CACHE_KEY] = True
+# should the input files be identified in the reports by a fast fingerprint instead of an md5 sum?
+# the md5 sum of a large file can take a long time to calculate; the fast fingerprint uses xxh64
+# if the xxhash module is installed, otherwise it only hashes the file's size, modification time
+# and a few blocks sampled from the file, so it may not notice small changes to the file
+settings[constants.USE_FAST_FINGERPRINT_KEY] = False
+# should the statistics for each variable be saved in the output directory and reused by
+# later runs? saved statistics are only reused if both files, the variable's names, epsilons,
+# fill values and filters, and the longitude/latitude invalid masks are all unchanged, so
+# a rerun after changing only plot settings doesn't need to analyze the data again
+settings[constants.USE_STATISTICS_CACHE_KEY] = False
+# should the report pages and images for each variable only be generated again if they are out of
+# date? each output directory gets a manifest recording what went into the files generated there
+# (the data, the variable's settings, the image dpis, the report templates, etc.), and a rerun will
+# reuse any page or set of images whose inputs haven't changed
+settings[constants.USE_INCREMENTAL_REPORT_KEY] = False
+# how many of the next variables should be read from the files ahead of time, while the current
+# variable is being analyzed and plotted? the reading is done on one background thread per file;
+# the data read ahead is held in memory until it's used, up to load.PREFETCH_MEMORY_BUDGET bytes
+# (0 turns this off, and it is only used when the variables aren't handed out to worker processes)
+settings[constants.PREFETCH_DEPTH_KEY] = 0
 
 # the names of the latitude and longitude variables that will be used
 lat_lon_info = {}
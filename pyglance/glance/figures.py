@@ -546,7 +546,11 @@ def create_histogram(data, bins, title, xLabel, yLabel, displayStats=False, unit
 # set on the existing image
 def create_mapped_figure(data, latitude, longitude, baseMapInstance, boundingAxes, title,
                           invalidMask=None, colorMap=None, tagData=None,
-                          dataRanges=None, dataRangeNames=None, dataRangeColors=None, units=None, **kwargs) :
+                          dataRanges=None, dataRangeNames=None, dataRangeColors=None, units=None,
+                          projectionCache=None, **kwargs) :
+    
+    # the basemap may be shared with other figures, so draw with a copy of our own
+    baseMapInstance = maps.fresh_basemap_copy(baseMapInstance)
     
     # make a clean version of our lon/lat
     latitudeClean  = ma.array(latitude,  mask=~invalidMask)
@@ -576,8 +580,14 @@ def create_mapped_figure(data, latitude, longitude, baseMapInstance, boundingAxe
         kwargs['cmap'] = colorMap
     
     # draw our data placed on a map
+    # (if we have a lonlat_util.ProjectedCoordinateCache, the lon/lat may have already been projected)
     maps.draw_basic_features(baseMapInstance, boundingAxes)
-    bMap, x, y = maps.show_lon_lat_data(longitudeClean, latitudeClean, baseMapInstance, data=data, **kwargs)
+    if projectionCache is not None :
+        x, y = projectionCache.project(longitude, latitude, baseMapInstance)
+        bMap, x, y = maps.show_x_y_data(ma.array(x, mask=~invalidMask), ma.array(y, mask=~invalidMask),
+                                        baseMapInstance, data=data, **kwargs)
+    else :
+        bMap, x, y = maps.show_lon_lat_data(longitudeClean, latitudeClean, baseMapInstance, data=data, **kwargs)
     
     # and some informational stuff
     axes.set_title(title)
@@ -633,7 +643,11 @@ def create_mapped_figure(data, latitude, longitude, baseMapInstance, boundingAxe
 # TODO, this method has not been throughly tested
 # TODO, this method needs an input colormap so the mismatch plot can be the right color
 def create_quiver_mapped_figure(data, latitude, longitude, baseMapInstance, boundingAxes, title,
-                          invalidMask=None, tagData=None, uData=None, vData=None, units=None,  **kwargs) :
+                          invalidMask=None, tagData=None, uData=None, vData=None, units=None,
+                          projectionCache=None, **kwargs) :
+    
+    # the basemap may be shared with other figures, so draw with a copy of our own
+    baseMapInstance = maps.fresh_basemap_copy(baseMapInstance)
     
     # make a clean version of our lon/lat/data
     latitudeClean  =  latitude[~invalidMask]
@@ -655,8 +669,14 @@ def create_quiver_mapped_figure(data, latitude, longitude, baseMapInstance, boun
     axes = figure.add_subplot(111)
     
     # draw our data placed on a map
+    # (if we have a lonlat_util.ProjectedCoordinateCache, the lon/lat may have already been projected)
     maps.draw_basic_features(baseMapInstance, boundingAxes)
-    bMap, x, y = maps.show_quiver_plot (longitudeClean, latitudeClean, baseMapInstance, (uDataClean, vDataClean), colordata=colorData)
+    if projectionCache is not None :
+        x, y = projectionCache.project(longitude, latitude, baseMapInstance)
+        bMap, x, y = maps.show_x_y_quiver_plot (x[~invalidMask], y[~invalidMask], baseMapInstance,
+                                                (uDataClean, vDataClean), colordata=colorData)
+    else :
+        bMap, x, y = maps.show_quiver_plot (longitudeClean, latitudeClean, baseMapInstance, (uDataClean, vDataClean), colordata=colorData)
     
     # show the title
     axes.set_title(title)
@@ -10,11 +10,64 @@ interface to support more modular interactions with the basemap object.
 """
 
 from mpl_toolkits.basemap import Basemap, shiftgrid
-from numpy import arange, array, reshape, concatenate, nan
+from numpy import arange, array, reshape, concatenate, nan, floating
+
+import copy
 
 # the value that will denote "bad" longitudes and latitudes
 badLonLat = 1.0E30
 
+# how many decimal places of a degree the corners and centers of a map are rounded to
+# before we look for a matching basemap to reuse
+BASEMAP_DEGREE_PRECISION = 2
+
+# the basemaps built so far in this process, keyed by the (rounded) arguments used to build them;
+# building a basemap means reading and projecting all of the coastline, country and state outlines,
+# so we only want to do that once per map area; forked figure workers inherit this along with
+# everything else in the parent process
+_basemapCache = { }
+
+def get_cached_basemap (**basemapArguments) :
+    """
+    get a basemap built with the given keyword arguments, reusing one that was already built
+    in this process if the arguments match
+    
+    floating point arguments (corners, centers, etc.) are rounded to BASEMAP_DEGREE_PRECISION
+    decimal places first and the map is built from the rounded values, so the key always
+    describes the map exactly
+    
+    the caller gets its own shallow copy of the cached basemap, see fresh_basemap_copy
+    """
+    
+    cleanArguments = { }
+    for argName, argValue in basemapArguments.items() :
+        if isinstance(argValue, (float, floating)) :
+            argValue = round(float(argValue), BASEMAP_DEGREE_PRECISION)
+        cleanArguments[argName] = argValue
+    cacheKey = tuple(sorted(cleanArguments.items()))
+    
+    if cacheKey not in _basemapCache :
+        _basemapCache[cacheKey] = Basemap(**cleanArguments)
+    
+    return fresh_basemap_copy(_basemapCache[cacheKey])
+
+def fresh_basemap_copy (baseMapInstance) :
+    """
+    make a copy of the basemap that can be drawn into a new figure
+    
+    the copy shares the projection and the outline data with the original, but basemap
+    remembers the map boundary it drew in its last figure and will try to add that same
+    patch to the next figure it draws in, so the copy starts without one
+    """
+    
+    if baseMapInstance is None :
+        return None
+    
+    newInstance = copy.copy(baseMapInstance)
+    newInstance._mapboundarydrawn = False
+    
+    return newInstance
+
 def create_basemap (lon, lat=None, axis=None, projection='lcc', resolution='i') :
     """
     Create an instance of basemap using either the specified axis info or the
@@ -53,17 +106,17 @@ def create_basemap (lon, lat=None, axis=None, projection='lcc', resolution='i')
     lon_mid    = (lon_left + lon_right ) / 2.
     lat_mid    = (lat_top  + lat_bottom) / 2.
     
-    # make our basemap
+    # make our basemap (or reuse one we already made for this area)
     m = None
-    if projection is 'ortho' :
+    if projection == 'ortho' :
         # orthographic projections require this call
-        m = Basemap(resolution=resolution, area_thresh=10000., projection=projection,
-                    lat_0=lat_mid, lon_0=lon_mid)
+        m = get_cached_basemap(resolution=resolution, area_thresh=10000., projection=projection,
+                               lat_0=lat_mid, lon_0=lon_mid)
     else :
         # most of the other projections use this call
-        m = Basemap(llcrnrlon=lon_left,llcrnrlat=lat_bottom,urcrnrlon=lon_right,urcrnrlat=lat_top,
-                    resolution=resolution, area_thresh=10000., projection=projection,
-                    lat_1=lat_mid,lon_0=lon_mid)
+        m = get_cached_basemap(llcrnrlon=lon_left,llcrnrlat=lat_bottom,urcrnrlon=lon_right,urcrnrlat=lat_top,
+                               resolution=resolution, area_thresh=10000., projection=projection,
+                               lat_1=lat_mid,lon_0=lon_mid)
     
     return m, axis
 
@@ -129,6 +182,13 @@ def show_quiver_plot (lon, lat, baseMapInstance, (uData, vData)=(None,None), col
     
     x, y = baseMapInstance(lon, lat) # translate into the coordinate system of the basemap
     
+    return show_x_y_quiver_plot(x, y, baseMapInstance, (uData, vData), colordata=colordata, **kwargs)
+
+def show_x_y_quiver_plot (x, y, baseMapInstance, (uData, vData)=(None,None), colordata=None, **kwargs) :
+    """
+    Show a quiver plot of the given vector data at a given x, y using the provided basemap.
+    """
+    
     # show the quiver plot if there is data
     
     if (uData is not None) and (vData is not None) :
@@ -18,13 +18,13 @@ import matplotlib.cm     as cm
 import matplotlib.pyplot as plt
 import matplotlib.colors as colors
 
-from mpl_toolkits.basemap import Basemap
 
 import logging
 import numpy as np
 
 import glance.data      as dataobjects
 import glance.figures   as figures
+import glance.graphics  as maps
 import glance.gui_model as model
 from   glance.gui_constants import *
 from   glance.plotcreatefns import select_projection
@@ -375,13 +375,14 @@ class GlanceGUIFigures (object) :
             LOG.debug("Selecting projection: " + projToUse)
             midLat        = (latRange[0] + latRange[1]) / 2.0 # this will fail horribly where we cross discontinious lines
             midLon        = (lonRange[0] + lonRange[1]) / 2.0 # this will fail horribly where we cross discontinious lines
-            if projToUse is 'ortho' :
-                basemapObject = Basemap(lat_0=midLat, lon_0=midLon, resolution='i', area_thresh=10000., projection=projToUse)
+            # (the basemap is reused if we've already drawn a plot of this area)
+            if projToUse == 'ortho' :
+                basemapObject = maps.get_cached_basemap(lat_0=midLat, lon_0=midLon, resolution='i', area_thresh=10000., projection=projToUse)
             else :
-                basemapObject = Basemap(llcrnrlon=lonRange[0], urcrnrlon=lonRange[1],
-                                        llcrnrlat=latRange[0], urcrnrlat=latRange[1],
-                                        lat_1=midLat, lon_0=midLon,
-                                        resolution='i', area_thresh=10000., projection=projToUse)
+                basemapObject = maps.get_cached_basemap(llcrnrlon=lonRange[0], urcrnrlon=lonRange[1],
+                                                        llcrnrlat=latRange[0], urcrnrlat=latRange[1],
+                                                        lat_1=midLat, lon_0=midLon,
+                                                        resolution='i', area_thresh=10000., projection=projToUse)
             
             # do a rough comparison of the longitude and latitude
             if (aDataObject is not None) and (bDataObject is not None) :
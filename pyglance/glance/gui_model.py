@@ -178,7 +178,7 @@ class GlanceGUIModel (object) :
         
         # attempt to open the file
         try :
-            newFile = dataobjects.FileInfo(str(newFilePath))
+            newFile = dataobjects.get_shared_file_info(str(newFilePath))
         except KeyError :
             raise UnableToReadFile(newFilePath)
         
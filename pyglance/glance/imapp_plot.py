@@ -21,12 +21,12 @@ from pylab import *
 import matplotlib.cm     as cm
 import matplotlib.pyplot as plt
 import matplotlib.colors as colors
-from mpl_toolkits.basemap import Basemap
 
 import re
 import numpy as np
 
-import glance.data as dataobj
+import glance.data     as dataobj
+import glance.graphics as maps
 from   glance.io   import UNITS_CONSTANT
 
 LOG = logging.getLogger(__name__)
@@ -505,6 +505,9 @@ def _create_imapp_figure (initAODdata,       initLongitudeData,       initLatitu
     
     """
     
+    # every frame is drawn from the same basemap, so give this figure its own copy
+    baseMapInstance = maps.fresh_basemap_copy(baseMapInstance)
+    
     # create a figure and draw geopolitical features on it
     axes, figure = _build_basic_figure_with_map (baseMapInstance,
                                                  parallelWidth=parallelWidth, meridianWidth=meridianWidth,
@@ -563,6 +566,9 @@ def _create_thermal_couplets_figure(basemapObject, centersMask, longitudeData, l
     
     _clean_lon_lat (longitudeData, latitudeData, correctNegativeLongitudes=correctLongitudes)
     
+    # the same basemap is used for several figures, so give this figure its own copy
+    basemapObject = maps.fresh_basemap_copy(basemapObject)
+    
     # build the basic map plot plot
     axes, figure = _build_basic_figure_with_map (basemapObject, parallelWidth=parallelWidth, meridianWidth=meridianWidth, useDarkBackground=useDarkBackground,)
     
@@ -608,6 +614,9 @@ def _create_lightning_risk_figure(basemapObject, riskAreasInfo,
     riskAreasInfoList[plotOrder] = (lonArray, latArray, percentageChance, colorToPlotIn, alphaToPlotWith)
     """
     
+    # the same basemap is used for several figures, so give this figure its own copy
+    basemapObject = maps.fresh_basemap_copy(basemapObject)
+    
     # build the basic map plot plot
     axes, figure = _build_basic_figure_with_map (basemapObject, parallelWidth=parallelWidth, meridianWidth=meridianWidth, useDarkBackground=useDarkBackground,)
     
@@ -829,11 +838,11 @@ python -m glance.imapp_plot otPlot  otData.hdf
         # build a basemap
         LOG.info("Building basemap object.")
         projectionName = 'lcc' # use the Lambert Conformal projection; TODO at some point this will need to be checked with a global attribute
-        basemapObject  = Basemap (projection=projectionName,
-                                  llcrnrlat=minLatitude,  urcrnrlat=maxLatitude,
-                                  llcrnrlon=minLongitude, urcrnrlon=maxLongitude,
-                                  lat_0=centerLat, lon_0=centerLon,
-                                  lat_ts=20, resolution='l') # TODO, this may need to be called differently
+        basemapObject  = maps.get_cached_basemap (projection=projectionName,
+                                                  llcrnrlat=minLatitude,  urcrnrlat=maxLatitude,
+                                                  llcrnrlon=minLongitude, urcrnrlon=maxLongitude,
+                                                  lat_0=centerLat, lon_0=centerLon,
+                                                  lat_ts=20, resolution='l') # TODO, this may need to be called differently
         
         # create a plot of the centers of the thermal couplets
         LOG.info ("Creating plot of Overshooting Top center locations.")
@@ -1047,8 +1056,8 @@ python -m glance.imapp_plot otPlot  otData.hdf
         # build a basemap
         LOG.info("Building basemap object.")
         projectionName = 'merc' # use the Mercator Projection; TODO at some point this will need to be checked with a global attribute
-        basemapObject  = Basemap (projection=projectionName,llcrnrlat=southwestLat,urcrnrlat=northeastLat,
-                                  llcrnrlon=southwestLon, urcrnrlon=northeastLon, lat_ts=20, resolution='l')
+        basemapObject  = maps.get_cached_basemap (projection=projectionName,llcrnrlat=southwestLat,urcrnrlat=northeastLat,
+                                                  llcrnrlon=southwestLon, urcrnrlon=northeastLon, lat_ts=20, resolution='l')
         
         # sort out the times we're using
         timeWindow = options.timeWindow
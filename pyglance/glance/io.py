@@ -7,7 +7,7 @@ Created by rayg Apr 2009.
 Copyright (c) 2009 University of Wisconsin SSEC. All rights reserved.
 """
 
-import os, logging
+import os, logging, threading, weakref
 import numpy as np
 
 LOG = logging.getLogger(__name__)
@@ -23,7 +23,7 @@ except:
     
 try:
     import h5py
-    from h5py import h5d
+    from h5py import h5a, h5d, h5o
 except ImportError:
     LOG.info('no h5py module available for reading HDF5')
     h5py = None
@@ -61,6 +61,12 @@ except ImportError:
     LOG.info('no adl_blob format handler available')
     adl_blob = None
 
+try :
+    import numexpr
+except ImportError :
+    LOG.info('no numexpr module available, scaling will be done with numpy')
+    numexpr = None
+
 try :
     from osgeo import gdal
     LOG.info('loading osgeo module for GeoTIFF data file access')
@@ -97,6 +103,346 @@ class IOUnimplimentedError(Exception):
     def __str__(self):
         return self.msg
 
+class VariableHandle (object) :
+    """
+    A lazy handle on one variable in a file. Nothing is read from the file until
+    the handle is sliced, and then only the requested region is read (and scaled,
+    exactly as the file object's __getitem__ would scale the whole variable).
+    
+    handle[region]     - read the scaled data in the region (any numpy style index)
+    numpy.array(handle) - read the whole variable
+    
+    shape      - the shape of the variable
+    ndim       - the number of dimensions of the variable
+    size       - the number of data points in the variable
+    dtype      - the type of the data that reading will return (after scaling)
+    attributes - a dictionary of the variable's attributes
+    fill_value - the variable's missing value, or None
+    """
+    
+    def __init__(self, fileObject, name) :
+        """
+        make a handle on the named variable in the given file object
+        """
+        
+        self.file_object = fileObject
+        self.name        = name
+        self._shape      = None
+        self._dtype      = None
+    
+    @property
+    def shape (self) :
+        if self._shape is None :
+            self._shape = tuple(self.file_object.get_variable_shape(self.name))
+        return self._shape
+    
+    @property
+    def ndim (self) :
+        return len(self.shape)
+    
+    @property
+    def size (self) :
+        return int(np.prod(self.shape))
+    
+    @property
+    def dtype (self) :
+        # the type can change when the data is scaled, so read a single point to find it
+        if self._dtype is None :
+            firstPoint  = tuple(slice(0, 1) for dimension in self.shape) if self.size > 0 else slice(None)
+            self._dtype = np.asarray(self[firstPoint]).dtype
+        return self._dtype
+    
+    @property
+    def attributes (self) :
+        return self.file_object.get_variable_attributes(self.name)
+    
+    @property
+    def fill_value (self) :
+        return self.file_object.missing_value(self.name)
+    
+    def __len__ (self) :
+        return self.shape[0]
+    
+    def __getitem__ (self, region) :
+        return self.file_object.get_variable_region(self.name, region)
+    
+    def __array__ (self, dtype=None) :
+        return np.asarray(self.file_object[self.name], dtype=dtype)
+    
+    def __repr__ (self) :
+        return '<VariableHandle ' + str(self.name) + ' ' + str(self.shape) + '>'
+
+# the lock each file object that has been wrapped in a LockedFile is guarded by
+_file_locks      = weakref.WeakKeyDictionary()
+_file_locks_lock = threading.Lock()
+
+class LockedFile (object) :
+    """
+    A wrapper that lets several threads share a glance file object. Only one thread at a
+    time can be in any of the file object's methods (most of the libraries used to read the
+    files aren't thread safe), and the VariableHandles the wrapper hands out read through it.
+    Every wrapper around the same file object uses the same lock, which is available as lock
+    for callers that need several calls to happen without another thread getting in between.
+    
+    Objects from the file's library (like the ones get_variable_object returns) are passed
+    back as they are, anything done with them should be done while holding the lock.
+    """
+    
+    def __init__ (self, fileObject) :
+        """
+        wrap the given file object (or the file object in the given LockedFile)
+        """
+        
+        if isinstance(fileObject, LockedFile) :
+            fileObject = fileObject.file_object
+        
+        self.file_object = fileObject
+        with _file_locks_lock :
+            if fileObject not in _file_locks :
+                _file_locks[fileObject] = threading.RLock()
+            self.lock = _file_locks[fileObject]
+    
+    def __getattr__ (self, name) :
+        attribute = getattr(self.file_object, name)
+        if not callable(attribute) :
+            return attribute
+        
+        def lockedMethod (*args, **kwargs) :
+            with self.lock :
+                return attribute(*args, **kwargs)
+        
+        return lockedMethod
+    
+    def __call__ (self) :
+        with self.lock :
+            return self.file_object()
+    
+    def __getitem__ (self, name) :
+        with self.lock :
+            return self.file_object[name]
+    
+    def variable (self, name) :
+        """
+        get a lazy VariableHandle on the named variable that reads through this wrapper
+        """
+        return VariableHandle(self, name)
+
+def unpack_scaled_data (rawData, scaleFactor, addOffset, missingValue, dataType) :
+    """
+    scale packed data (rawData * scaleFactor + addOffset) into a single newly allocated
+    array of the given data type, leaving any missing values untouched
+    
+    the scaling is done in place in the output array, so apart from that array (and the
+    mask of valid points) no temporary copies of the data are made
+    """
+    
+    rawData = np.asarray(rawData)
+    scaled  = np.empty(rawData.shape, dtype=dataType)
+    
+    if numexpr is not None :
+        # do the scale and offset in the output type so the results match the numpy version
+        scale  = np.array(scaleFactor, dtype=scaled.dtype)
+        offset = np.array(addOffset,   dtype=scaled.dtype)
+        if missingValue is None :
+            numexpr.evaluate('rawData * scale + offset', out=scaled, casting='unsafe')
+        else :
+            fill = np.array(missingValue, dtype=rawData.dtype)
+            numexpr.evaluate('where(rawData != fill, rawData * scale + offset, rawData)', out=scaled, casting='unsafe')
+        return scaled
+    
+    scaled[...] = rawData
+    if missingValue is None :
+        np.multiply(scaled, scaleFactor, out=scaled)
+        np.add     (scaled, addOffset,   out=scaled)
+    else :
+        validMask = rawData != missingValue
+        np.multiply(scaled, scaleFactor, out=scaled, where=validMask)
+        np.add     (scaled, addOffset,   out=scaled, where=validMask)
+    
+    return scaled
+
+class PackedData (object) :
+    """
+    The raw, still packed, data for a region of a variable and the information needed to
+    unpack it. This lets the data be compared without expanding it to floating point.
+    
+    data          - the raw data exactly as it is stored in the file
+    scale_factor  - the scale factor that should be applied to the raw data
+    add_offset    - the offset that should be added after scaling
+    missing_value - the raw missing value, or None; missing points are never scaled
+    unpacked_type - the type the data would have after unpacking
+    """
+    
+    def __init__ (self, data, scaleFactor=1.0, addOffset=0.0, missingValue=None, unpackedType=None) :
+        self.data          = data
+        self.scale_factor  = scaleFactor
+        self.add_offset    = addOffset
+        self.missing_value = missingValue
+        self.unpacked_type = unpackedType if unpackedType is not None else np.asarray(data).dtype
+    
+    def is_scaled (self) :
+        """
+        does this data need to be scaled to be used?
+        """
+        return not ((self.scale_factor == 1.0) and (self.add_offset == 0.0))
+    
+    def unpack (self) :
+        """
+        get the scaled version of the data, exactly as the file object's
+        get_variable_region would have returned it
+        """
+        if not self.is_scaled() :
+            return self.data
+        return unpack_scaled_data(self.data, self.scale_factor, self.add_offset, self.missing_value, self.unpacked_type)
+
+    def unpack_points (self, mask) :
+        """
+        get the scaled values of only the points selected by the mask, these are exactly
+        the values unpack()[mask] would give without unpacking the rest of the data
+        """
+        
+        selected = np.asarray(self.data)[mask]
+        if not self.is_scaled() :
+            return selected
+        return unpack_scaled_data(selected, self.scale_factor, self.add_offset, self.missing_value, self.unpacked_type)
+
+def memory_map_hdf5_dataset (dataset) :
+    """
+    get a copy on write numpy.memmap of an HDF5 dataset's data where it's stored in its
+    file, or None if the dataset can't be mapped
+    
+    only contiguous datasets with no filters (compression, etc.) whose data has been written
+    can be mapped, since only their data is stored in the file exactly as numpy lays it out;
+    nothing is read until the mapped data is used, and then only the pages that are used
+    
+    the file itself is never changed, but changing the map's data changes only this process's
+    copy of it (so the data can still be used anywhere an array read from the file could be)
+    """
+    
+    return memory_map_file_region(dataset.file.filename, get_hdf5_dataset_location(dataset))
+
+def get_hdf5_dataset_location (dataset) :
+    """
+    get where an HDF5 dataset's data is stored in its file, in the form (offset, dtype, shape),
+    or None if the dataset can't be memory mapped (see memory_map_hdf5_dataset)
+    """
+    
+    if (h5py is None) or (dataset.chunks is not None) or (len(dataset.shape) <= 0) or (dataset.size <= 0) :
+        return None
+    if dataset.dtype.hasobject or (dataset.file.driver not in ('sec2', 'stdio')) :
+        return None
+    if dataset.id.get_create_plist().get_external_count() > 0 :
+        return None
+    
+    offset = dataset.id.get_offset()
+    if offset is None :
+        return None
+    
+    return offset, dataset.dtype, dataset.shape
+
+def memory_map_file_region (filename, location) :
+    """
+    get a copy on write numpy.memmap of the data at a location in a file, where the
+    location is in the form (offset, dtype, shape), or None if the location is None
+    or the data can't be mapped
+    """
+    
+    if location is None :
+        return None
+    
+    offset, dataType, shape = location
+    try :
+        return np.memmap(filename, dtype=dataType, mode='c', offset=offset, shape=shape)
+    except (EnvironmentError, ValueError), err :
+        LOG.debug('Unable to memory map data at offset ' + str(offset) + ' in ' + filename
+                  + ' (' + str(err) + '), it will be read instead.')
+        return None
+
+class HDF5VariableInfo (object) :
+    """
+    What we know about one dataset in an hdf5 file without reading its data.
+    
+    name           - the path of the dataset in the file (without a leading /)
+    shape          - the shape of the dataset
+    dtype          - the raw type stored in the file, or None if the type
+                     can't be used (h5py raises a TypeError for some types)
+    chunks         - the chunk shape, or None if the dataset isn't chunked
+    compression    - a list of the names of the filters applied to the data
+    attribute_keys - a list of the names of the dataset's attributes
+    fill_value     - the fill value set for the dataset, or None
+    """
+    
+    def __init__(self, name, shape, dtype, chunks=None, compression=None, attributeKeys=None, fillValue=None) :
+        self.name           = name
+        self.shape          = shape
+        self.dtype          = dtype
+        self.chunks         = chunks
+        self.compression    = compression    if compression    is not None else [ ]
+        self.attribute_keys = attributeKeys  if attributeKeys  is not None else [ ]
+        self.fill_value     = fillValue
+    
+    def is_loadable (self) :
+        return self.dtype is not None
+    
+    def __repr__ (self) :
+        return '<HDF5VariableInfo ' + str(self.name) + ' ' + str(self.shape) + ' ' + str(self.dtype) + '>'
+
+def _describe_hdf5_dataset (name, datasetId) :
+    """
+    build an HDF5VariableInfo from an open low level dataset id
+    """
+    
+    try :
+        dtype = datasetId.dtype
+    except TypeError :
+        LOG.debug('TypeError prevents the use of variable ' + name
+                  + '. This variable will be ignored')
+        return HDF5VariableInfo(name, datasetId.shape, None)
+    
+    pListObj = datasetId.get_create_plist()
+    
+    chunks = None
+    if pListObj.get_layout() == h5d.CHUNKED :
+        chunks = tuple(pListObj.get_chunk())
+    
+    compression = [ ]
+    for filterIndex in range(pListObj.get_nfilters()) :
+        filterName = pListObj.get_filter(filterIndex)[3]
+        compression.append(filterName.decode('ascii', 'replace') if isinstance(filterName, bytes) else str(filterName))
+    
+    attributeKeys = [ ]
+    if h5a.get_num_attrs(datasetId) > 0 :
+        h5a.iterate(datasetId, attributeKeys.append)
+    
+    fillValue = None
+    fillValueStatus = pListObj.fill_value_defined()
+    if (h5d.FILL_VALUE_DEFAULT is fillValueStatus) or (h5d.FILL_VALUE_USER_DEFINED is fillValueStatus) :
+        fillValue = np.array((1), dtype=dtype)
+        pListObj.get_fill_value(fillValue)
+    
+    return HDF5VariableInfo(name, datasetId.shape, dtype, chunks, compression, attributeKeys, fillValue)
+
+def build_hdf5_inventory (h5File) :
+    """
+    make a dictionary of HDF5VariableInfo objects, keyed by name, for all the
+    datasets in an open h5py file
+    
+    this uses the low level iteration in h5py so the groups along the way
+    never have to be opened as high level objects and no data is read
+    """
+    
+    inventory = { }
+    fileId    = h5File.id
+    def describeObject (name, objectInfo) :
+        if objectInfo.type == h5o.TYPE_DATASET :
+            datasetId = h5d.open(fileId, name.encode('utf-8') if not isinstance(name, bytes) else name)
+            name = name.decode('utf-8') if isinstance(name, bytes) else name
+            inventory[name] = _describe_hdf5_dataset(name, datasetId)
+    
+    h5o.visit(fileId, describeObject, info=True)
+    
+    return inventory
+
 class CaseInsensitiveAttributeCache (object) :
     """
     A cache of attributes for a single file and all of it's variables.
@@ -233,6 +579,17 @@ class hdf (object):
     # for scaling it will be (so the return type may not reflect the
     # type found in the original file)
     def __getitem__(self, name):
+        return self.get_variable_region(name, slice(None))
+    
+    # this returns a numpy array with a copy of the scaled data in
+    # the given region (anything that can be used to index a numpy
+    # array) of this variable, scaled the same way __getitem__ would
+    def get_variable_region(self, name, region):
+        return self.get_variable_region_packed(name, region).unpack()
+    
+    # this returns a PackedData object with a copy of the raw data in the
+    # given region of this variable and the information needed to scale it
+    def get_variable_region_packed(self, name, region=slice(None)):
         # defaults
         scale_factor = 1.0
         add_offset = 0.0
@@ -242,7 +599,7 @@ class hdf (object):
         # get the variable object and use it to
         # get our raw data and scaling info
         variable_object = self.get_variable_object(name)
-        raw_data_copy = variable_object[:]
+        raw_data_copy = variable_object[region]
         try :
             # TODO, this currently won't work with geocat data, work around it for now
             scale_factor, scale_factor_error, add_offset, add_offset_error, data_type = SDS.getcal(variable_object)
@@ -261,7 +618,7 @@ class hdf (object):
         
         # don't do lots of work if we don't need to scale things
         if (scale_factor == 1.0) and (add_offset == 0.0) :
-            return raw_data_copy
+            return PackedData(raw_data_copy)
         
         # at the moment geocat has several scaling methods that don't match the normal standards for hdf
         """
@@ -272,7 +629,7 @@ class hdf (object):
             INTEGER(kind=int1) :: SQRT_SCALE            ! 3 
         """
         if (scaling_method == 0) :
-            return raw_data_copy
+            return PackedData(raw_data_copy)
         if not ((scaling_method is None) or (int(scaling_method) <= 1)) :
             LOG.warn ('Scaling method of \"' + str(scaling_method) + '\" will be ignored in favor of hdf standard method. '
                       + 'This may cause problems with data consistency')
@@ -280,16 +637,24 @@ class hdf (object):
         # if we don't have a data type something strange has gone wrong
         assert(not (data_type is None))
         
-        # get information about where the data is the missing value
-        missing_val = self.missing_value(name)
-        missing_mask = np.zeros(raw_data_copy.shape, dtype=np.bool)
-        missing_mask[raw_data_copy == missing_val] = True
-        
-        # create the scaled version of the data
-        scaled_data_copy                = np.array(raw_data_copy, dtype=data_type)
-        scaled_data_copy[~missing_mask] = (scaled_data_copy[~missing_mask] * scale_factor) + add_offset #TODO, type truncation issues?
+        return PackedData(raw_data_copy, scale_factor, add_offset, self.missing_value(name), data_type) #TODO, type truncation issues?
+    
+    def get_variable_shape(self, name):
+        """
+        get the shape of a variable without reading its data
+        """
+        variable_object = self.get_variable_object(name)
+        dimension_sizes = variable_object.info()[2]
+        SDS.endaccess(variable_object)
         
-        return scaled_data_copy 
+        # single dimensional variables report their size as a plain number
+        return tuple(dimension_sizes) if isinstance(dimension_sizes, (list, tuple)) else (dimension_sizes,)
+    
+    def variable(self, name):
+        """
+        get a lazy VariableHandle on the named variable, nothing is read until it's sliced
+        """
+        return VariableHandle(self, name)
     
     def get_variable_object(self, name):
         return self._hdf.select(name)
@@ -407,6 +772,15 @@ class nc (object):
         
         self._nc = netCDF4.Dataset(filename, mode)
         self.attributeCache = CaseInsensitiveAttributeCache(self)
+        
+        # NetCDF4 files are HDF5 files underneath, so as long as nobody is going to
+        # write to the file the data that doesn't need changing can be mapped from it;
+        # where each variable's data is stored is looked up with h5py the first time it's
+        # needed, and no h5py handle is kept open (one inherited by forked worker processes
+        # shares its file position with the parent and the workers' reads get corrupted)
+        self._filename             = filename
+        self._can_memory_map       = (not allowWrite) and (h5py is not None) and self._nc.data_model.startswith('NETCDF4')
+        self._memory_map_locations = { }
 
     def __call__(self):
         "yield names of variables to be compared"
@@ -417,6 +791,12 @@ class nc (object):
     # for scaling it will be (so the return type may not reflect the
     # type found in the original file)
     def __getitem__(self, name):
+        return self.get_variable_region(name, slice(None))
+    
+    # this returns a numpy array with a copy of the scaled data in
+    # the given region (anything that can be used to index a numpy
+    # array) of this variable, scaled the same way __getitem__ would
+    def get_variable_region(self, name, region):
         
         #print ("*** opening variable: " + name)
         
@@ -452,10 +832,15 @@ class nc (object):
         scaled_data_copy[~missing_mask] = (scaled_data_copy[~missing_mask] * scale_factor) + add_offset #TODO, type truncation issues?
         """
 
+        # if the data is already the type we want and doesn't need fixing, map it from the file
+        temp = self.attributeCache.get_variable_attributes(name)
+        mapped_data = self._memory_map_variable(name, variable_object, data_type, temp)
+        if mapped_data is not None :
+            return mapped_data[region]
+
         # get our data, save the dtype, and make sure it's a more flexible dtype for now
-        scaled_data_copy = np.array(variable_object[:], dtype=data_type)
+        scaled_data_copy = np.array(variable_object[region], dtype=data_type)
 
-        temp = self.attributeCache.get_variable_attributes(name)
         if UNSIGNED_ATTR_STR in temp.keys() and str(temp[UNSIGNED_ATTR_STR]).lower() == ( "true" ) :
 
             LOG.debug("fixing unsigned values in variable " + name)
@@ -482,11 +867,62 @@ class nc (object):
 
         return scaled_data_copy
     
+    def _memory_map_variable (self, name, variable_object, data_type, attributes) :
+        """
+        get a copy on write memory map of a variable's data (see memory_map_hdf5_dataset)
+        or None if the variable can't be mapped or its data must be scaled or changed
+        """
+        
+        if not self._can_memory_map :
+            return None
+        if variable_object.dtype != np.dtype(data_type) :
+            return None
+        for attributeName in (SCALE_FACTOR_STR, ADD_OFFSET_STR, UNSIGNED_ATTR_STR) :
+            if attributeName in attributes :
+                return None
+        
+        if name not in self._memory_map_locations :
+            self._memory_map_locations[name] = self._find_memory_map_location(name)
+        
+        return memory_map_file_region(self._filename, self._memory_map_locations[name])
+    
+    def _find_memory_map_location (self, name) :
+        """
+        open the file with h5py just long enough to find where a variable's data is stored
+        (see get_hdf5_dataset_location)
+        """
+        
+        try :
+            h5File = h5py.File(self._filename, 'r')
+        except (EnvironmentError, ValueError), err :
+            LOG.debug('Unable to open ' + self._filename + ' as HDF5 (' + str(err) + '), its data will not be memory mapped.')
+            self._can_memory_map = False
+            return None
+        
+        try :
+            if name not in h5File :
+                return None
+            return get_hdf5_dataset_location(h5File[name])
+        finally :
+            h5File.close()
+    
     # TODO, this hasn't been supported in other file types
     def close (self) :
         self._nc.close()
         self._nc = None
 
+    def get_variable_shape(self, name):
+        """
+        get the shape of a variable without reading its data
+        """
+        return self.get_variable_object(name).shape
+    
+    def variable(self, name):
+        """
+        get a lazy VariableHandle on the named variable, nothing is read until it's sliced
+        """
+        return VariableHandle(self, name)
+    
     def get_variable_object(self, name):
 
         return self._nc.variables[name]
@@ -685,30 +1121,40 @@ class h5(object):
             LOG.error('h5py module is not installed and is needed in order to read h5 files')
             assert(h5py is not None)
         self._h5 = h5py.File(filename, mode)
+        
+        # data can be mapped straight from the file as long as nobody is going to write to it
+        self._use_memory_maps = not allowWrite
+        
+        # built the first time someone needs to know what's in the file
+        self._inventory = None
     
     def __call__(self):
         
-        variableList = [ ]
-        def testFn (name, obj) :
-            #print ('checking name: ' + name)
-            #print ('object: ' + str(obj))
-            
-            if isinstance(obj, h5py.Dataset) :
-                try :
-                    tempType = obj.dtype # this is required to provoke a type error for closed data sets
-                    
-                    #LOG.debug ('type: ' + str(tempType))
-                    variableList.append(name)
-                except TypeError :
-                    LOG.debug('TypeError prevents the use of variable ' + name
-                              + '. This variable will be ignored')
+        inventory    = self.get_variable_inventory()
+        variableList = [name for name in sorted(inventory.keys()) if inventory[name].is_loadable()]
         
-        self._h5.visititems(testFn)
-        
-        LOG.debug('variables from visiting h5 file structure: ' + str(variableList))
+        LOG.debug('variables from the h5 file inventory: ' + str(variableList))
         
         return(variableList)
     
+    def get_variable_inventory(self):
+        """
+        get a dictionary of HDF5VariableInfo objects describing every dataset
+        in the file, the file structure is only walked the first time this is called
+        """
+        
+        if self._inventory is None :
+            self._inventory = build_hdf5_inventory(self._h5)
+        
+        return self._inventory
+    
+    def get_variable_info(self, name):
+        """
+        get the HDF5VariableInfo for a variable, or None if it isn't a dataset in the file
+        """
+        
+        return self.get_variable_inventory().get(name.lstrip('/'), None)
+    
     @staticmethod
     def trav(h5,pth): 
         return reduce( lambda x,a: x[a] if a else x, pth.split('/'), h5)
@@ -716,8 +1162,21 @@ class h5(object):
     # this returns a numpy array with a copy of the full, scaled
     # data for this variable, if the data type must be changed to allow
     # for scaling it will be (so the return type may not reflect the
-    # type found in the original file)
+    # type found in the original file); data that doesn't need scaling
+    # may come back as a copy on write memory map of the file instead
+    # (see memory_map_hdf5_dataset)
     def __getitem__(self, name):
+        return self.get_variable_region(name, slice(None))
+    
+    # this returns a numpy array with a copy of the scaled data in
+    # the given region (anything that can be used to index a numpy
+    # array) of this variable, scaled the same way __getitem__ would
+    def get_variable_region(self, name, region):
+        return self.get_variable_region_packed(name, region).unpack()
+    
+    # this returns a PackedData object with a copy of the raw data in the
+    # given region of this variable and the information needed to scale it
+    def get_variable_region_packed(self, name, region=slice(None)):
         
         # defaults
         scale_factor = 1.0
@@ -725,9 +1184,11 @@ class h5(object):
         data_type = np.float32 # TODO temporary
         
         # get the variable object and use it to
-        # get our raw data and scaling info
+        # get our raw data and scaling info, mapping the data
+        # rather than reading it if we can
         variable_object = self.get_variable_object(name)
-        raw_data_copy = variable_object[:]
+        mapped_data = memory_map_hdf5_dataset(variable_object) if self._use_memory_maps else None
+        raw_data_copy = mapped_data[region] if mapped_data is not None else variable_object[region]
         
         #print ('*************************')
         #print (dir (variable_object.id)) # TODO, is there a way to get the scale and offset through this?
@@ -743,24 +1204,35 @@ class h5(object):
         
         # don't do lots of work if we don't need to scale things
         if (scale_factor == 1.0) and (add_offset == 0.0) :
-            return raw_data_copy
-        
-        # get information about where the data is the missing value
-        missing_val = self.missing_value(name)
-        missing_mask = np.zeros(raw_data_copy.shape, dtype=np.bool)
-        missing_mask[raw_data_copy == missing_val] = True
+            return PackedData(raw_data_copy)
         
-        # create the scaled version of the data
-        scaled_data_copy = np.array(raw_data_copy, dtype=data_type)
-        scaled_data_copy[~missing_mask] = (scaled_data_copy[~missing_mask] * scale_factor) + add_offset #TODO, type truncation issues?
-        
-        return scaled_data_copy
+        return PackedData(raw_data_copy, scale_factor, add_offset, self.missing_value(name), data_type) #TODO, type truncation issues?
+    
+    def get_variable_shape(self, name):
+        """
+        get the shape of a variable without reading its data
+        """
+        variableInfo = self.get_variable_info(name)
+        if variableInfo is not None :
+            return variableInfo.shape
+        return self.get_variable_object(name).shape
+    
+    def variable(self, name):
+        """
+        get a lazy VariableHandle on the named variable, nothing is read until it's sliced
+        """
+        return VariableHandle(self, name)
     
     def get_variable_object(self,name):
         return h5.trav(self._h5, name)
     
     def missing_value(self, name):
         
+        # the inventory already looked up the fill value when it was built
+        variableInfo = self.get_variable_info(name)
+        if variableInfo is not None :
+            return variableInfo.fill_value
+        
         toReturn = None
         
         # get the missing value if it has been set
@@ -861,8 +1333,9 @@ class h5(object):
         check to see if the indicated variable is a type that can be loaded
         """
         
-        # TODO, are there any bad types for these files?
-        return True
+        # datasets with types h5py can't handle are marked in the inventory
+        variableInfo = self.get_variable_info(name)
+        return (variableInfo is None) or variableInfo.is_loadable()
 
 
 class aeri(object):
@@ -921,6 +1394,23 @@ class aeri(object):
         else:
             raise LookupError('cannot find variable %s' % name)
        
+    # this format can't read part of a variable, so the whole
+    # variable is read and the region is taken from that
+    def get_variable_region(self, name, region):
+        return self[name][region]
+    
+    def get_variable_shape(self, name):
+        """
+        get the shape of a variable (for this format the data must be read to find it)
+        """
+        return self[name].shape
+    
+    def variable(self, name):
+        """
+        get a lazy VariableHandle on the named variable, nothing is read until it's sliced
+        """
+        return VariableHandle(self, name)
+    
     def get_variable_object(self,name):
         return None
     
@@ -1140,6 +1630,23 @@ class tiff (object):
         # than let the garbage collector take care of it
         self._tiff = None
     
+    # this format can't read part of a variable, so the whole
+    # variable is read and the region is taken from that
+    def get_variable_region(self, name, region):
+        return self[name][region]
+    
+    def get_variable_shape(self, name):
+        """
+        get the shape of a variable (for this format the data must be read to find it)
+        """
+        return self[name].shape
+    
+    def variable(self, name):
+        """
+        get a lazy VariableHandle on the named variable, nothing is read until it's sliced
+        """
+        return VariableHandle(self, name)
+    
     def get_variable_object(self, name):
         return None
     
@@ -1270,6 +1777,23 @@ class jpss_adl(object):
             return np.array([field])
         return np.array(field)
        
+    # this format can't read part of a variable, so the whole
+    # variable is read and the region is taken from that
+    def get_variable_region(self, name, region):
+        return self[name][region]
+    
+    def get_variable_shape(self, name):
+        """
+        get the shape of a variable (for this format the data must be read to find it)
+        """
+        return self[name].shape
+    
+    def variable(self, name):
+        """
+        get a lazy VariableHandle on the named variable, nothing is read until it's sliced
+        """
+        return VariableHandle(self, name)
+    
     def get_variable_object(self,name):
         return None
     
@@ -1369,7 +1893,14 @@ def open(pathname, allowWrite=False):
         suffix = os.environ.get('FORMAT', None)
         LOG.info('overriding unknown load format to "%s"' % suffix)
     cls = globals()[suffix]
-    return cls(pathname, allowWrite=allowWrite)
+    fileObject = cls(pathname, allowWrite=allowWrite)
+    
+    # remember where the file came from and how it was opened, so that
+    # data decoded from it can be recognized later (see load.DecodedVariableCache)
+    fileObject.path        = os.path.abspath(pathname)
+    fileObject.allow_write = allowWrite
+    
+    return fileObject
 
 if __name__=='__main__':
     import doctest
@@ -8,7 +8,7 @@ Created by evas Dec 2012.
 Copyright (c) 2012 University of Wisconsin SSEC. All rights reserved.
 """
 
-import logging
+import logging, os, threading, collections
 #from pycdf import CDFError
 import numpy
 
@@ -16,11 +16,16 @@ import glance.delta  as delta
 import glance.data   as dataobj
 import glance.io     as io
 from glance.util        import get_percentage_from_mask
-from glance.lonlat_util import check_lon_lat_equality, compare_spatial_invalidity
+from glance.lonlat_util import check_lon_lat_equality, compare_spatial_invalidity, ProjectedCoordinateCache
 from glance.constants   import *
 
 LOG = logging.getLogger(__name__)
 
+# the most memory, in bytes, that the decoded variable cache may hold
+DECODED_VARIABLE_CACHE_SIZE = 1024 * 1024 * 1024
+# the most memory, in bytes, that data read ahead by a VariablePrefetcher may hold before it's used
+PREFETCH_MEMORY_BUDGET      = 1024 * 1024 * 1024
+
 def _get_and_analyze_lon_lat (fileObject,
                               latitudeVariableName, longitudeVariableName,
                               latitudeDataFilterFn=None, longitudeDataFilterFn=None,
@@ -37,7 +42,7 @@ def _get_and_analyze_lon_lat (fileObject,
     if (alternateFilePath is not None) :
         LOG.info("Loading alternate file (" + alternateFilePath
                  + ") for file " + fileDescriptior + " longitude/latitude.")
-        fileToUse = dataobj.FileInfo(alternateFilePath)
+        fileToUse = dataobj.get_shared_file_info(alternateFilePath)
     
     # get the longitude
     LOG.info ('longitude name: ' + longitudeVariableName)
@@ -82,6 +87,8 @@ def handle_lon_lat_info (lon_lat_settings, a_file_object, b_file_object, output_
     This may result in a ValueError if the longitude or latitude cannot be loaded.
     This may result in a VariableComparisonError if the longitude or latitude cannot be compared due to size.
     
+    The returned lon/lat information includes a ProjectedCoordinateCache (under PROJECTION_CACHE_KEY)
+    that all the mapped figures drawn on this lon/lat can share.
     """
     # a place to save some general stats about our lon/lat data
     spatialInfo = { }
@@ -116,6 +123,9 @@ def handle_lon_lat_info (lon_lat_settings, a_file_object, b_file_object, output_
                                                     alternateFilePath=lon_lat_settings[LONLAT_ALT_FILE_B_KEY] if (LONLAT_ALT_FILE_B_KEY in lon_lat_settings) else None,
                                                     fileDescriptior="b")
     
+    # the projected coordinates of this lon/lat will be shared by all of the mapped figures
+    projectionCache = ProjectedCoordinateCache()
+    
     # if we need to, test the level of equality of the "valid" values in our lon/lat
     if should_check_equality :
         
@@ -123,7 +133,7 @@ def handle_lon_lat_info (lon_lat_settings, a_file_object, b_file_object, output_
                                                  longitude_b_object, latitude_b_object,
                                                  lon_lat_settings[LON_LAT_EPSILON_KEY],
                                                  should_make_images, output_path,
-                                                 fullDPI=fullDPI, thumbDPI=thumbDPI)
+                                                 fullDPI=fullDPI, thumbDPI=thumbDPI, projectionCache=projectionCache)
         # update our existing spatial information
         spatialInfo.update(moreSpatialInfo)
         
@@ -132,7 +142,7 @@ def handle_lon_lat_info (lon_lat_settings, a_file_object, b_file_object, output_
                                 compare_spatial_invalidity(longitude_a_object, longitude_b_object,
                                                            latitude_a_object,  latitude_b_object,
                                                            spatialInfo, should_make_images, output_path,
-                                                           fullDPI=fullDPI, thumbDPI=thumbDPI)
+                                                           fullDPI=fullDPI, thumbDPI=thumbDPI, projectionCache=projectionCache)
     else:
         spaciallyInvalidMask = None
         longitude_common     = None
@@ -161,7 +171,8 @@ def handle_lon_lat_info (lon_lat_settings, a_file_object, b_file_object, output_
                        LON_KEY:             longitude_common,
                        LAT_KEY:             latitude_common,
                        INVALID_MASK_KEY:    spaciallyInvalidMask
-                      }
+                      },
+            PROJECTION_CACHE_KEY:   projectionCache
             }, \
            spatialInfo
 
@@ -200,7 +211,8 @@ def handle_lon_lat_info_for_one_file (lon_lat_settings, file_object) :
             LAT_KEY:             lat_object.data,
             INVALID_MASK_KEY:    lon_object.masks.ignore_mask | lat_object.masks.ignore_mask,
             LON_FILL_VALUE_KEY:  lon_object.fill_value,
-            LAT_FILL_VALUE_KEY:  lat_object.fill_value
+            LAT_FILL_VALUE_KEY:  lat_object.fill_value,
+            PROJECTION_CACHE_KEY: ProjectedCoordinateCache()
             }, \
            spatialInfo
 
@@ -227,6 +239,277 @@ def open_and_process_files (fileNames):
 class ValueErrorStringToFloat(Exception):
     pass
 
+class DecodedVariableCache (object) :
+    """
+    This class represents a cache of the decoded (scaled) data for variables in files, so
+    that a variable used several times in a run (as the data, as a filter for other data,
+    as longitude or latitude, etc.) is only read and decoded once.
+    
+    Data is cached as it comes out of the file, before any filters or type conversions are
+    applied, so the filters don't need to be part of the cache key. Entries are keyed by
+    the file's path, size and modification time and the variable name. Only files opened
+    read only through io.open can be cached, since we can't tell where other file objects
+    came from or whether they will change.
+    
+    The cached arrays are made read only since they are shared; copy one before changing it.
+    When adding an array would make the cache hold more than maxBytes the least recently
+    used arrays are evicted; arrays bigger than maxBytes are never cached.
+    """
+    
+    def __init__ (self, maxBytes=DECODED_VARIABLE_CACHE_SIZE) :
+        """
+        create an empty cache that will hold at most maxBytes of data
+        """
+        
+        self.max_bytes = maxBytes
+        self._arrays   = collections.OrderedDict()
+        self._bytes    = 0
+        self._lock     = threading.RLock()
+        self.clear()
+    
+    def clear (self) :
+        """
+        empty the cache and reset the hit, miss, and eviction counts
+        """
+        
+        with self._lock :
+            self._arrays.clear()
+            self._bytes    = 0
+            self.hits      = 0
+            self.misses    = 0
+            self.evictions = 0
+    
+    @staticmethod
+    def _key (fileObject, variableName) :
+        """
+        get the key for a variable in a file, or None if it can't be cached
+        """
+        
+        path = getattr(fileObject, 'path', None)
+        if (path is None) or getattr(fileObject, 'allow_write', True) :
+            return None
+        statsForFile = os.stat(path)
+        
+        return (path, statsForFile.st_size, statsForFile.st_mtime, variableName)
+    
+    def get (self, fileObject, variableName) :
+        """
+        get the decoded data for a variable, reading it from the file if it isn't cached
+        """
+        
+        key = DecodedVariableCache._key(fileObject, variableName)
+        if key is None :
+            return fileObject[variableName]
+        
+        with self._lock :
+            if key in self._arrays :
+                self.hits += 1
+                data = self._arrays.pop(key)
+                self._arrays[key] = data
+                return data
+            self.misses += 1
+        
+        data = numpy.asarray(fileObject[variableName])
+        data.flags.writeable = False
+        
+        with self._lock :
+            if (data.nbytes <= self.max_bytes) and (key not in self._arrays) :
+                while self._bytes + data.nbytes > self.max_bytes :
+                    _, evicted = self._arrays.popitem(last=False)
+                    self._bytes    -= evicted.nbytes
+                    self.evictions += 1
+                self._arrays[key] = data
+                self._bytes      += data.nbytes
+        
+        return data
+    
+    def log_statistics (self) :
+        """
+        log how well the cache has worked
+        """
+        
+        LOG.info("decoded variable cache: " + str(self.hits) + " hits, " + str(self.misses) + " misses, "
+                 + str(self.evictions) + " evictions, " + str(len(self._arrays)) + " variables ("
+                 + str(self._bytes) + " bytes) held")
+
+# the decoded variable cache shared by everything in this process
+_decoded_variable_cache = DecodedVariableCache()
+
+def log_and_clear_decoded_variable_cache ( ) :
+    """
+    log the decoded variable cache's statistics and empty it, this should be done at the end of each run
+    """
+    
+    _decoded_variable_cache.log_statistics()
+    _decoded_variable_cache.clear()
+
+def _read_variable (fileObject, variableName, packed) :
+    """
+    read the packed or decoded data for a variable, the way a VariablePrefetcher would
+    """
+    
+    if packed :
+        return fileObject.get_variable_region_packed(variableName)
+    
+    return _decoded_variable_cache.get(fileObject, variableName)
+
+def _data_size (data) :
+    """
+    get the number of bytes held by data from _read_variable
+    """
+    
+    return numpy.asarray(data.data if isinstance(data, io.PackedData) else data).nbytes
+
+class VariablePrefetcher (object) :
+    """
+    This class reads the variables a run will need on background threads, ahead of when they're
+    needed, so that reading and decoding the next variables overlaps with analyzing and plotting
+    the current one.
+    
+    The reads are planned up front: plannedReads holds one list of (fileObject, variableName, packed)
+    reads for each variable that will be analyzed, in the order they will be analyzed. Packed reads
+    get the packed data (see load_packed_variable_data), the others get the decoded data (through the
+    decoded variable cache). Each file gets a thread of its own, so the A and B files are read at
+    the same time. A file is read while holding the same lock an io.LockedFile wrapper around it
+    would use, since most of the libraries used to read the files aren't thread safe; so while
+    reading ahead, anything else done with the planned file objects must be done through
+    io.LockedFile wrappers (or while holding their lock). It's easiest to plan the reads with
+    wrapped file objects and use those for everything.
+    
+    Reads for a variable are started no more than depth variables ahead of the current one (see
+    advance), and only the current variable's reads are started while the data that has been read
+    ahead but not used yet holds more than maxBytes.
+    """
+    
+    def __init__ (self, plannedReads, depth, maxBytes=PREFETCH_MEMORY_BUDGET) :
+        """
+        start reading ahead through the planned reads
+        """
+        
+        self.depth      = depth
+        self.max_bytes  = maxBytes
+        self.hits       = 0
+        self.misses     = 0
+        self._condition = threading.Condition()
+        self._current   = 0
+        self._held      = 0
+        self._stopped   = False
+        self._queued    = { } # key -> variable index, for reads that haven't started
+        self._reading   = set()
+        self._results   = { } # key -> (variable index, data, exception)
+        self._locks     = { } # id(fileObject) -> the lock shared by everything using that file
+        
+        lanes = collections.OrderedDict()
+        for index, reads in enumerate(plannedReads) :
+            for fileObject, variableName, packed in reads :
+                key = VariablePrefetcher._key(fileObject, variableName, packed)
+                if key in self._queued :
+                    continue
+                self._queued[key] = index
+                lanes.setdefault(id(fileObject), [ ]).append((index, key, fileObject, variableName, packed))
+                if id(fileObject) not in self._locks :
+                    self._locks[id(fileObject)] = io.LockedFile(fileObject).lock
+        
+        for lane in lanes.values() :
+            laneThread = threading.Thread(target=self._read_lane, args=(lane,))
+            laneThread.daemon = True
+            laneThread.start()
+    
+    @staticmethod
+    def _key (fileObject, variableName, packed) :
+        return (id(fileObject), variableName, bool(packed))
+    
+    def _read_lane (self, lane) :
+        """
+        read one file's planned reads in order, staying within the depth and memory budget
+        """
+        
+        for index, key, fileObject, variableName, packed in lane :
+            
+            with self._condition :
+                while (not self._stopped) and (key in self._queued) and \
+                        ((index > self._current + self.depth) or ((index > self._current) and (self._held > self.max_bytes))) :
+                    self._condition.wait()
+                if self._stopped :
+                    return
+                # the data may have been read directly, or no longer be needed
+                if key not in self._queued :
+                    continue
+                del self._queued[key]
+                self._reading.add(key)
+            
+            data, error = None, None
+            with self._locks[id(fileObject)] :
+                try :
+                    data = _read_variable(fileObject, variableName, packed)
+                except Exception, ex :
+                    error = ex
+            
+            with self._condition :
+                self._reading.discard(key)
+                if index >= self._current :
+                    self._results[key] = (index, data, error)
+                    self._held        += _data_size(data) if error is None else 0
+                self._condition.notify_all()
+    
+    def advance (self, index) :
+        """
+        note that the variable at the given index in the planned reads is now the current one;
+        data read ahead for earlier variables that was never used is let go
+        """
+        
+        with self._condition :
+            self._current = index
+            for key, (resultIndex, data, error) in self._results.items() :
+                if resultIndex < index :
+                    del self._results[key]
+                    self._held -= _data_size(data) if error is None else 0
+            self._condition.notify_all()
+    
+    def get (self, fileObject, variableName, packed=False) :
+        """
+        get the packed or decoded data for a variable, waiting for it if it's being read ahead,
+        or reading it now if it wasn't (or hasn't started being) read ahead
+        """
+        
+        key = VariablePrefetcher._key(fileObject, variableName, packed)
+        with self._condition :
+            self._queued.pop(key, None)
+            while key in self._reading :
+                self._condition.wait()
+            result = self._results.pop(key, None)
+            if result is not None :
+                _, data, error = result
+                self._held -= _data_size(data) if error is None else 0
+                self.hits  += 1
+                self._condition.notify_all()
+            else :
+                self.misses += 1
+        
+        if result is not None :
+            if error is not None :
+                raise error
+            return data
+        
+        # the file can't be read while one of our threads is reading it
+        with io.LockedFile(fileObject).lock :
+            return _read_variable(fileObject, variableName, packed)
+    
+    def close (self) :
+        """
+        stop reading ahead, let go of any data that hasn't been used, and log how well the reading ahead worked
+        """
+        
+        with self._condition :
+            self._stopped = True
+            self._queued.clear()
+            self._results.clear()
+            self._held = 0
+            self._condition.notify_all()
+        
+        LOG.info("variable prefetch: " + str(self.hits) + " reads were ready or in progress when needed, "
+                 + str(self.misses) + " were not read ahead")
+
 def load_variable_data(fileObject, variableNameInFile,
                        forceDType=None,
                        dataFilter=None,
@@ -234,13 +517,16 @@ def load_variable_data(fileObject, variableNameInFile,
                        variableBasedFilter=None,
                        altVariableFileObject=None,
                        fileDescriptionForDisplay="file",
-                       correctForAWIPS=False) :
+                       correctForAWIPS=False,
+                       prefetcher=None) :
     """
     load data for a variable from a file
     optionally filter the variable data based on a data filter or another variable
     
     dataFilter must be in the form of (lambda data: some manipulation returning the new data)
     variableBasedFilter must be in the form of (lambda data, filterData: some manipulation returning the new data))
+    
+    if a VariablePrefetcher is given, the data will be taken from it (so it may already have been read)
     """
     
     variableData     = None
@@ -252,7 +538,9 @@ def load_variable_data(fileObject, variableNameInFile,
         exceptionToRaise = ValueError("File was not properly opened so variable '" + variableNameInFile + "' could not be loaded.")
     else :
         try :
-            variableData = numpy.array(fileObject[variableNameInFile]) if forceDType is None else numpy.array(fileObject[variableNameInFile], dtype=forceDType)
+            decodedData  = _decoded_variable_cache.get(fileObject, variableNameInFile) if prefetcher is None else \
+                           prefetcher.get(fileObject, variableNameInFile)
+            variableData = numpy.array(decodedData) if forceDType is None else numpy.array(decodedData, dtype=forceDType)
             variableData = variableData.astype(numpy.uint8) if correctForAWIPS else variableData
         except Exception, ex :
             if type(ex) is ValueError and str(ex) == "could not convert string to float: ":
@@ -280,11 +568,111 @@ def load_variable_data(fileObject, variableNameInFile,
         if altVariableFileObject is not None :
             fileToUseTemp = altVariableFileObject # TODO, is this the right kind of object?
         
-        dataToFilterOn = fileToUseTemp[variableToFilterOn]
+        dataToFilterOn = numpy.array(_decoded_variable_cache.get(fileToUseTemp, variableToFilterOn) if prefetcher is None else
+                                     prefetcher.get(fileToUseTemp, variableToFilterOn))
         variableData   = variableBasedFilter(variableData, dataToFilterOn)
     
     return variableData
 
+def load_packed_variable_data (fileObject, variableNameInFile,
+                               fileDescriptionForDisplay="file",
+                               prefetcher=None) :
+    """
+    load the packed data for a variable from a file as an io.PackedData, without unpacking it;
+    unpacking the returned data gives the same data load_variable_data would load with no filters
+    
+    if the file type can't provide packed data None is returned and the data should be loaded normally
+    
+    if a VariablePrefetcher is given, the data will be taken from it (so it may already have been read)
+    """
+    
+    if (fileObject is None) or not hasattr(fileObject, 'get_variable_region_packed') :
+        return None
+    
+    LOG.debug("loading packed data for variable " + variableNameInFile + " from " + fileDescriptionForDisplay)
+    try :
+        packedData = fileObject.get_variable_region_packed(variableNameInFile) if prefetcher is None else \
+                     prefetcher.get(fileObject, variableNameInFile, packed=True)
+    except Exception, ex :
+        raise ValueError('Unable to retrieve ' + variableNameInFile + ' data. The variable name' +
+                  ' may not exist in this file or an error may have occured while attempting to' +
+                  ' access the data. Details of file access error observed: ' + str(ex))
+    
+    return packedData
+
+def get_chunk_regions (shape, chunkSize) :
+    """
+    split an array of the given shape into regions that each hold no more than
+    chunkSize points, the regions are tuples of slices and integer indexes that
+    walk through the array in order along its leading dimensions
+    
+    if even a single point along the last dimension is bigger than chunkSize
+    (which can only happen when chunkSize is less than one) single points are used
+    """
+    
+    # a scalar or one dimensional array can be split directly
+    if len(shape) <= 1 :
+        length = shape[0] if len(shape) > 0 else 1
+        step   = max(int(chunkSize), 1)
+        for start in range(0, length, step) :
+            yield (slice(start, min(start + step, length)),) if len(shape) > 0 else ()
+        return
+    
+    # figure out how many rows of the leading dimension fit in a chunk
+    rowSize = int(numpy.prod(shape[1:]))
+    if rowSize <= chunkSize :
+        step = max(int(chunkSize) // max(rowSize, 1), 1)
+        for start in range(0, shape[0], step) :
+            yield (slice(start, min(start + step, shape[0])),)
+    
+    # if a single row is too big, split each row along the remaining dimensions
+    else :
+        for row in range(shape[0]) :
+            for subRegion in get_chunk_regions(shape[1:], chunkSize) :
+                yield (row,) + subRegion
+
+def load_variable_region (fileObject, variableNameInFile, region,
+                          forceDType=None,
+                          fileDescriptionForDisplay="file") :
+    """
+    load the data in one region of a variable (such as one given by get_chunk_regions)
+    """
+    
+    if fileObject is None :
+        raise ValueError("File was not properly opened so variable '" + variableNameInFile + "' could not be loaded.")
+    
+    LOG.debug("loading region " + str(region) + " of variable " + variableNameInFile + " from " + fileDescriptionForDisplay)
+    try :
+        regionData = numpy.array(fileObject.variable(variableNameInFile)[region], dtype=forceDType)
+    except Exception, ex :
+        raise ValueError('Unable to retrieve ' + variableNameInFile + ' data. The variable name' +
+                  ' may not exist in this file or an error may have occured while attempting to' +
+                  ' access the data. Details of file access error observed: ' + str(ex))
+    
+    return regionData
+
+def load_variable_chunks (fileObject, variableNameInFile, chunkSize,
+                          forceDType=None,
+                          fileDescriptionForDisplay="file") :
+    """
+    load the data for a variable from a file a chunk at a time, so that no more
+    than about chunkSize points are held in memory at once
+    
+    this yields (region, data) where region is the part of the variable (as given
+    by get_chunk_regions) that the data array was read from
+    """
+    
+    if fileObject is None :
+        raise ValueError("File was not properly opened so variable '" + variableNameInFile + "' could not be loaded.")
+    
+    shape = fileObject.variable(variableNameInFile).shape
+    LOG.debug("loading data for variable " + variableNameInFile + " from " + fileDescriptionForDisplay
+              + " in chunks of up to " + str(chunkSize) + " points")
+    
+    for region in get_chunk_regions(shape, chunkSize) :
+        yield region, load_variable_region(fileObject, variableNameInFile, region,
+                                           forceDType=forceDType, fileDescriptionForDisplay=fileDescriptionForDisplay)
+
 def load_data_object (fileObject, variableNameInFile,
                       rangeMin=None,
                       rangeMax=None,
@@ -9,7 +9,7 @@ Copyright (c) 2012 University of Wisconsin SSEC. All rights reserved.
 """
 
 import numpy
-import logging
+import logging, hashlib
 
 import glance.data   as dataobj
 import glance.plot   as plot
@@ -22,12 +22,14 @@ LOG = logging.getLogger(__name__)
 def check_lon_lat_equality(longitudeADataObject, latitudeADataObject,
                            longitudeBDataObject, latitudeBDataObject,
                            llepsilon, doMakeImages, outputPath,
-                           fullDPI=None, thumbDPI=None) :
+                           fullDPI=None, thumbDPI=None, projectionCache=None) :
     """
     check to make sure the longitude and latitude are equal everywhere that's not in the ignore masks
     if they are not and doMakeImages was passed as True, generate appropriate figures to show where
     return the number of points where they are not equal (0 would mean they're the same)
     
+    if a ProjectedCoordinateCache is given the figures will get their projected coordinates from it
+    
     If the latitude or longitude cannot be compared, this may raise a VariableComparisonError.
     """
     # first of all, if the latitude and longitude are not the same shape, then things can't ever be "equal"
@@ -63,7 +65,8 @@ def check_lon_lat_equality(longitudeADataObject, latitudeADataObject,
                                                    "(Shown in A)",
                                                    "LonLatMismatch",
                                                    outputPath, True,
-                                                   fullDPI=fullDPI, thumbDPI=thumbDPI, units="degrees")
+                                                   fullDPI=fullDPI, thumbDPI=thumbDPI, units="degrees",
+                                                   projectionCache=projectionCache)
             
             if ((len(longitudeBDataObject.data[~longitudeBDataObject.masks.ignore_mask]) > 0) and
                 (len( latitudeBDataObject.data[~ latitudeBDataObject.masks.ignore_mask]) > 0)) :
@@ -73,7 +76,8 @@ def check_lon_lat_equality(longitudeADataObject, latitudeADataObject,
                                                    "(Shown in B)",
                                                    "LonLatMismatch",
                                                    outputPath, True,
-                                                   fullDPI=fullDPI, thumbDPI=thumbDPI, units="degrees")
+                                                   fullDPI=fullDPI, thumbDPI=thumbDPI, units="degrees",
+                                                   projectionCache=projectionCache)
     
     # setup our return data
     returnInfo = {}
@@ -85,12 +89,14 @@ def check_lon_lat_equality(longitudeADataObject, latitudeADataObject,
 def compare_spatial_invalidity(longitude_a_object, longitude_b_object,
                                latitude_a_object,  latitude_b_object,
                                spatial_info, do_include_images, output_path,
-                               fullDPI=None, thumbDPI=None) :
+                               fullDPI=None, thumbDPI=None, projectionCache=None) :
     """ 
     Given information about where the two files are spatially invalid, figure
     out what invalidity they share and save information or plots for later use
     also build a shared longitude/latitude based on A but also including valid
     points in B
+    
+    if a ProjectedCoordinateCache is given the plots will get their projected coordinates from it
     """
     # make our common invalid masks
     invalid_in_a_mask = longitude_a_object.masks.ignore_mask | latitude_a_object.masks.ignore_mask
@@ -131,7 +137,8 @@ def compare_spatial_invalidity(longitude_a_object, longitude_b_object,
                                                "A", "Points only valid in\nFile A\'s longitude & latitude",
                                                "SpatialMismatch",
                                                output_path, True,
-                                               fullDPI=fullDPI, thumbDPI=thumbDPI, units="degrees")
+                                               fullDPI=fullDPI, thumbDPI=thumbDPI, units="degrees",
+                                               projectionCache=projectionCache)
         if ((spatial_info[B_FILE_TITLE_KEY][NUMBER_INVALID_PTS_KEY] > 0) and (do_include_images) and
             (len(longitude_b_object.data[~invalid_in_b_mask]) > 0) and
             (len( latitude_b_object.data[~invalid_in_b_mask]) > 0)
@@ -141,10 +148,59 @@ def compare_spatial_invalidity(longitude_a_object, longitude_b_object,
                                                "B", "Points only valid in\nFile B\'s longitude & latitude",
                                                "SpatialMismatch",
                                                output_path, True,
-                                               fullDPI=fullDPI, thumbDPI=thumbDPI, units="degrees")
+                                               fullDPI=fullDPI, thumbDPI=thumbDPI, units="degrees",
+                                               projectionCache=projectionCache)
     
     return invalid_in_common_mask, spatial_info, longitude_common, latitude_common
 
+class ProjectedCoordinateCache (object) :
+    """
+    longitude and latitude arrays projected into the x/y coordinates of the basemaps used to
+    draw them; projecting the full lon/lat is one of the slower parts of making a mapped figure,
+    and in a report every variable is usually drawn on the same lon/lat with the same projection,
+    so each unique lon/lat and projection pair is only projected once
+    
+    the lon/lat are identified by their contents and the projections by their proj4 definition
+    and offsets; the lon/lat arrays should not be changed once they've been projected
+    """
+    
+    def __init__ (self) :
+        
+        self._projected    = { }
+        self._fingerprints = { }
+    
+    def _fingerprint (self, array) :
+        """
+        get a string that identifies the contents of the array
+        
+        the same arrays will be asked about over and over, so the fingerprints are remembered
+        by identity (holding on to the array, so that its id can't be reused by another one)
+        """
+        
+        if id(array) not in self._fingerprints :
+            contiguousArray = numpy.ascontiguousarray(array)
+            fingerprint     = (str(contiguousArray.dtype) + str(contiguousArray.shape)
+                               + hashlib.md5(contiguousArray.view(numpy.uint8).ravel()).hexdigest())
+            self._fingerprints[id(array)] = (array, fingerprint)
+        
+        return self._fingerprints[id(array)][1]
+    
+    def project (self, longitude, latitude, baseMapInstance) :
+        """
+        get the x and y coordinates of the longitude and latitude in the basemap's projection
+        
+        the returned arrays are shared, so they should not be modified
+        """
+        
+        cacheKey = (self._fingerprint(longitude), self._fingerprint(latitude),
+                    baseMapInstance.srs, baseMapInstance.projtran.llcrnrx, baseMapInstance.projtran.llcrnry)
+        
+        if cacheKey not in self._projected :
+            LOG.debug("Projecting longitude and latitude for: " + baseMapInstance.srs)
+            self._projected[cacheKey] = baseMapInstance(longitude, latitude)
+        
+        return self._projected[cacheKey]
+
 class VariableComparisonError(Exception):
     """
     The exception raised when a variable could not be compared.
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+This module keeps track of the files glance has generated and what went
+into them, so that a rerun can reuse the ones that would not change.
+
+Copyright (c) 2012 University of Wisconsin SSEC. All rights reserved.
+"""
+
+import os, logging, json
+
+LOG = logging.getLogger(__name__)
+
+# each output directory's manifest is stored in a file with this name;
+# the version should be changed whenever the layout of the manifest changes
+MANIFEST_FILE_NAME = 'report-manifest.json'
+MANIFEST_VERSION   = 'artifacts-1'
+
+class ReportManifest (object) :
+    """
+    This class represents a make style record of the artifacts (report pages, sets
+    of images, etc.) generated in one output directory.
+    
+    Each artifact is recorded with a key describing all of the inputs that went into
+    it, the files it produced, and any information (which must be JSON serializable)
+    needed to use it without generating it again. An artifact is up to date if it
+    was recorded with the same key and all of its files still exist.
+    
+    The following member variables are available from this class:
+    
+    directory   - the output directory the manifest describes
+    reused      - the number of up to date artifacts that have been found
+    regenerated - the number of artifacts that have been recorded (after being generated)
+    """
+    
+    def __init__ (self, directory) :
+        """
+        load the manifest for the given directory, if there is one
+        """
+        
+        self.directory   = directory
+        self.reused      = 0
+        self.regenerated = 0
+        self._artifacts  = { }
+        
+        manifestPath = os.path.join(directory, MANIFEST_FILE_NAME)
+        if os.path.exists(manifestPath) :
+            try :
+                with open(manifestPath, 'r') as manifestFile :
+                    saved = json.load(manifestFile)
+                if saved.get('version') == MANIFEST_VERSION :
+                    self._artifacts = saved['artifacts']
+            except (IOError, ValueError, KeyError), err :
+                LOG.warn("Unable to load the report manifest " + manifestPath + " (" + str(err) + "), everything will be regenerated.")
+    
+    def is_up_to_date (self, artifactName, inputsKey) :
+        """
+        is the named artifact up to date for the given inputs key?
+        """
+        
+        artifact = self._artifacts.get(artifactName)
+        if (artifact is None) or (artifact['key'] != inputsKey) :
+            return False
+        for fileName in artifact['files'] :
+            if not os.path.exists(os.path.join(self.directory, fileName)) :
+                return False
+        
+        LOG.debug("Reusing up to date " + artifactName + " in " + self.directory)
+        self.reused += 1
+        
+        return True
+    
+    def get_info (self, artifactName) :
+        """
+        get the information the named artifact was recorded with
+        """
+        
+        return self._artifacts[artifactName]['info']
+    
+    def record (self, artifactName, inputsKey, fileNames, info=None) :
+        """
+        record that the named artifact was generated from the given inputs, producing
+        the given files (relative to the directory), and save the manifest
+        """
+        
+        self._artifacts[artifactName] = {
+                                         'key':   inputsKey,
+                                         'files': list(fileNames),
+                                         'info':  info,
+                                        }
+        self.regenerated += 1
+        self._save()
+    
+    def _save (self) :
+        """
+        save the manifest, writing to a temporary file first so that an
+        interrupted run won't leave a partial manifest behind
+        """
+        
+        manifestPath = os.path.join(self.directory, MANIFEST_FILE_NAME)
+        tempPath     = manifestPath + '.' + str(os.getpid()) + '.tmp'
+        try :
+            with open(tempPath, 'w') as manifestFile :
+                json.dump({'version': MANIFEST_VERSION, 'artifacts': self._artifacts}, manifestFile, indent=1, sort_keys=True)
+            os.rename(tempPath, manifestPath)
+        except (IOError, OSError), err :
+            LOG.warn("Unable to save the report manifest " + manifestPath + " (" + str(err) + ")")
+            if os.path.exists(tempPath) :
+                os.remove(tempPath)
+
+if __name__=='__main__':
+    pass
@@ -16,10 +16,11 @@ import matplotlib
 from pylab import *
 
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
 from PIL import Image
 
-import os, sys, logging
+import os, sys, logging, time, select, signal, traceback, multiprocessing, threading
 import numpy as np
 
 import glance.graphics as maps
@@ -36,90 +37,436 @@ fullSizeDPI = 150 # 200
 # a constant for the thumbnail size dpi
 thumbSizeDPI = 50
 
-def _handle_fig_creation_task(child_figure_function, log_message,
-                              outputPath, fullFigName,
-                              shouldMakeSmall, doFork,
-                              fullDPI=fullSizeDPI, thumbDPI=thumbSizeDPI) :
+def _box_downsample (pixels, newWidth, newHeight) :
     """
-    fork to do something.
-    the parent will return the child pid
-    the child will do it's work and then exit
+    shrink a (height, width, channels) array of image pixels to the new size by averaging
+    the block of pixels that falls into each new pixel (a box filter)
     """
     
-    pid = 0
-    if (doFork) :
-        # do the fork
-        pid = os.fork()
+    height, width = pixels.shape[0], pixels.shape[1]
+    rowStarts = (np.arange(newHeight) * height) // newHeight
+    colStarts = (np.arange(newWidth)  * width)  // newWidth
+    rowCounts = np.diff(np.append(rowStarts, height))
+    colCounts = np.diff(np.append(colStarts, width))
     
-    # figure out if we're the parent or child
-    isParent = not (pid is 0)
-    if (isParent) :
-        return pid
-    else :
-        plt.ioff()
-        figure = child_figure_function() 
-        LOG.info(log_message)
-        if figure is not None :
-            figure.savefig(os.path.join(outputPath, fullFigName), dpi=fullDPI)
-            if (shouldMakeSmall) :
+    sums = np.add.reduceat(np.add.reduceat(pixels.astype(np.uint32), rowStarts, axis=0), colStarts, axis=1)
+    
+    return (sums / (rowCounts[:, np.newaxis, np.newaxis] * colCounts[np.newaxis, :, np.newaxis]).astype(np.float32)
+            + 0.5).astype(np.uint8)
 
-                tempImage = Image.open(os.path.join(outputPath, fullFigName))
-                scaleFactor = float(thumbDPI) / float(fullDPI)
-                originalSize = tempImage.size
-                newSize = (int(originalSize[0] * scaleFactor), int(originalSize[1] * scaleFactor))
-                tempImage = tempImage.resize(newSize, Image.ANTIALIAS)
-                tempImage.save(os.path.join(outputPath, 'small.' + fullFigName))
+def _save_figure_images (figure, fullPath, fullDPI, smallPath=None, thumbDPI=None) :
+    """
+    draw the figure once with the Agg renderer at fullDPI and save it as a png to the
+    fullPath; if a smallPath is given, also save a thumbnail made by shrinking the same
+    pixels to the size the figure would have been at thumbDPI
+    """
+    
+    canvas      = figure.canvas if isinstance(figure.canvas, FigureCanvasAgg) else FigureCanvasAgg(figure)
+    originalDPI = figure.get_dpi()
+    figure.set_dpi(fullDPI)
+    try :
+        canvas.draw()
+        width, height = canvas.get_width_height()
+        pixels = np.frombuffer(canvas.buffer_rgba(), dtype=np.uint8).reshape(height, width, 4)
+        
+        Image.fromarray(pixels, 'RGBA').save(fullPath)
+        if smallPath is not None :
+            scaleFactor = float(thumbDPI) / float(fullDPI)
+            newWidth    = max(int(width  * scaleFactor), 1)
+            newHeight   = max(int(height * scaleFactor), 1)
+            Image.fromarray(_box_downsample(pixels, newWidth, newHeight), 'RGBA').save(smallPath)
+    finally :
+        figure.set_dpi(originalDPI)
 
-            # get rid of the figure
-            plt.close(figure)
-            del(figure)
-        else:
-            LOG.warn("Unable to create plot.")
-    
-    # if we've reached this point and we did fork,
-    # then we're the child process and we should stop now
-    if (doFork) :
-        sys.exit(0) # the child is done now
-    
-    # if we didn't fork, return the 0 pid to indicate that
-    return pid
+def _render_figure (figureFunction, outputPath, fullFigName, shouldMakeSmall,
+                    fullDPI=fullSizeDPI, thumbDPI=thumbSizeDPI) :
+    """
+    create a figure with the figureFunction and save it (and optionally a thumbnail of it)
+    to the outputPath; this is the work done for each FigureRenderer job
+    """
+    
+    figure = figureFunction()
+    if figure is None :
+        raise ValueError("The plotting function did not create a figure.")
+    
+    _save_figure_images(figure, os.path.join(outputPath, fullFigName), fullDPI,
+                        smallPath=os.path.join(outputPath, 'small.' + fullFigName) if shouldMakeSmall else None,
+                        thumbDPI=thumbDPI)
+    
+    # get rid of the figure
+    plt.close(figure)
+    del(figure)
+
+# how many figures a worker process will render before it's replaced with a fresh
+# one, this keeps the memory matplotlib leaks from building up in long runs
+FIGURES_PER_WORKER = 25
+
+# roughly how many bytes of data the figures that are still waiting to be made
+# should be allowed to hold on to before a run stops to let them catch up
+FIGURE_MEMORY_BUDGET = 1024 * 1024 * 1024
 
-def _log_spawn_and_wait_if_needed (imageDescription, childPids, 
-                                   taskFunction, taskOutputPath, taskFigName,
-                                   doMakeThumb=True, doFork=False, shouldClearMemoryWithThreads=False,
-                                   fullDPI=fullSizeDPI, thumbDPI=thumbSizeDPI) :
+def _reset_logging_locks ( ) :
     """
-    create a figure generation task, spawning a process as needed
-    save the childPid to the list of pids if the process will remain outstanding after this method ends
-    the name of the figure that was generated will be added to the image list
+    give logging and all of its handlers new locks in a freshly forked process
+    
+    the process is forked from whichever thread is rendering figures, so another thread (a
+    prefetcher or a file fingerprint, say) may have been holding one of the old locks at the
+    time; it would never be released in the new process and the next log call would hang
     """
-    LOG.info("creating image of "+ imageDescription)
-    
-    # start the actual task
-    pid = _handle_fig_creation_task(taskFunction,
-                                    "saving image of " + imageDescription,
-                                    taskOutputPath, taskFigName,
-                                    doMakeThumb, doFork or shouldClearMemoryWithThreads,
-                                    fullDPI=fullDPI, thumbDPI=thumbDPI)
-    
-    # wait based on the state of the pid we received and why we would have forked
-    childPid = None
-    if not (pid is 0) :
-        if doFork :
-            childPids.append(pid)
-            LOG.debug ("Started child process (pid: " + str(pid) + ") to create image of " + imageDescription)
+    
+    logging._lock = threading.RLock()
+    for handlerReference in logging._handlerList :
+        handler = handlerReference()
+        if handler is not None :
+            handler.createLock()
+
+class FigureJob (object) :
+    """
+    one figure waiting to be rendered (or already rendered) by a FigureRenderer
+    
+    once the job is done, error will hold a description of the problem if the
+    figure could not be made, or None if it was saved successfully; if the figure
+    couldn't be made, its name is also taken back out of the image_list
+    
+    data_object and data_bytes describe the data the figure function holds on to,
+    jobs that share the same data should be given the same data_object; the job
+    keeps its data_object until it's done, so that its id can't be reused by some
+    other data while the job is still waiting
+    """
+    
+    def __init__(self, jobId, description, figureFunction, outputPath, figureName, makeSmall, fullDPI, thumbDPI,
+                 imageList=None, dataObject=None, dataBytes=0) :
+        self.id              = jobId
+        self.description     = description
+        self.figure_function = figureFunction
+        self.output_path     = outputPath
+        self.figure_name     = figureName
+        self.make_small      = makeSmall
+        self.full_dpi        = fullDPI
+        self.thumb_dpi       = thumbDPI
+        self.image_list      = imageList
+        self.data_object     = dataObject
+        self.data_bytes      = dataBytes
+        self.is_done         = False
+        self.error           = None
+    
+    def run (self) :
+        """
+        render the figure in this process, noting any error instead of raising it
+        """
+        
+        LOG.info("saving image of " + self.description)
+        try :
+            _render_figure(self.figure_function, self.output_path, self.figure_name, self.make_small,
+                           fullDPI=self.full_dpi, thumbDPI=self.thumb_dpi)
+        except Exception, e :
+            LOG.debug(traceback.format_exc())
+            self.error = str(e) or e.__class__.__name__
+        self.is_done = True
+
+class _FigureWorker (object) :
+    """
+    the parent's view of one forked figure rendering process
+    
+    the jobs sent to the worker are run in order, the first one in assigned_jobs is the
+    one the worker is working on and it started at job_started (in time.time() terms)
+    """
+    
+    def __init__(self, pid, connection, newestJobId) :
+        self.pid           = pid
+        self.connection    = connection
+        self.newest_job_id = newestJobId # the worker can only run jobs that existed when it was forked
+        self.jobs_sent     = 0
+        self.assigned_jobs = [ ]
+        self.job_started   = None
+    
+    def can_run (self, job) :
+        return (job.id <= self.newest_job_id) and (self.jobs_sent < FIGURES_PER_WORKER)
+    
+    def is_busy (self) :
+        return len(self.assigned_jobs) > 0
+
+class FigureRenderer (object) :
+    """
+    Renders figures in a fixed size pool of worker processes.
+    
+    Jobs are queued with submit and handed out to the workers when poll or wait is called
+    (all of the jobs that the workers can take are sent right away, so the workers keep
+    going while this process does other things), and no more than numberOfWorkers figures
+    are ever being made at once. The figure functions are closures over the data, so rather
+    than pickling them the workers are forked after the jobs they'll run are queued and
+    inherit them (along with matplotlib, which is already imported); the parent only sends
+    each worker the ids of the jobs to run. A worker is replaced after FIGURES_PER_WORKER
+    figures, or when the jobs waiting to run were queued after it was forked.
+    
+    Since the workers are forked while other threads may be reading files, a new worker
+    only uses its own copies of the logging locks (see _reset_logging_locks), and the
+    figure functions must only use data that has already been loaded; they must not read
+    from any of the inherited file objects, whose libraries may have been locked.
+    
+    If jobTimeout is given, a worker that takes longer than that many seconds on one
+    figure is killed and the job is marked as failed (any other jobs it was sent are
+    queued again). Failures are logged and recorded on the jobs (see FigureJob) rather
+    than raised.
+    
+    With numberOfWorkers of 0 the figures are rendered in this process as they're submitted.
+    """
+    
+    def __init__(self, numberOfWorkers=0, jobTimeout=None) :
+        self.number_of_workers = numberOfWorkers
+        self.job_timeout       = jobTimeout if (jobTimeout is not None) and (jobTimeout > 0) else None
+        self._next_job_id      = 0
+        self._waiting_jobs     = [ ]
+        self._workers          = [ ]
+    
+    def submit (self, description, figureFunction, outputPath, figureName, makeSmall=False,
+                fullDPI=fullSizeDPI, thumbDPI=thumbSizeDPI, imageList=None, dataObject=None, dataBytes=0) :
+        """
+        queue a figure to be made and return the FigureJob that will track it
+        
+        the job won't be started until poll or wait is called, so that all the jobs
+        submitted together can be handed to the same workers
+        """
+        
+        LOG.info("creating image of " + description)
+        
+        job = FigureJob(self._next_job_id, description, figureFunction, outputPath, figureName, makeSmall,
+                        fullDPI, thumbDPI, imageList=imageList, dataObject=dataObject, dataBytes=dataBytes)
+        self._next_job_id += 1
+        
+        if self.number_of_workers <= 0 :
+            plt.ioff()
+            job.run()
+            self._note_result(job)
         else :
-            os.waitpid(pid, 0)
+            self._waiting_jobs.append(job)
+        
+        return job
     
-    return
+    def poll (self) :
+        """
+        note any jobs that have finished and start the jobs that are waiting, without waiting
+        """
+        
+        self._collect(0.0)
+        self._dispatch()
+    
+    def wait (self, jobs=None) :
+        """
+        wait until the given jobs (or all the jobs submitted so far) are done
+        """
+        
+        jobs = list(jobs) if jobs is not None else None
+        while True :
+            self._dispatch()
+            # note: all, min and max here are numpy's (from pylab), so stick to lists and lengths
+            if jobs is None :
+                isDone = len(self._outstanding_jobs()) <= 0
+            else :
+                isDone = len([job for job in jobs if not job.is_done]) <= 0
+            if isDone :
+                return
+            self._collect(1.0)
+    
+    def outstanding_data_bytes (self) :
+        """
+        get roughly how many bytes of data are held by the jobs that aren't done yet
+        """
+        
+        dataSizes = { }
+        for job in self._outstanding_jobs() :
+            dataKey = ('data', id(job.data_object)) if job.data_object is not None else ('job', job.id)
+            dataSizes[dataKey] = job.data_bytes
+        totalBytes = 0
+        for dataBytes in dataSizes.values() :
+            totalBytes += dataBytes
+        
+        return totalBytes
+    
+    def close (self) :
+        """
+        finish all the submitted jobs and stop the worker processes
+        """
+        
+        self.wait()
+        for worker in list(self._workers) :
+            self._retire(worker)
+    
+    def _outstanding_jobs (self) :
+        outstandingJobs = list(self._waiting_jobs)
+        for worker in self._workers :
+            outstandingJobs.extend(worker.assigned_jobs)
+        return outstandingJobs
+    
+    def _dispatch (self) :
+        """
+        send the waiting jobs to workers that can run them, replacing or starting workers as needed
+        """
+        
+        while len(self._waiting_jobs) > 0 :
+            job = self._waiting_jobs[0]
+            
+            # retire any idle workers that can't take this job
+            for worker in list(self._workers) :
+                if (not worker.is_busy()) and not worker.can_run(job) :
+                    self._retire(worker)
+            
+            # give the job to an idle worker if there is one, then to a new worker if there's room for
+            # one, and otherwise to whichever worker that can run it has the least work queued up
+            candidates = sorted([worker for worker in self._workers if worker.can_run(job)],
+                                key=lambda worker : len(worker.assigned_jobs))
+            if ((len(candidates) <= 0) or candidates[0].is_busy()) and (len(self._workers) < self.number_of_workers) :
+                candidates.insert(0, self._start_worker())
+            if len(candidates) <= 0 :
+                return
+            worker = candidates[0]
+            
+            self._waiting_jobs.pop(0)
+            if not worker.is_busy() :
+                worker.job_started = time.time()
+            worker.assigned_jobs.append(job)
+            worker.jobs_sent += 1
+            worker.connection.send(job.id)
+    
+    def _collect (self, maxWait) :
+        """
+        wait up to maxWait seconds for busy workers to finish jobs and note the results
+        """
+        
+        busyWorkers = [worker for worker in self._workers if worker.is_busy()]
+        if len(busyWorkers) <= 0 :
+            return
+        
+        timeToWait = maxWait
+        if self.job_timeout is not None :
+            deadlines  = sorted([worker.job_started + self.job_timeout for worker in busyWorkers])
+            timeToWait = deadlines[0] - time.time() if deadlines[0] - time.time() < timeToWait else timeToWait
+            timeToWait = timeToWait if timeToWait > 0.0 else 0.0
+        readyConnections, _, _ = select.select([worker.connection for worker in busyWorkers], [ ], [ ], timeToWait)
+        
+        for worker in busyWorkers :
+            if worker.connection in readyConnections :
+                try :
+                    while worker.is_busy() and worker.connection.poll() :
+                        jobId, error, finishedTime = worker.connection.recv()
+                        job = worker.assigned_jobs.pop(0)
+                        assert job.id == jobId
+                        worker.job_started = finishedTime
+                        self._finish_job(job, error)
+                except (EOFError, IOError) :
+                    self._abandon_worker(worker, "The figure process stopped unexpectedly.")
+                    continue
+            if worker.is_busy() and (self.job_timeout is not None) and (time.time() - worker.job_started > self.job_timeout) :
+                self._abandon_worker(worker, "Timed out after " + str(self.job_timeout) + " seconds.")
+    
+    def _abandon_worker (self, worker, error) :
+        """
+        fail the job a worker is stuck on, kill it, and queue up the rest of its jobs again
+        """
+        
+        self._finish_job(worker.assigned_jobs.pop(0), error)
+        self._waiting_jobs[0:0] = worker.assigned_jobs
+        worker.assigned_jobs    = [ ]
+        self._retire(worker, kill=True)
+    
+    def _finish_job (self, job, error) :
+        job.error   = error
+        job.is_done = True
+        self._note_result(job)
+    
+    def _note_result (self, job) :
+        """
+        report a job that's done and let go of the data its figure needed
+        """
+        
+        job.figure_function = None
+        job.data_object     = None
+        if job.error is not None :
+            LOG.warn("Unable to create image of " + job.description + ": " + job.error)
+            if (job.image_list is not None) and (job.figure_name in job.image_list) :
+                job.image_list.remove(job.figure_name)
+    
+    def _start_worker (self) :
+        """
+        fork a new worker process that can run any of the jobs that aren't done yet
+        """
+        
+        parentConnection, childConnection = multiprocessing.Pipe()
+        jobs = dict((job.id, job) for job in self._outstanding_jobs())
+        
+        pid = os.fork()
+        if pid == 0 :
+            # we're the worker now, we don't need anyone else's connections
+            parentConnection.close()
+            for otherWorker in self._workers :
+                otherWorker.connection.close()
+            exitCode = 0
+            try :
+                _reset_logging_locks()
+                plt.ioff()
+                while True :
+                    jobId = childConnection.recv()
+                    if jobId is None :
+                        break
+                    job = jobs[jobId]
+                    job.run()
+                    childConnection.send((jobId, job.error, time.time()))
+            except :
+                exitCode = 1
+            finally :
+                os._exit(exitCode)
+        
+        childConnection.close()
+        worker = _FigureWorker(pid, parentConnection, self._next_job_id - 1)
+        self._workers.append(worker)
+        LOG.debug("Started figure process (pid: " + str(pid) + ")")
+        
+        return worker
+    
+    def _retire (self, worker, kill=False) :
+        """
+        stop a worker process, it should not have any jobs left unless we're killing it
+        """
+        
+        try :
+            if kill :
+                os.kill(worker.pid, signal.SIGKILL)
+            else :
+                worker.connection.send(None)
+        except (OSError, IOError) :
+            pass # it's already gone
+        worker.connection.close()
+        os.waitpid(worker.pid, 0)
+        self._workers.remove(worker)
+
+def make_figure_renderer (doFork=False, shouldClearMemoryWithThreads=False, numberOfWorkers=None, jobTimeout=None) :
+    """
+    make the FigureRenderer that matches the older image generation settings
+    
+    doFork -                       render figures in a pool of numberOfWorkers processes (or
+                                   one per cpu if numberOfWorkers is None)
+    shouldClearMemoryWithThreads - render figures in a single worker process, so that
+                                   matplotlib's memory leaks don't build up in this process
+    jobTimeout -                   the number of seconds any one figure may take, or None
+    """
+    
+    if doFork :
+        workers = numberOfWorkers if (numberOfWorkers is not None) and (numberOfWorkers > 0) else multiprocessing.cpu_count()
+    elif shouldClearMemoryWithThreads :
+        workers = 1
+    else :
+        workers = 0
+    
+    return FigureRenderer(workers, jobTimeout=jobTimeout)
 
 def plot_and_save_spacial_mismatch(longitudeObject, latitudeObject, spacialMismatchMask,
                                   fileNameDiscriminator, title, fileBaseName, outputPath, makeSmall=False,
-                                  fullDPI=fullSizeDPI, thumbDPI=thumbSizeDPI, units=None) :
+                                  fullDPI=fullSizeDPI, thumbDPI=thumbSizeDPI, units=None, projectionCache=None) :
     """
     given information on spatially placed mismatch points in A and B, plot only those points in a very obvious way
     on top of a background plot of a's data shown in grayscale, save this plot to the output path given
     if makeSmall is passed as true a smaller version of the image will also be saved
+    if a lonlat_util.ProjectedCoordinateCache is given the projected lon/lat will be taken from it
     """
     spaciallyInvalidMask = longitudeObject.masks.ignore_mask | latitudeObject.masks.ignore_mask
     
@@ -133,15 +480,13 @@ def plot_and_save_spacial_mismatch(longitudeObject, latitudeObject, spacialMisma
     LOG.info("Creating spatial mismatch image")
     spatialMismatchFig = figures.create_mapped_figure(None, latitudeObject.data, longitudeObject.data, baseMapInstance,
                                                       boundingAxes, title, invalidMask=spaciallyInvalidMask,
-                                                      tagData=spacialMismatchMask, units=units)
-    # save the figure
+                                                      tagData=spacialMismatchMask, units=units,
+                                                      projectionCache=projectionCache)
+    # save the figure, and we may also save a smaller version of the figure
     LOG.info("Saving spatial mismatch image")
-    spatialMismatchFig.savefig(outputPath + "/" + fileBaseName + "." + fileNameDiscriminator + ".png", dpi=fullDPI) 
-    
-    # we may also save a smaller versions of the figure
-    if (makeSmall) :
-        
-        spatialMismatchFig.savefig(outputPath + "/" + fileBaseName + "." + fileNameDiscriminator + ".small.png", dpi=thumbDPI)
+    _save_figure_images(spatialMismatchFig, outputPath + "/" + fileBaseName + "." + fileNameDiscriminator + ".png", fullDPI,
+                        smallPath=(outputPath + "/" + fileBaseName + "." + fileNameDiscriminator + ".small.png") if makeSmall else None,
+                        thumbDPI=thumbDPI)
     
     # get rid of the figure
     spatialMismatchFig.clf()
@@ -175,7 +520,9 @@ def plot_and_save_comparison_figures (aData, bData,
                                      fullDPI=None, thumbDPI=None,
                                      units_a=None, units_b=None,
                                      useBData=True,
-                                     histRange=None) :
+                                     histRange=None,
+                                     figureRenderer=None,
+                                     figureJobs=None) :
     """
     Plot images for a set of figures based on the data sets and settings
     passed in. The images will be saved to disk according to the settings.
@@ -205,7 +552,8 @@ def plot_and_save_comparison_figures (aData, bData,
                                  LON_KEY:          longitudeDataCommonToBothFiles,
                                  LAT_KEY:          latitudeDataCommonToBothFiles,
                                  INVALID_MASK_KEY: invalidMaskCommonToBothFiles
-                                }
+                                },
+                          PROJECTION_CACHE_KEY = projectedCoordinateCacheForAllOfTheAbove
                           }
     
     required parameters:
@@ -238,6 +586,14 @@ def plot_and_save_comparison_figures (aData, bData,
                          b data will not be used and no lon/lat data for b will be
                          expected either
     histRange -          the range that should be used for the histogram, or None
+    figureRenderer -     the FigureRenderer that should make the figures, so that one pool
+                         of figure processes can be shared by all the variables in a run;
+                         if None is given, one will be made (see make_figure_renderer) using
+                         doFork and shouldClearMemoryWithThreads
+    figureJobs -         a list to add the FigureJobs for the figures to; if this is given the
+                         figures are only queued on the figureRenderer (which must also be given)
+                         and this function won't wait for them, the image name lists returned
+                         are only final once all of the jobs are done
     
     ** May fail due to a known bug on MacOSX systems.
     """
@@ -270,10 +626,21 @@ def plot_and_save_comparison_figures (aData, bData,
     else :
         aDataObject.self_analysis() # if we aren't going to do a diff, make sure basic analysis is done
     
-    # from this point on, we're forking to create child processes to parallelize image and report generation
+    # from this point on, the figures may be made in other processes to parallelize image generation
     # and to help control memory leak creeping that matplotlib causes
-    isParent = True 
-    childPids = [ ]
+    ownsRenderer = figureRenderer is None
+    if ownsRenderer :
+        figureRenderer = make_figure_renderer(doFork, shouldClearMemoryWithThreads)
+    shouldWait = figureJobs is None
+    if shouldWait :
+        figureJobs = [ ]
+    
+    # the figure functions will hang on to our data until the figures are made
+    dataBytes = aDataObject.data.nbytes
+    if bDataObject is not None :
+        dataBytes += bDataObject.data.nbytes
+    if diffInfo is not None :
+        dataBytes += diffInfo.diff_data_object.data.nbytes
     
     plottingFunctions = { }
     
@@ -329,21 +696,22 @@ def plot_and_save_comparison_figures (aData, bData,
         
         # only plot the compared images if we aren't short circuiting them
         if (outputInfoList is not compared_images) or (not shortCircuitComparisons) :
-            try :
-                _log_spawn_and_wait_if_needed(figLongDesc, childPids, figFunction, outputPath, figFileName,
-                                              makeSmall, doFork, shouldClearMemoryWithThreads, fullDPI=fullDPI, thumbDPI=thumbDPI)
-                # if we made an attempt to make the file, hang onto the name
-                outputInfoList.append(figFileName)
-            except ValueError, ve :
-                LOG.warn("Unable to create " + figDesc + " figure for " + variableDisplayName + ": " + str(ve))
-
+            # hang onto the name, the renderer will take it out again if the figure can't be made
+            outputInfoList.append(figFileName)
+            figureJobs.append(figureRenderer.submit(figLongDesc, figFunction, outputPath, figFileName, makeSmall,
+                                                    fullDPI=fullDPI, thumbDPI=thumbDPI, imageList=outputInfoList,
+                                                    dataObject=aDataObject, dataBytes=dataBytes))
     
-    # now we need to wait for all of our child processes to terminate before returning
-    if (isParent) : # just in case
-        if len(childPids) > 0 :
+    # start the figures, and unless our caller will wait for them, wait for all of them to be finished before returning
+    figureRenderer.poll()
+    if shouldWait :
+        if figureRenderer.number_of_workers > 0 :
             LOG.info ("waiting for completion of " + variableDisplayName + " images...")
-        for pid in childPids:
-            os.waitpid(pid, 0)
+        try :
+            figureRenderer.wait(figureJobs)
+        finally :
+            if ownsRenderer :
+                figureRenderer.close()
         LOG.info("... creation and saving of images for " + variableDisplayName + " completed")
     
     return original_images, compared_images
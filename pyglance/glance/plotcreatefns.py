@@ -140,6 +140,24 @@ def _make_axis_and_basemap(lonLatDataDict, goodInAMask, goodInBMask=None, variab
     
     return fullAxis, baseMapInstance
 
+def _get_projection_cache(lonLatDataDict, baseMapInstance, lonLatPairs) :
+    """
+    get the lonlat_util.ProjectedCoordinateCache that was passed in with the lon/lat (or None if there
+    isn't one) and project each of the (longitude, latitude) pairs given for the basemap
+    
+    the projecting is done now, before the figures are made, so that forked figure workers
+    inherit the projected coordinates rather than each projecting the lon/lat on its own
+    """
+    
+    projectionCache = lonLatDataDict.get(PROJECTION_CACHE_KEY, None)
+    
+    if projectionCache is not None :
+        for longitude, latitude in lonLatPairs :
+            if (longitude is not None) and (latitude is not None) :
+                projectionCache.project(longitude, latitude, baseMapInstance)
+    
+    return projectionCache
+
 # ********************* Section of public classes ***********************
 
 """
@@ -385,6 +403,9 @@ class MappedContourPlotFunctionFactory (PlottingFunctionFactory) :
         fullAxis, baseMapInstance = _make_axis_and_basemap(lonLatDataDict,
                                                            goodInAMask, goodInBMask,
                                                            variableDisplayName)
+        projectionCache = _get_projection_cache(lonLatDataDict, baseMapInstance,
+                                                [(lonLatDataDict[fileKey][LON_KEY], lonLatDataDict[fileKey][LAT_KEY])
+                                                 for fileKey in (A_FILE_KEY, B_FILE_KEY, COMMON_KEY)])
         sharedRange = _make_shared_range(aData, goodInAMask,
                                          bData, goodInBMask,
                                          shouldUseSharedRangeForOriginal)
@@ -408,6 +429,8 @@ class MappedContourPlotFunctionFactory (PlottingFunctionFactory) :
                                                                                        dataRanges=dataRanges or sharedRange,
                                                                                        dataRangeNames=dataRangeNames,
                                                                                        dataRangeColors=dataColors,
+                                                                                       projectionCache=projectionCache,
+
                                                                                        units=units_a)),
                                                       variableDisplayName + " in file a",
                                                       "A.png",  original_fig_list)
@@ -426,6 +449,8 @@ class MappedContourPlotFunctionFactory (PlottingFunctionFactory) :
                                                                                        dataRanges=dataRanges or sharedRange,
                                                                                        dataRangeNames=dataRangeNames,
                                                                                        dataRangeColors=dataColors,
+                                                                                       projectionCache=projectionCache,
+
                                                                                        units=units_b)),
                                                       variableDisplayName + " in file b",
                                                       "B.png",  original_fig_list)
@@ -447,6 +472,8 @@ class MappedContourPlotFunctionFactory (PlottingFunctionFactory) :
                                                                                            ("Absolute value of difference in\n"
                                                                                             + variableDisplayName),
                                                                                            invalidMask=(~goodInBothMask),
+                                                                                           projectionCache=projectionCache,
+
                                                                                            units=units_a)),
                                                           "absolute value of difference in " + variableDisplayName,
                                                           "AbsDiff.png", compared_fig_list)
@@ -467,6 +494,8 @@ class MappedContourPlotFunctionFactory (PlottingFunctionFactory) :
                                                                                            ("Value of (Data File B - Data File A) for\n"
                                                                                             + variableDisplayName),
                                                                                            invalidMask=(~goodInBothMask),
+                                                                                           projectionCache=projectionCache,
+
                                                                                            units=units_a)),
                                                           "the difference in " + variableDisplayName,
                                                           "Diff.png",    compared_fig_list)
@@ -495,6 +524,8 @@ class MappedContourPlotFunctionFactory (PlottingFunctionFactory) :
                                                                                            colorMap=figures.MEDIUM_GRAY_COLOR_MAP, tagData=mismatchMask,
                                                                                            dataRanges=dataRanges,
                                                                                            dataRangeNames=dataRangeNames,
+                                                                                           projectionCache=projectionCache,
+
                                                                                            units=units_a)), # TODO, does this need modification?
                                                           "mismatch data in " + variableDisplayName,
                                                           "Mismatch.png", compared_fig_list)
@@ -579,6 +610,9 @@ class MappedQuiverPlotFunctionFactory (PlottingFunctionFactory) :
         # TODO, do I also need to encorporate the lon/lat invalid masks with the good masks?
         fullAxis, baseMapInstance = _make_axis_and_basemap(lonLatDataDict, goodInAMask, goodInBMask,
                                                            variableDisplayName=variableDisplayName)
+        projectionCache = _get_projection_cache(lonLatDataDict, baseMapInstance,
+                                                [(lonLatDataDict[fileKey][LON_KEY], lonLatDataDict[fileKey][LAT_KEY])
+                                                 for fileKey in (A_FILE_KEY, B_FILE_KEY, COMMON_KEY)])
         
         # make the plotting functions
         
@@ -598,6 +632,8 @@ class MappedQuiverPlotFunctionFactory (PlottingFunctionFactory) :
                                                                                (variableDisplayName + "\nin File A"),
                                                                                invalidMask=(~goodInAMask),
                                                                                uData=aUData, vData=aVData,
+                                                                               projectionCache=projectionCache,
+
                                                                                units=units_a)),
                                               variableDisplayName + " in file a",
                                               "A.png",  original_fig_list)
@@ -615,6 +651,8 @@ class MappedQuiverPlotFunctionFactory (PlottingFunctionFactory) :
                                                                                (variableDisplayName + "\nin File B"),
                                                                                invalidMask=(~ goodInBMask),
                                                                                uData=bUData, vData=bVData,
+                                                                               projectionCache=projectionCache,
+
                                                                                units=units_b)),
                                               variableDisplayName + " in file b",
                                               "B.png",  original_fig_list)
@@ -647,6 +685,8 @@ class MappedQuiverPlotFunctionFactory (PlottingFunctionFactory) :
                                                                                     + variableDisplayName),
                                                                                    invalidMask=(~ goodInBothMask),
                                                                                    uData=diffUData, vData=diffVData,
+                                                                                   projectionCache=projectionCache,
+
                                                                                    units=units_a)),
                                                   "absolute value of difference in " + variableDisplayName,
                                                   "AbsDiff.png", compared_fig_list)
@@ -669,6 +709,8 @@ class MappedQuiverPlotFunctionFactory (PlottingFunctionFactory) :
                                                                                     + variableDisplayName),
                                                                                    invalidMask=(~ goodInBothMask),
                                                                                    uData=diffUData, vData=diffVData,
+                                                                                   projectionCache=projectionCache,
+
                                                                                    units=units_a)),
                                                   "the difference in " + variableDisplayName,
                                                   "Diff.png",    compared_fig_list)
@@ -700,6 +742,8 @@ class MappedQuiverPlotFunctionFactory (PlottingFunctionFactory) :
                                                                                    dataRangeNames=dataRangeNames,
                                                                                    # TODO, does this need modification?
                                                                                    uData=bUData, vData=bVData,
+                                                                                   projectionCache=projectionCache,
+
                                                                                    units=units_a)), 
                                                   "mismatch data in " + variableDisplayName,
                                                   "Mismatch.png", compared_fig_list)
@@ -1109,6 +1153,7 @@ class IMShowPlotFunctionFactory (PlottingFunctionFactory) :
             functionsToReturn[ORIG_A_FUNCTION_KEY] = \
                                      ((lambda: figures.create_simple_figure(aData, variableDisplayName + "\nin File A",
                                                                             invalidMask=~goodInAMask, colorbarLimits=sharedRange, 
+
                                                                             units=units_a)),
                                               variableDisplayName + " in file a",
                                               "A.png",  original_fig_list)
@@ -1119,6 +1164,7 @@ class IMShowPlotFunctionFactory (PlottingFunctionFactory) :
             functionsToReturn[ORIG_B_FUNCTION_KEY] = \
                                      ((lambda: figures.create_simple_figure(bData, variableDisplayName + "\nin File B",
                                                                             invalidMask=~goodInBMask, colorbarLimits=sharedRange, 
+
                                                                             units=units_b)),
                                               variableDisplayName + " in file b",
                                               "B.png",  original_fig_list)
@@ -1315,6 +1361,7 @@ class InspectIMShowPlotFunctionFactory (PlottingFunctionFactory) :
             
             functionsToReturn[ORIG_A_FUNCTION_KEY] = ((lambda: figures.create_simple_figure(aData.data, variableDisplayName + "\nin File",
                                                                             invalidMask=~goodInAMask,
+
                                                                             units=units_a)),
                                               variableDisplayName + " in file",
                                               "origA.png",  original_fig_list)
@@ -1458,6 +1505,8 @@ class InspectMappedContourPlotFunctionFactory (PlottingFunctionFactory) :
         fullAxis, baseMapInstance = _make_axis_and_basemap({A_FILE_KEY:lonLatDataDict},
                                                            goodInAMask, None, # there is no b mask
                                                            variableDisplayName)
+        projectionCache = _get_projection_cache(lonLatDataDict, baseMapInstance,
+                                                [(lonLatDataDict[LON_KEY], lonLatDataDict[LAT_KEY])])
         
         # make the original data plot
         if (DO_PLOT_ORIGINALS_KEY not in doPlotSettingsDict) or (doPlotSettingsDict[DO_PLOT_ORIGINALS_KEY]) :
@@ -1475,6 +1524,8 @@ class InspectMappedContourPlotFunctionFactory (PlottingFunctionFactory) :
                                                                                dataRanges=dataRanges,
                                                                                dataRangeNames=dataRangeNames,
                                                                                dataRangeColors=dataColors,
+                                                                               projectionCache=projectionCache,
+
                                                                                units=units_a)),
                                               variableDisplayName + " in file",
                                               "mapA.png",  original_fig_list)
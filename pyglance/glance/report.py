@@ -7,7 +7,7 @@ Created by rayg Apr 2009.
 Copyright (c) 2009 University of Wisconsin SSEC. All rights reserved.
 """
 
-import sys, logging
+import os, sys, logging, hashlib
 
 from pkg_resources import resource_string, resource_filename #, resource_stream
 from mako.template import Template
@@ -16,6 +16,7 @@ import types as types
 import numpy as np
 import shutil as shutil
 
+import glance.data as dataobj
 from glance.constants import *
 
 LOG = logging.getLogger(__name__)
@@ -28,6 +29,18 @@ formattingSettings = {
                       np.float64: floatFormat
                       }
 
+# get a copy of the files information with any file fingerprints that are still
+# being calculated replaced by their finished values
+def _resolve_file_fingerprints (files) :
+    
+    toReturn = { }
+    for fileKey, fileInfo in files.items() :
+        toReturn[fileKey] = dict(fileInfo)
+        if MD5SUM_KEY in fileInfo :
+            toReturn[fileKey][MD5SUM_KEY] = dataobj.resolve_fingerprint(fileInfo[MD5SUM_KEY])
+    
+    return toReturn
+
 # make and save an html page using a mako template, put all the data you need
 # in the template into the kwargs
 def _make_and_save_page (fullFilePath, templateFileNameToUse, **kwargs) :
@@ -35,6 +48,10 @@ def _make_and_save_page (fullFilePath, templateFileNameToUse, **kwargs) :
     tempFileName = resource_filename(__name__, ".")
     tempLookup = TemplateLookup(directories=[tempFileName])
     
+    # the file md5 sums may still be being calculated in the background, wait for them now
+    if FILES_INFO_DICT_KEY in kwargs :
+        kwargs[FILES_INFO_DICT_KEY] = _resolve_file_fingerprints(kwargs[FILES_INFO_DICT_KEY])
+    
     fileToWrite = open(fullFilePath, 'w')
     tempTemplate = Template(resource_string(__name__, templateFileNameToUse), lookup=tempLookup)
 
@@ -43,6 +60,19 @@ def _make_and_save_page (fullFilePath, templateFileNameToUse, **kwargs) :
     
     return
 
+# get an md5 of all of the report templates, so that pages made from older versions of
+# the templates can be recognized
+def get_template_fingerprint ( ) :
+    
+    templateDirectory = resource_filename(__name__, ".")
+    templateHash      = hashlib.md5()
+    for templateFileName in sorted(os.listdir(templateDirectory)) :
+        if templateFileName.endswith('.txt') :
+            templateHash.update(templateFileName)
+            templateHash.update(resource_string(__name__, templateFileName))
+    
+    return templateHash.hexdigest()
+
 def make_formatted_display_string(displayData, customDisplayFormat=None) :
     '''
     given a piece of data return a display string
@@ -8,11 +8,14 @@ Created by evas Apr 2010.
 Copyright (c) 2010 University of Wisconsin SSEC. All rights reserved.
 """
 
+import os, sys, logging, cPickle, hashlib, inspect
 import glance.data  as dataobj
 import glance.delta as delta
 
 import numpy as np
 
+LOG = logging.getLogger(__name__)
+
 # I don't like this design, but it's what I could come up
 # with for now. FUTURE: Reconsider this design again later.
 class StatisticalData (object) :
@@ -111,7 +114,7 @@ class MissingValueStatistics (StatisticalData) :
                     'missing_fraction':      "fraction of values flagged missing",
                     }
     
-    def __init__(self, diffInfoObject=None, dataObject=None, dataSetDescription=None) :
+    def __init__(self, diffInfoObject=None, dataObject=None, dataSetDescription=None, summary=None) :
         """
         build our fill value related statistics
         
@@ -124,7 +127,10 @@ class MissingValueStatistics (StatisticalData) :
         will be analyzed.
         
         If only dataObject is analysed dataSetDescription will be used in labeling
-        the resulting dictionary form statistics. 
+        the resulting dictionary form statistics.
+        
+        If summary is given (a _ComparisonSummary, or a _DataSetSummary when only a
+        dataObject is analyzed) the counts it already gathered will be used.
         """
         self.title           = 'Missing Value Statistics'
         self.is_one_data_set = False
@@ -138,7 +144,7 @@ class MissingValueStatistics (StatisticalData) :
             noData = len(dataObject.data.shape) <= 0
 
             # figure out some basic statistics
-            self.missing_count    = np.sum(dataObject.masks.missing_mask)
+            self.missing_count    = np.sum(dataObject.masks.missing_mask) if summary is None else summary.missing_count
             self.missing_fraction = float(self.missing_count) / float(dataObject.data.size) if not noData else np.nan
             
         # if we have a comparison object analyze the data associated with that comparison
@@ -147,11 +153,14 @@ class MissingValueStatistics (StatisticalData) :
             noData = len(diffInfoObject.a_data_object.data.shape) <= 0
 
             # analyze each of the original data sets that are being compared
-            self.a_missing_stats = MissingValueStatistics(dataObject=diffInfoObject.a_data_object, dataSetDescription="a")
-            self.b_missing_stats = MissingValueStatistics(dataObject=diffInfoObject.b_data_object, dataSetDescription="b")
+            self.a_missing_stats = MissingValueStatistics(dataObject=diffInfoObject.a_data_object, dataSetDescription="a",
+                                                          summary=summary.a_summary if summary is not None else None)
+            self.b_missing_stats = MissingValueStatistics(dataObject=diffInfoObject.b_data_object, dataSetDescription="b",
+                                                          summary=summary.b_summary if summary is not None else None)
             
             # common statistics
-            self.common_missing_count    = np.sum(diffInfoObject.a_data_object.masks.missing_mask & diffInfoObject.b_data_object.masks.missing_mask)
+            self.common_missing_count    = np.sum(diffInfoObject.a_data_object.masks.missing_mask & diffInfoObject.b_data_object.masks.missing_mask) \
+                                            if summary is None else summary.common_missing_count
             self.common_missing_fraction = float(self.common_missing_count) / float(diffInfoObject.a_data_object.data.size) if not noData else np.nan
             
         else :
@@ -245,7 +254,7 @@ class FiniteDataStatistics (StatisticalData) :
                     'finite_fraction': "fraction of finite values (out of all data points in set)",
                     }
     
-    def __init__(self, diffInfoObject=None, dataObject=None, dataSetDescription=None) :
+    def __init__(self, diffInfoObject=None, dataObject=None, dataSetDescription=None, summary=None) :
         """
         build our finite data related statistics 
         
@@ -258,7 +267,10 @@ class FiniteDataStatistics (StatisticalData) :
         will be analyzed.
         
         If only dataObject is analysed dataSetDescription will be used in labeling
-        the resulting dictionary form statistics. 
+        the resulting dictionary form statistics.
+        
+        If summary is given (a _ComparisonSummary, or a _DataSetSummary when only a
+        dataObject is analyzed) the counts it already gathered will be used.
         """
         self.title           = 'Finite Data Statistics'
         self.is_one_data_set = False
@@ -271,7 +283,8 @@ class FiniteDataStatistics (StatisticalData) :
             self.desc_text       = dataSetDescription
             
             # figure out some basic statistics
-            self.finite_count    = np.sum(dataObject.masks.valid_mask) if len(dataObject.data.shape) > 0 else 0
+            self.finite_count    = (np.sum(dataObject.masks.valid_mask) if summary is None else summary.valid_count) \
+                                    if len(dataObject.data.shape) > 0 else 0
             self.finite_fraction = float(self.finite_count) / float(dataObject.data.size) if len(dataObject.data.shape) > 0 else np.nan
             
         # if we have a comparison object analyze the data associated with that comparison
@@ -280,16 +293,22 @@ class FiniteDataStatistics (StatisticalData) :
             noData = len(diffInfoObject.a_data_object.data.shape) <= 0
 
             # analyze each of the original data sets that are being compared
-            self.a_finite_stats = FiniteDataStatistics(dataObject=diffInfoObject.a_data_object, dataSetDescription="a")
-            self.b_finite_stats = FiniteDataStatistics(dataObject=diffInfoObject.b_data_object, dataSetDescription="b")
+            self.a_finite_stats = FiniteDataStatistics(dataObject=diffInfoObject.a_data_object, dataSetDescription="a",
+                                                       summary=summary.a_summary if summary is not None else None)
+            self.b_finite_stats = FiniteDataStatistics(dataObject=diffInfoObject.b_data_object, dataSetDescription="b",
+                                                       summary=summary.b_summary if summary is not None else None)
             
             # calculate some common statistics
-            self.common_finite_count = np.sum(diffInfoObject.a_data_object.masks.valid_mask & diffInfoObject.b_data_object.masks.valid_mask) \
-                                        if not noData else 0
-            # use an exclusive or to check which points are finite in only one of the two data sets
-            self.finite_in_only_one_count = np.sum((diffInfoObject.a_data_object.masks.valid_mask ^ diffInfoObject.b_data_object.masks.valid_mask) \
-                                                    & ~diffInfoObject.diff_data_object.masks.ignore_mask) \
+            if summary is not None :
+                self.common_finite_count      = summary.common_finite_count
+                self.finite_in_only_one_count = summary.finite_in_only_one_count
+            else :
+                self.common_finite_count = np.sum(diffInfoObject.a_data_object.masks.valid_mask & diffInfoObject.b_data_object.masks.valid_mask) \
                                             if not noData else 0
+                # use an exclusive or to check which points are finite in only one of the two data sets
+                self.finite_in_only_one_count = np.sum((diffInfoObject.a_data_object.masks.valid_mask ^ diffInfoObject.b_data_object.masks.valid_mask) \
+                                                        & ~diffInfoObject.diff_data_object.masks.ignore_mask) \
+                                                if not noData else 0
             self.common_finite_fraction      = float(self.common_finite_count)      / float(diffInfoObject.a_data_object.data.size) \
                                                 if not noData else np.nan
             self.finite_in_only_one_fraction = float(self.finite_in_only_one_count) / float(diffInfoObject.a_data_object.data.size) \
@@ -381,7 +400,7 @@ class NotANumberStatistics (StatisticalData) :
                     'nan_fraction': "fraction of NaNs",
                     }
     
-    def __init__(self, diffInfoObject=None, dataObject=None, dataSetDescription=None) :
+    def __init__(self, diffInfoObject=None, dataObject=None, dataSetDescription=None, summary=None) :
         """
         build our nonfinite data related statistics
         
@@ -394,7 +413,10 @@ class NotANumberStatistics (StatisticalData) :
         will be analyzed.
         
         If only dataObject is analysed dataSetDescription will be used in labeling
-        the resulting dictionary form statistics. 
+        the resulting dictionary form statistics.
+        
+        If summary is given (a _ComparisonSummary, or a _DataSetSummary when only a
+        dataObject is analyzed) the counts it already gathered will be used.
         """
         self.title           = 'NaN Statistics'
         self.is_one_data_set = False
@@ -408,7 +430,7 @@ class NotANumberStatistics (StatisticalData) :
             noData = len(dataObject.data.shape) <= 0
 
             # get some basic statistics
-            self.nan_count = np.sum(dataObject.masks.non_finite_mask)
+            self.nan_count = np.sum(dataObject.masks.non_finite_mask) if summary is None else summary.nan_count
             self.nan_fraction = float(self.nan_count) / float(dataObject.data.size) if not noData else np.nan
             
         # if we have a comparison object analyze the data associated with that comparison
@@ -417,11 +439,14 @@ class NotANumberStatistics (StatisticalData) :
             noData = len(diffInfoObject.a_data_object.data.shape) <= 0
 
             # analyze each of the original data sets that are being compared
-            self.a_nan_stats = NotANumberStatistics(dataObject=diffInfoObject.a_data_object, dataSetDescription="a")
-            self.b_nan_stats = NotANumberStatistics(dataObject=diffInfoObject.b_data_object, dataSetDescription="b")
+            self.a_nan_stats = NotANumberStatistics(dataObject=diffInfoObject.a_data_object, dataSetDescription="a",
+                                                    summary=summary.a_summary if summary is not None else None)
+            self.b_nan_stats = NotANumberStatistics(dataObject=diffInfoObject.b_data_object, dataSetDescription="b",
+                                                    summary=summary.b_summary if summary is not None else None)
             
             # calculate some common statistics
-            self.common_nan_count = np.sum(diffInfoObject.a_data_object.masks.non_finite_mask & diffInfoObject.b_data_object.masks.non_finite_mask)
+            self.common_nan_count = np.sum(diffInfoObject.a_data_object.masks.non_finite_mask & diffInfoObject.b_data_object.masks.non_finite_mask) \
+                                    if summary is None else summary.common_nan_count
             self.common_nan_fraction = float(self.common_nan_count) / float(diffInfoObject.a_data_object.data.size) if not noData else np.nan
             
         else:
@@ -547,7 +572,7 @@ class GeneralStatistics (StatisticalData) :
                     }
     
     def __init__(self, diffInfoObject=None, dataObject=None,
-                 doExtras=False, dataSetDescription=None) :
+                 doExtras=False, dataSetDescription=None, summary=None) :
         """
         build our general statistics based on the comparison of two data sets
         
@@ -565,6 +590,9 @@ class GeneralStatistics (StatisticalData) :
         If you are passing a single dataObject and would like shape and size
         statistics reported as well, pass doExtras as True (otherwise these
         stats will be omitted).
+        
+        If summary is given (a _ComparisonSummary, or a _DataSetSummary when only a
+        dataObject is analyzed) the statistics it already gathered will be used.
         """
         self.title           = 'General Statistics'
         self.is_one_data_set = False
@@ -577,19 +605,29 @@ class GeneralStatistics (StatisticalData) :
             self.do_extras       = doExtras
             self.desc_text       = dataSetDescription
             
-            # grab the valid data for some calculations
-            tempGoodData = dataObject.data[dataObject.masks.valid_mask]
-            noData = (tempGoodData.size <= 0) or (len(dataObject.data.shape) <= 0)
-
             # fill in our statistics
             self.missing_value   = dataObject.select_fill_value()
-            self.max             =    np.max(tempGoodData) if not noData else np.nan
-            self.min             =    np.min(tempGoodData) if not noData else np.nan
-            self.mean            =   np.mean(tempGoodData) if not noData else np.nan
-            self.median          = np.median(tempGoodData) if not noData else np.nan
-            self.std_val         =    np.std(tempGoodData) if not noData else np.nan
-            # also calculate the invalid points
-            self.spatially_invalid_pts_ignored = np.sum(dataObject.masks.ignore_mask)
+            
+            # if the single pass over the data was already made, use what it found
+            if summary is not None :
+                self.max             = summary.max()
+                self.min             = summary.min()
+                self.mean            = summary.mean()
+                self.median          = summary.median()
+                self.std_val         = summary.std()
+                self.spatially_invalid_pts_ignored = summary.ignored_count
+            else :
+                # grab the valid data for some calculations
+                tempGoodData = dataObject.data[dataObject.masks.valid_mask]
+                noData = (tempGoodData.size <= 0) or (len(dataObject.data.shape) <= 0)
+                
+                self.max             =    np.max(tempGoodData) if not noData else np.nan
+                self.min             =    np.min(tempGoodData) if not noData else np.nan
+                self.mean            =   np.mean(tempGoodData) if not noData else np.nan
+                self.median          = np.median(tempGoodData) if not noData else np.nan
+                self.std_val         =    np.std(tempGoodData) if not noData else np.nan
+                # also calculate the invalid points
+                self.spatially_invalid_pts_ignored = np.sum(dataObject.masks.ignore_mask)
             
             # if we should also do extra stats, do so
             if (doExtras) :
@@ -602,8 +640,10 @@ class GeneralStatistics (StatisticalData) :
             noData = len(diffInfoObject.a_data_object.data.shape) <= 0
 
             # analyze each of the original data sets that are being compared
-            self.a_gen_stats = GeneralStatistics(dataObject=diffInfoObject.a_data_object, dataSetDescription="a")
-            self.b_gen_stats = GeneralStatistics(dataObject=diffInfoObject.b_data_object, dataSetDescription="b")
+            self.a_gen_stats = GeneralStatistics(dataObject=diffInfoObject.a_data_object, dataSetDescription="a",
+                                                 summary=summary.a_summary if summary is not None else None)
+            self.b_gen_stats = GeneralStatistics(dataObject=diffInfoObject.b_data_object, dataSetDescription="b",
+                                                 summary=summary.b_summary if summary is not None else None)
             
             # fill in our statistics
             self.epsilon         = diffInfoObject.epsilon_value
@@ -611,8 +651,8 @@ class GeneralStatistics (StatisticalData) :
             self.num_data_points = diffInfoObject.a_data_object.masks.missing_mask.size if not noData else 0
             self.shape           = diffInfoObject.a_data_object.masks.missing_mask.shape
             # also calculate the invalid points
-            self.spatially_invalid_pts_ignored_in_a = np.sum(diffInfoObject.a_data_object.masks.ignore_mask)
-            self.spatially_invalid_pts_ignored_in_b = np.sum(diffInfoObject.b_data_object.masks.ignore_mask)
+            self.spatially_invalid_pts_ignored_in_a = self.a_gen_stats.spatially_invalid_pts_ignored
+            self.spatially_invalid_pts_ignored_in_b = self.b_gen_stats.spatially_invalid_pts_ignored
             
         else:
             raise ValueError ("No data set was given when requesting general statistical analysis.")
@@ -724,13 +764,16 @@ class NumericalComparisonStatistics (StatisticalData) :
                                             ' or are unacceptable when compared according to the current epsilon definitions',
                     }
     
-    def __init__(self, diffInfoObject, include_basic_analysis=True) :
+    def __init__(self, diffInfoObject, include_basic_analysis=True, summary=None) :
         """
         build our comparison statistics based on the comparison
         of two data sets
         
         the include_basic_analysis flag indicates whether the statistics generated by the
         basic_analysis method should also be generated
+        
+        if a _ComparisonSummary is given, the statistics it already gathered will be used
+        rather than making more passes over the data
         """
         self.title = 'Numerical Comparison Statistics'
         
@@ -738,16 +781,23 @@ class NumericalComparisonStatistics (StatisticalData) :
         valid_in_both           = diffInfoObject.diff_data_object.masks.valid_mask
         aData                   = diffInfoObject.a_data_object.data
         bData                   = diffInfoObject.b_data_object.data
-        total_num_finite_values = np.sum(valid_in_both) # just the finite values, not all data
         noData = len(diffInfoObject.a_data_object.data.shape) <= 0
 
         # fill in some simple statistics
-        self.diff_outside_epsilon_count = np.sum(diffInfoObject.diff_data_object.masks.outside_epsilon_mask)
-        self.perfect_match_count        = NumericalComparisonStatistics._get_num_perfect(aData, bData,
-                                                                                         goodMask=valid_in_both)
-        self.correlation                = delta.compute_correlation(aData, bData, valid_in_both)  if not noData else np.nan
+        if summary is not None :
+            total_num_finite_values         = summary.common_finite_count
+            self.diff_outside_epsilon_count = summary.diff_outside_epsilon_count
+            self.perfect_match_count        = summary.perfect_match_count
+            self.correlation                = summary.correlation()
+            self.mismatch_points_count      = summary.mismatch_points_count
+        else :
+            total_num_finite_values         = np.sum(valid_in_both) # just the finite values, not all data
+            self.diff_outside_epsilon_count = np.sum(diffInfoObject.diff_data_object.masks.outside_epsilon_mask)
+            self.perfect_match_count        = NumericalComparisonStatistics._get_num_perfect(aData, bData,
+                                                                                             goodMask=valid_in_both)
+            self.correlation                = delta.compute_correlation(aData, bData, valid_in_both)  if not noData else np.nan
+            self.mismatch_points_count      = np.sum(diffInfoObject.diff_data_object.masks.mismatch_mask)
         self.r_squared_correlation      = self.correlation * self.correlation  if not noData else np.nan
-        self.mismatch_points_count      = np.sum(diffInfoObject.diff_data_object.masks.mismatch_mask)
         
         # calculate some more complex statistics, be careful not to divide by zero
         self.mismatch_points_fraction      = float(self.mismatch_points_count)      / float(aData.size)              if not noData                    else 0.0
@@ -755,7 +805,12 @@ class NumericalComparisonStatistics (StatisticalData) :
         self.perfect_match_fraction        = float(self.perfect_match_count)        / float(total_num_finite_values) if (total_num_finite_values > 0) else np.nan
         
         # if desired, do the basic analysis
-        self.temp_analysis = NumericalComparisonStatistics.basic_analysis(diffInfoObject.diff_data_object.data, valid_in_both) if include_basic_analysis else { }
+        if not include_basic_analysis :
+            self.temp_analysis = { }
+        elif summary is not None :
+            self.temp_analysis = summary.diff_statistics()
+        else :
+            self.temp_analysis = NumericalComparisonStatistics.basic_analysis(diffInfoObject.diff_data_object.data, valid_in_both)
         self.rms_val       = self.temp_analysis['rms_val']      if not noData else np.nan
         self.std_val       = self.temp_analysis['std_val']      if not noData else np.nan
         self.mean_diff     = self.temp_analysis['mean_diff']    if not noData else np.nan
@@ -832,6 +887,776 @@ class NumericalComparisonStatistics (StatisticalData) :
         
         return numPerfect
 
+# the number of data points examined at one time when the statistics
+# for a comparison are gathered in a single pass over the data
+STATISTICS_CHUNK_SIZE = 1048576
+
+# the default bound on the rank error of quantiles estimated by a QuantileSketch,
+# as a fraction of the number of values (so 0.001 means within 0.1% of the true rank)
+DEFAULT_QUANTILE_ERROR = 0.001
+
+def _mean_type (dtype) :
+    """
+    get the type numpy would use for the mean or standard deviation of data of this dtype
+    """
+    return dtype.type if np.issubdtype(dtype, np.floating) else np.float64
+
+class QuantileSketch (object) :
+    """
+    a compact summary of a stream of values that can estimate any quantile of the values;
+    values can be added a chunk at a time, and sketches of different parts of the same data
+    (even ones made in other processes) can be merged
+    
+    this is a KLL sketch (Karnin, Lang, and Liberty, "Optimal Quantile Approximation in
+    Streams"), values are kept in a stack of sorted compactors where each value at level h
+    stands for 2**h of the original values; when a level gets too full half of its values
+    are promoted to the next level
+    
+    the rank of an estimated quantile should be within about rankError (as a fraction
+    of the number of values) of the true rank, the sketch holds about 2 / rankError values
+    """
+    
+    # how quickly the capacity of the lower levels shrinks
+    CAPACITY_DECAY = 2.0 / 3.0
+    MIN_CAPACITY   = 2
+    
+    def __init__ (self, rankError=DEFAULT_QUANTILE_ERROR, dtype=np.float64, seed=0) :
+        """
+        create an empty sketch for values of the given type
+        
+        the seed controls which values are kept when a level is compacted; sketches
+        of different parts of the data that will be merged should use different seeds
+        """
+        
+        self.k      = max(int(np.ceil(2.0 / rankError)), 8)
+        self.count  = 0
+        self.dtype  = np.dtype(dtype)
+        self.levels = [np.zeros(0, dtype=self.dtype)]
+        # use a fixed seed so that the same data gives the same report
+        self._random = np.random.RandomState(seed)
+    
+    def _capacity (self, level) :
+        """
+        get the number of values the given level can hold before it must be compacted
+        """
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (self.CAPACITY_DECAY ** depth))), self.MIN_CAPACITY)
+    
+    def _compress (self) :
+        """
+        compact any levels that are over capacity, promoting half of their values
+        """
+        
+        level = 0
+        while level < len(self.levels) :
+            
+            if self.levels[level].size > self._capacity(level) :
+                
+                if level + 1 >= len(self.levels) :
+                    self.levels.append(np.zeros(0, dtype=self.dtype))
+                
+                # if there's an odd number of values one is left behind, then
+                # every other value (starting at random) is promoted
+                items    = np.sort(self.levels[level])
+                leftOver = items.size % 2
+                offset   = self._random.randint(2)
+                self.levels[level + 1] = np.concatenate((self.levels[level + 1], items[leftOver + offset::2]))
+                self.levels[level]     = items[:leftOver]
+            
+            level += 1
+    
+    def update (self, values) :
+        """
+        add an array of values to the sketch
+        """
+        
+        values = np.asarray(values, dtype=self.dtype).ravel()
+        if values.size <= 0 :
+            return
+        
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self.count    += values.size
+        self._compress()
+    
+    def merge (self, other) :
+        """
+        add all the values summarized in another sketch to this one
+        """
+        
+        while len(self.levels) < len(other.levels) :
+            self.levels.append(np.zeros(0, dtype=self.dtype))
+        for level, items in enumerate(other.levels) :
+            self.levels[level] = np.concatenate((self.levels[level], items.astype(self.dtype)))
+        self.count += other.count
+        self._compress()
+    
+    def quantile (self, fraction, absolute=False) :
+        """
+        estimate the value at the given quantile (between 0 and 1) of the values in the sketch,
+        if absolute is True the quantile is of the absolute values rather than the values;
+        since that counts the values on both sides of zero, its rank can be off by up to
+        twice the sketch's rank error
+        
+        as long as nothing has been compacted the answer is exact (and matches numpy.percentile)
+        """
+        
+        if self.count <= 0 :
+            return np.nan
+        resultType = _mean_type(self.dtype)
+        
+        # nothing has been thrown away yet, so just look at everything
+        if len(self.levels) <= 1 :
+            items = np.abs(self.levels[0]) if absolute else self.levels[0]
+            return resultType(np.percentile(items, fraction * 100.0))
+        
+        # find the first value whose accumulated weight reaches the quantile
+        items   = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(values.size, 2 ** level, dtype=np.int64) for level, values in enumerate(self.levels)])
+        if absolute :
+            items = np.abs(items)
+        order   = np.argsort(items, kind='mergesort')
+        ranks   = np.cumsum(weights[order])
+        index   = min(np.searchsorted(ranks, fraction * ranks[-1], side='left'), items.size - 1)
+        
+        return resultType(items[order[index]])
+
+class _RunningMoments (object) :
+    """
+    the count, mean, sum of squared deviations from the mean, minimum, and maximum
+    of a set of values that arrive in chunks; chunks are merged using the pairwise
+    update of Chan, Golub, and LeVeque so the results don't lose precision
+    """
+    
+    def __init__ (self) :
+        self.count = 0
+        self.mean  = 0.0
+        self.m2    = 0.0
+        self.min   = None
+        self.max   = None
+    
+    def add (self, values) :
+        """
+        add a chunk of values to the moments
+        """
+        
+        if values.size <= 0 :
+            return
+        
+        chunkValues    = values.astype(np.float64)
+        chunk          = _RunningMoments()
+        chunk.count    = values.size
+        chunk.mean     = np.mean(chunkValues)
+        deviations     = chunkValues - chunk.mean
+        chunk.m2       = np.dot(deviations, deviations)
+        chunk.min      = np.min(values)
+        chunk.max      = np.max(values)
+        
+        self.merge(chunk)
+    
+    def merge (self, other) :
+        """
+        add the values described by another set of moments to these moments
+        """
+        
+        if other.count <= 0 :
+            return
+        
+        totalCount = self.count + other.count
+        meanChange = other.mean - self.mean
+        self.mean  = self.mean + (meanChange * other.count / totalCount)
+        self.m2    = self.m2 + other.m2 + (meanChange * meanChange * self.count * other.count / totalCount)
+        self.count = totalCount
+        
+        self.min = other.min if (self.min is None) or (other.min < self.min) else self.min
+        self.max = other.max if (self.max is None) or (other.max > self.max) else self.max
+    
+    def std (self) :
+        """
+        the population standard deviation of the values
+        """
+        return np.sqrt(self.m2 / self.count)
+
+class _RunningCoMoments (object) :
+    """
+    the sums needed to calculate the Pearson correlation of two sets of
+    values that arrive in chunks, merged the same way as _RunningMoments
+    """
+    
+    def __init__ (self) :
+        self.count = 0
+        self.meanX = 0.0
+        self.meanY = 0.0
+        self.m2X   = 0.0
+        self.m2Y   = 0.0
+        self.cXY   = 0.0
+    
+    def add (self, xValues, yValues) :
+        """
+        add a chunk of paired values to the co-moments
+        """
+        
+        if xValues.size <= 0 :
+            return
+        
+        chunkX      = xValues.astype(np.float64)
+        chunkY      = yValues.astype(np.float64)
+        chunk       = _RunningCoMoments()
+        chunk.count = xValues.size
+        chunk.meanX = np.mean(chunkX)
+        chunk.meanY = np.mean(chunkY)
+        chunkX     -= chunk.meanX
+        chunkY     -= chunk.meanY
+        chunk.m2X   = np.dot(chunkX, chunkX)
+        chunk.m2Y   = np.dot(chunkY, chunkY)
+        chunk.cXY   = np.dot(chunkX, chunkY)
+        
+        self.merge(chunk)
+    
+    def merge (self, other) :
+        """
+        add the paired values described by another set of co-moments to these co-moments
+        """
+        
+        if other.count <= 0 :
+            return
+        
+        totalCount  = self.count + other.count
+        meanChangeX = other.meanX - self.meanX
+        meanChangeY = other.meanY - self.meanY
+        weight      = float(self.count) * other.count / totalCount
+        self.m2X   += other.m2X + (meanChangeX * meanChangeX * weight)
+        self.m2Y   += other.m2Y + (meanChangeY * meanChangeY * weight)
+        self.cXY   += other.cXY + (meanChangeX * meanChangeY * weight)
+        self.meanX += meanChangeX * other.count / totalCount
+        self.meanY += meanChangeY * other.count / totalCount
+        self.count  = totalCount
+    
+    def correlation (self) :
+        """
+        the Pearson correlation r-coefficient of the paired values
+        """
+        
+        if self.count < 2 :
+            return np.nan
+        denominator = np.sqrt(self.m2X * self.m2Y)
+        if denominator <= 0.0 :
+            return np.nan
+        
+        return max(min(self.cXY / denominator, 1.0), -1.0)
+
+class _ExactValues (object) :
+    """
+    keeps every value added to it, in a buffer that is allocated once
+    (the total number of values must be known ahead of time), so the
+    medians of the values are exact
+    
+    if isDifference is True the mean of the absolute values and the root mean
+    square are included in the statistics
+    
+    count, min, and max describe the values added so far
+    """
+    
+    def __init__ (self, size, dtype, isDifference=False) :
+        self.values        = np.empty(size, dtype=dtype)
+        self.is_difference = isDifference
+        self.min           = None
+        self.max           = None
+        self._filled       = 0
+        self._median       = None
+        self._statistics   = None
+    
+    @property
+    def count (self) :
+        return self._filled
+    
+    def kept_values (self) :
+        """
+        get the values kept so far, in the order they were added; once the medians
+        have been found the values will have been reordered
+        """
+        return self.values[:self._filled]
+    
+    def add (self, keepMask, dataChunk) :
+        """
+        keep the values in the chunk that are selected by the mask
+        """
+        
+        numToKeep = np.count_nonzero(keepMask)
+        if numToKeep <= 0 :
+            return
+        kept      = self.values[self._filled:self._filled + numToKeep]
+        np.compress(keepMask, dataChunk, out=kept)
+        self._filled += numToKeep
+        
+        chunkMin  = np.min(kept)
+        chunkMax  = np.max(kept)
+        self.min  = chunkMin if (self.min is None) or (chunkMin < self.min) else self.min
+        self.max  = chunkMax if (self.max is None) or (chunkMax > self.max) else self.max
+    
+    def statistics (self) :
+        """
+        get a dictionary with the mean and std (and for differences the mean_abs and
+        rms) of the values, or None if there are no values
+        
+        these are calculated from all the values the same way the statistics classes
+        do for unsummarized data, so float32 data gives the same float32 sums; they
+        are found before the medians reorder the buffer
+        """
+        
+        if (self._statistics is None) and (self._filled > 0) :
+            values = self.kept_values()
+            self._statistics = {
+                                'mean': np.mean(values),
+                                'std':  np.std(values),
+                               }
+            if self.is_difference :
+                self._statistics['mean_abs'] = np.mean(np.abs(values))
+                # divide by a numpy count, as delta.calculate_root_mean_square does
+                self._statistics['rms']      = np.sqrt(np.sum(values ** 2) / np.int_(values.size))
+        
+        return self._statistics
+    
+    def median (self) :
+        """
+        get the median of the values
+        """
+        
+        if self._median is None :
+            self.statistics()
+            # the buffer is ours, so the selection can reorder it in place
+            values = self.kept_values()
+            self._median = np.median(values, overwrite_input=True) if values.size > 0 else np.nan
+        
+        return self._median
+    
+    def median_of_absolute (self) :
+        """
+        get the median of the absolute values; this changes the buffer in
+        place, so once it's called no further values can be added
+        """
+        
+        self.median()
+        values = self.kept_values()
+        np.abs(values, out=values)
+        
+        return np.median(values, overwrite_input=True) if values.size > 0 else np.nan
+
+class _SketchedValues (object) :
+    """
+    summarizes the values added to it in a QuantileSketch, so that the medians
+    can be estimated without holding all of the values in memory, and in running
+    moments accumulated in double precision, so that the other statistics can be
+    found (their last digits can differ slightly from the exact statistics)
+    
+    if isDifference is True the sum of the absolute values is also kept
+    
+    count, min, and max describe the values added so far
+    """
+    
+    def __init__ (self, rankError, dtype, seed=0, isDifference=False) :
+        self.sketch        = QuantileSketch(rankError, dtype=dtype, seed=seed)
+        self.mean_type     = _mean_type(np.dtype(dtype))
+        self.is_difference = isDifference
+        self.moments       = _RunningMoments()
+        self.abs_sum       = 0.0
+    
+    @property
+    def count (self) :
+        return self.moments.count
+    
+    @property
+    def min (self) :
+        return self.moments.min
+    
+    @property
+    def max (self) :
+        return self.moments.max
+    
+    def add (self, keepMask, dataChunk) :
+        """
+        add the values in the chunk that are selected by the mask
+        """
+        
+        kept = dataChunk[keepMask]
+        self.sketch.update(kept)
+        self.moments.add(kept)
+        if self.is_difference :
+            self.abs_sum += np.sum(np.abs(kept), dtype=np.float64)
+    
+    def merge (self, other) :
+        """
+        add the values summarized by another _SketchedValues
+        """
+        
+        self.sketch.merge(other.sketch)
+        self.moments.merge(other.moments)
+        self.abs_sum += other.abs_sum
+    
+    def statistics (self) :
+        """
+        get the same dictionary of statistics as _ExactValues.statistics,
+        from the running moments, or None if there are no values
+        """
+        
+        count = self.moments.count
+        if count <= 0 :
+            return None
+        
+        toReturn = {
+                    'mean': self.mean_type(self.moments.mean),
+                    'std':  self.mean_type(self.moments.std()),
+                   }
+        if self.is_difference :
+            toReturn['mean_abs'] = self.mean_type(self.abs_sum / count)
+            toReturn['rms']      = np.sqrt((self.moments.m2 / count) + (self.moments.mean * self.moments.mean))
+        
+        return toReturn
+    
+    def median (self) :
+        return self.sketch.quantile(0.5)
+    
+    def median_of_absolute (self) :
+        return self.sketch.quantile(0.5, absolute=True)
+
+class _FlatComparison (object) :
+    """
+    flattened views of the data and masks in a DiffInfoObject, all
+    of the views can be sliced together to get a chunk of the comparison
+    """
+    
+    def __init__ (self, diffInfoObject=None) :
+        
+        if diffInfoObject is None :
+            return
+        
+        aDataObject    = diffInfoObject.a_data_object
+        bDataObject    = diffInfoObject.b_data_object
+        diffDataObject = diffInfoObject.diff_data_object
+        
+        self.a_data          = aDataObject.data.ravel()
+        self.a_missing       = aDataObject.masks.missing_mask.ravel()
+        self.a_non_finite    = aDataObject.masks.non_finite_mask.ravel()
+        self.a_valid         = aDataObject.masks.valid_mask.ravel()
+        self.a_ignore        = aDataObject.masks.ignore_mask.ravel()
+        self.b_data          = bDataObject.data.ravel()
+        self.b_missing       = bDataObject.masks.missing_mask.ravel()
+        self.b_non_finite    = bDataObject.masks.non_finite_mask.ravel()
+        self.b_valid         = bDataObject.masks.valid_mask.ravel()
+        self.b_ignore        = bDataObject.masks.ignore_mask.ravel()
+        self.diff_data       = diffDataObject.data.ravel()
+        self.valid_in_both   = diffDataObject.masks.valid_mask.ravel()
+        self.ignore_in_both  = diffDataObject.masks.ignore_mask.ravel()
+        self.outside_epsilon = diffDataObject.masks.outside_epsilon_mask.ravel()
+        self.mismatch        = diffDataObject.masks.mismatch_mask.ravel()
+    
+    def chunk (self, chunkSlice) :
+        """
+        get the part of the comparison in the given slice
+        """
+        
+        toReturn = _FlatComparison()
+        for name, value in self.__dict__.items() :
+            setattr(toReturn, name, value[chunkSlice] if value is not None else None)
+        
+        return toReturn
+
+def _values_valid_in_both (dataSetSummary, validMask, validInBothMask) :
+    """
+    get the values kept by a _DataSetSummary (whose values are _ExactValues) at the
+    points that are valid in both data sets, given the flattened masks of the points
+    valid in the data set and in both data sets
+    """
+    
+    keptValues = dataSetSummary.values.kept_values()
+    # the points valid in both are a subset of the points valid in this data set
+    if keptValues.size == np.count_nonzero(validInBothMask) :
+        return keptValues
+    
+    return keptValues[validInBothMask[validMask]]
+
+class _DataSetSummary (object) :
+    """
+    the basic counts and statistics for one data set, filled in by a _ComparisonSummary
+    
+    values is an _ExactValues or _SketchedValues object to hold the valid (finite,
+    non-missing, not ignored) values, the statistics other than the counts come from it
+    """
+    
+    def __init__ (self, dataType, values) :
+        self.data_type       = dataType
+        self.missing_count   = 0
+        self.nan_count       = 0
+        self.ignored_count   = 0
+        self.valid_count     = 0
+        self.values          = values
+    
+    def add (self, dataChunk, missingMask, nonFiniteMask, validMask, ignoreMask) :
+        """
+        add a flattened chunk of the data set and its masks
+        """
+        
+        self.missing_count += np.count_nonzero(missingMask)
+        self.nan_count     += np.count_nonzero(nonFiniteMask)
+        self.ignored_count += np.count_nonzero(ignoreMask)
+        self.valid_count   += np.count_nonzero(validMask)
+        
+        self.values.add(validMask, dataChunk)
+    
+    def merge (self, other) :
+        """
+        add another summary of a different part of the same data set
+        (only possible if the values are being sketched)
+        """
+        
+        self.missing_count += other.missing_count
+        self.nan_count     += other.nan_count
+        self.ignored_count += other.ignored_count
+        self.valid_count   += other.valid_count
+        self.values.merge(other.values)
+    
+    def min (self) :
+        return self.values.min if self.valid_count > 0 else np.nan
+    
+    def max (self) :
+        return self.values.max if self.valid_count > 0 else np.nan
+    
+    def mean (self) :
+        return self._statistic('mean')
+    
+    def std (self) :
+        return self._statistic('std')
+    
+    def _statistic (self, name) :
+        """
+        get one of the statistics of the valid values
+        """
+        
+        if self.valid_count <= 0 :
+            return np.nan
+        
+        return self.values.statistics()[name]
+    
+    def median (self) :
+        return self.values.median()
+
+class _ComparisonSummary (object) :
+    """
+    all the counts and statistics needed by a StatisticalAnalysis, gathered one
+    chunk at a time from the A, B, and difference data and their masks
+    
+    a_summary and b_summary hold the _DataSetSummary objects for the two data sets
+    
+    if the values were sketched rather than all kept, the medians are estimates and
+    the means, standard deviations, rms, and correlation come from running moments
+    accumulated in double precision, so their last digits can differ slightly from
+    those of a comparison that was fully in memory; if all the values were kept, the
+    correlation is found from them once they're all in hand (see fromDiffInfo)
+    """
+    
+    def __init__ (self, aType, bType, diffType, aValues, bValues, diffValues, diffFillValue=None) :
+        """
+        aValues, bValues, and diffValues should be _ExactValues or _SketchedValues
+        objects that can hold the valid values in the A, B, and difference data
+        """
+        
+        self.size      = 0
+        self.a_summary = _DataSetSummary(aType, aValues)
+        self.b_summary = _DataSetSummary(bType, bValues)
+        
+        self.diff_type                  = np.dtype(diffType)
+        self.diff_fill_value            = diffFillValue
+        self.correlation_type           = _mean_type(np.result_type(aType, bType))
+        self.common_missing_count       = 0
+        self.common_nan_count           = 0
+        self.common_finite_count        = 0
+        self.finite_in_only_one_count   = 0
+        self.diff_outside_epsilon_count = 0
+        self.mismatch_points_count      = 0
+        self.perfect_match_count        = 0
+        self.correlation_moments        = _RunningCoMoments()
+        self.exact_correlation          = None
+        self.diff_values                = diffValues
+    
+    @classmethod
+    def fromDiffInfo (in_class, diffInfoObject) :
+        """
+        gather the summary for a comparison that is fully in memory, in a single pass;
+        the valid values are copied once into buffers so the medians are exact, and the
+        other statistics and the correlation are found from those buffers
+        """
+        
+        flat = _FlatComparison(diffInfoObject)
+        
+        new_object = in_class(flat.a_data.dtype, flat.b_data.dtype, flat.diff_data.dtype,
+                              _ExactValues(np.count_nonzero(flat.a_valid),       flat.a_data.dtype),
+                              _ExactValues(np.count_nonzero(flat.b_valid),       flat.b_data.dtype),
+                              _ExactValues(np.count_nonzero(flat.valid_in_both), flat.diff_data.dtype, isDifference=True),
+                              diffFillValue=diffInfoObject.diff_data_object.fill_value)
+        # the correlation will come from the kept values, so it doesn't need running sums
+        new_object.correlation_moments = None
+        
+        for chunkStart in range(0, flat.a_data.size, STATISTICS_CHUNK_SIZE) :
+            new_object.add(flat.chunk(slice(chunkStart, chunkStart + STATISTICS_CHUNK_SIZE)))
+        
+        # with all the values in hand (and before the medians reorder them), the correlation
+        # can be found the same way as for unsummarized data
+        if new_object.common_finite_count > 0 :
+            new_object.exact_correlation = delta.compute_correlation_of_values(
+                                                _values_valid_in_both(new_object.a_summary, flat.a_valid, flat.valid_in_both),
+                                                _values_valid_in_both(new_object.b_summary, flat.b_valid, flat.valid_in_both))
+        
+        return new_object
+    
+    def add (self, flat) :
+        """
+        add a chunk of a comparison, given as a _FlatComparison
+        """
+        
+        self.size += flat.a_data.size
+        self.a_summary.add(flat.a_data, flat.a_missing, flat.a_non_finite, flat.a_valid, flat.a_ignore)
+        self.b_summary.add(flat.b_data, flat.b_missing, flat.b_non_finite, flat.b_valid, flat.b_ignore)
+        
+        self.common_missing_count       += np.count_nonzero(flat.a_missing    & flat.b_missing)
+        self.common_nan_count           += np.count_nonzero(flat.a_non_finite & flat.b_non_finite)
+        self.finite_in_only_one_count   += np.count_nonzero((flat.a_valid ^ flat.b_valid) & ~flat.ignore_in_both)
+        self.diff_outside_epsilon_count += np.count_nonzero(flat.outside_epsilon)
+        self.mismatch_points_count      += np.count_nonzero(flat.mismatch)
+        
+        # the points that are valid in both data sets
+        numValid = np.count_nonzero(flat.valid_in_both)
+        self.common_finite_count += numValid
+        if numValid <= 0 :
+            return
+        self.perfect_match_count += np.count_nonzero((flat.a_data == flat.b_data) & flat.valid_in_both)
+        self.diff_values.add(flat.valid_in_both, flat.diff_data)
+        if self.correlation_moments is not None :
+            self.correlation_moments.add(flat.a_data[flat.valid_in_both], flat.b_data[flat.valid_in_both])
+    
+    def merge (self, other) :
+        """
+        add another summary of a different part of the same comparison, such as one
+        gathered in another process (only possible if the values are being sketched)
+        """
+        
+        self.size += other.size
+        self.a_summary.merge(other.a_summary)
+        self.b_summary.merge(other.b_summary)
+        
+        self.common_missing_count       += other.common_missing_count
+        self.common_nan_count           += other.common_nan_count
+        self.common_finite_count        += other.common_finite_count
+        self.finite_in_only_one_count   += other.finite_in_only_one_count
+        self.diff_outside_epsilon_count += other.diff_outside_epsilon_count
+        self.mismatch_points_count      += other.mismatch_points_count
+        self.perfect_match_count        += other.perfect_match_count
+        self.correlation_moments.merge(other.correlation_moments)
+        self.diff_values.merge(other.diff_values)
+    
+    def correlation (self) :
+        """
+        get the Pearson correlation of the values that are valid in both data sets
+        """
+        
+        if self.exact_correlation is not None :
+            return self.exact_correlation
+        # the values were all kept, but none of them were valid in both data sets
+        if self.correlation_moments is None :
+            return self.correlation_type(np.nan)
+        
+        return self.correlation_type(self.correlation_moments.correlation())
+    
+    def diff_statistics (self) :
+        """
+        get the statistics on the difference data, in the same form as
+        NumericalComparisonStatistics.basic_analysis
+        """
+        
+        if self.common_finite_count <= 0 :
+            return NumericalComparisonStatistics.basic_analysis(np.zeros(0, dtype=self.diff_type), np.zeros(0, dtype=np.bool))
+        
+        diffStatistics = self.diff_values.statistics()
+        
+        return {
+                'rms_val':      diffStatistics['rms'],
+                'std_val':      diffStatistics['std'],
+                'mean_diff':    diffStatistics['mean_abs'],
+                # the median must be found before the median of the absolute values
+                'median_delta': self.diff_values.median(),
+                'median_diff':  self.diff_values.median_of_absolute(),
+                'max_diff':     max(np.abs(self.diff_values.max), np.abs(self.diff_values.min)),
+                'mean_delta':   diffStatistics['mean'],
+                'max_delta':    self.diff_values.max,
+                'min_delta':    self.diff_values.min,
+                }
+    
+    def placeholder_diff_info (self, shape, aFillValue, bFillValue, epsilonValue, epsilonPercent) :
+        """
+        get a DiffInfoObject with the given shape and settings whose data and masks take no
+        memory, for describing a comparison that was only ever seen in chunks
+        """
+        
+        aDataObject    = _placeholder_data_object(shape, self.a_summary.data_type, aFillValue)
+        bDataObject    = _placeholder_data_object(shape, self.b_summary.data_type, bFillValue)
+        diffDataObject = _placeholder_data_object(shape, self.diff_type,           self.diff_fill_value)
+        emptyMask      = diffDataObject.masks.ignore_mask
+        diffDataObject.masks = dataobj.DiffMaskSetObject(emptyMask, emptyMask, emptyMask, emptyMask)
+        
+        return dataobj.DiffInfoObject(aDataObject, bDataObject, epsilonValue=epsilonValue, epsilonPercent=epsilonPercent,
+                                      diffDataObject=diffDataObject)
+
+def _placeholder_data_object (shape, dtype, fillValue) :
+    """
+    make an analyzed DataObject with the given shape and type whose data and masks
+    are read only views of a single value, so they don't take any memory
+    """
+    
+    emptyData = np.broadcast_to(np.zeros((), dtype=dtype),   shape)
+    emptyMask = np.broadcast_to(np.zeros((), dtype=np.bool), shape)
+    
+    toReturn = dataobj.DataObject(emptyData, fillValue=fillValue)
+    toReturn.masks = dataobj.BasicMaskSetObject(emptyMask, emptyMask, emptyMask, emptyMask)
+    toReturn.have_analyzed = True
+    
+    return toReturn
+
+def summarize_data_chunks (data_chunks,
+                           a_missing_value=None,  b_missing_value=None,
+                           epsilon=0., epsilon_percent=None,
+                           quantile_error=DEFAULT_QUANTILE_ERROR, seed=0) :
+    """
+    gather the statistics for a comparison a chunk at a time, data_chunks should yield
+    matching (a_chunk, b_chunk) pairs of arrays; only one chunk is held in memory at a time
+    
+    the returned summary can be merged with summaries of the other chunks of the same
+    data sets (including ones made in other processes) and then used to build a
+    StatisticalAnalysis with StatisticalAnalysis.withChunkSummaries; if there were no
+    chunks None is returned
+    
+    medians are estimated with QuantileSketch objects with the given quantile_error,
+    summaries that will be merged should each be given a different seed
+    """
+    
+    summary = None
+    for a_chunk, b_chunk in data_chunks :
+        
+        aDataObject = dataobj.DataObject(a_chunk, fillValue=a_missing_value)
+        bDataObject = dataobj.DataObject(b_chunk, fillValue=b_missing_value)
+        diffInfo    = dataobj.DiffInfoObject(aDataObject, bDataObject,
+                                             epsilonValue=epsilon, epsilonPercent=epsilon_percent)
+        
+        # the diff's type is only known after the first comparison
+        if summary is None :
+            diffType = diffInfo.diff_data_object.data.dtype
+            summary  = _ComparisonSummary(a_chunk.dtype, b_chunk.dtype, diffType,
+                                          _SketchedValues(quantile_error, a_chunk.dtype, seed=seed),
+                                          _SketchedValues(quantile_error, b_chunk.dtype, seed=seed),
+                                          _SketchedValues(quantile_error, diffType,      seed=seed, isDifference=True),
+                                          diffFillValue=diffInfo.diff_data_object.fill_value)
+        
+        summary.add(_FlatComparison(diffInfo))
+    
+    return summary
+
 class StatisticalAnalysis (StatisticalData) :
     """
     This class represents a complete statistical analysis of two data sets.
@@ -853,21 +1678,39 @@ class StatisticalAnalysis (StatisticalData) :
         this is a blank constructor to support our new class method creation pattern
         """
         self.title = "Statistical Summary"
+        self._saved_dictionary = None
+    
+    @classmethod
+    def withDictionaryForm (in_class, dictionary) :
+        """
+        rebuild an analysis from its dictionary form (see dictionary_form), such as one saved by save_analysis
+        
+        the rebuilt analysis only provides its dictionary form and pass/fail checks, not the individual statistics objects
+        """
+        
+        new_object = in_class()
+        new_object._saved_dictionary = dictionary
+        
+        return new_object
     
     @classmethod
     def withSimpleData (in_class,
                         a_data,                b_data,
                         a_missing_value=None,  b_missing_value=None,
                         a_ignore_mask=None,    b_ignore_mask=None,
-                        epsilon=0., epsilon_percent=None) :
+                        epsilon=0., epsilon_percent=None,
+                        a_packing=None,        b_packing=None) :
         """
         do a full statistical analysis of the data, after building the data objects
+        
+        if the data was unpacked from packed integers, the io.PackedData it came from may be given
+        so that the comparison can be done on the packed integers where possible
         """
         
         new_object  = in_class()
         
-        aDataObject = dataobj.DataObject(a_data, fillValue=a_missing_value, ignoreMask=a_ignore_mask)
-        bDataObject = dataobj.DataObject(b_data, fillValue=b_missing_value, ignoreMask=b_ignore_mask)
+        aDataObject = dataobj.DataObject(a_data, fillValue=a_missing_value, ignoreMask=a_ignore_mask, packing=a_packing)
+        bDataObject = dataobj.DataObject(b_data, fillValue=b_missing_value, ignoreMask=b_ignore_mask, packing=b_packing)
         
         diffInfo    = dataobj.DiffInfoObject(aDataObject, bDataObject,
                                              epsilonValue=epsilon, epsilonPercent=epsilon_percent) 
@@ -893,16 +1736,92 @@ class StatisticalAnalysis (StatisticalData) :
         
         return new_object
     
-    def _create_stats(self, diffInfoObject) :
+    @classmethod
+    def withChunkedData (in_class,
+                         data_chunks,           shape,
+                         a_missing_value=None,  b_missing_value=None,
+                         epsilon=0., epsilon_percent=None,
+                         quantile_error=DEFAULT_QUANTILE_ERROR) :
+        """
+        do a full statistical analysis of two data sets of the given shape that are
+        too large to hold in memory, data_chunks should yield matching (a_chunk, b_chunk)
+        pairs of arrays that together cover the data sets
+        
+        only one chunk is analyzed at a time, so memory use is bounded by the chunk size;
+        the medians are estimated to within the quantile_error (see QuantileSketch)
+        """
+        
+        summary = summarize_data_chunks(data_chunks, a_missing_value, b_missing_value,
+                                        epsilon=epsilon, epsilon_percent=epsilon_percent,
+                                        quantile_error=quantile_error)
+        
+        return in_class.withChunkSummaries([summary], shape, a_missing_value, b_missing_value,
+                                           epsilon=epsilon, epsilon_percent=epsilon_percent)
+    
+    @classmethod
+    def withChunkSummaries (in_class,
+                            summaries,             shape,
+                            a_missing_value=None,  b_missing_value=None,
+                            epsilon=0., epsilon_percent=None) :
+        """
+        do a full statistical analysis of two data sets of the given shape, using the
+        summaries made by summarize_data_chunks for the different parts of the data sets
+        """
+        
+        # put all the parts together
+        summary = None
+        for partSummary in summaries :
+            if partSummary is None :
+                continue
+            if summary is None :
+                summary = partSummary
+            else :
+                summary.merge(partSummary)
+        
+        # if there was no data at all, there's nothing to hold in memory anyway
+        if summary is None :
+            return in_class.withSimpleData(np.zeros(shape), np.zeros(shape),
+                                           a_missing_value, b_missing_value,
+                                           epsilon=epsilon, epsilon_percent=epsilon_percent)
+        
+        new_object      = in_class()
+        placeholderInfo = summary.placeholder_diff_info(shape, a_missing_value, b_missing_value,
+                                                        epsilon, epsilon_percent)
+        new_object._create_stats(placeholderInfo, summary=summary)
+        
+        return new_object
+    
+    def _create_stats(self, diffInfoObject, summary=None) :
         """
         build and set all of the statistics sets
+        
+        if the summary of the comparison was already gathered, it may be passed in
         """
         
-        self.general      = GeneralStatistics            (diffInfoObject=diffInfoObject)
-        self.comparison   = NumericalComparisonStatistics(diffInfoObject)
-        self.notANumber   = NotANumberStatistics         (diffInfoObject=diffInfoObject)
-        self.missingValue = MissingValueStatistics       (diffInfoObject=diffInfoObject)
-        self.finiteData   = FiniteDataStatistics         (diffInfoObject=diffInfoObject)
+        # gather everything we need in one pass over the data, unless there isn't really an array to walk through
+        if (summary is None) and (len(diffInfoObject.a_data_object.data.shape) > 0) :
+            summary = _ComparisonSummary.fromDiffInfo(diffInfoObject)
+        
+        self.general      = GeneralStatistics            (diffInfoObject=diffInfoObject, summary=summary)
+        self.comparison   = NumericalComparisonStatistics(diffInfoObject,                summary=summary)
+        self.notANumber   = NotANumberStatistics         (diffInfoObject=diffInfoObject, summary=summary)
+        self.missingValue = MissingValueStatistics       (diffInfoObject=diffInfoObject, summary=summary)
+        self.finiteData   = FiniteDataStatistics         (diffInfoObject=diffInfoObject, summary=summary)
+    
+    def _pass_fail_values (self) :
+        """
+        get the epsilon failure fraction, the fraction of data finite in only one data set,
+        and the r-squared correlation, which are used to check whether the analysis passed
+        """
+        
+        if self._saved_dictionary is not None :
+            comparison = self._saved_dictionary['Numerical Comparison Statistics']
+            finiteData = self._saved_dictionary['Finite Data Statistics']
+            return (comparison['diff_outside_epsilon_fraction'], finiteData['finite_in_only_one_fraction'],
+                    comparison['r-squared correlation'])
+        
+        return (self.comparison.diff_outside_epsilon_fraction, self.finiteData.finite_in_only_one_fraction,
+                self.comparison.r_squared_correlation)
     
     def check_pass_or_fail(self,
                            epsilon_failure_tolerance   =np.nan, epsilon_failure_tolerance_default   =None,
@@ -918,6 +1837,7 @@ class StatisticalAnalysis (StatisticalData) :
         """
 
         passValues = [ ]
+        failed_fraction, non_finite_diff_fraction, r_squared_correlation = self._pass_fail_values()
         
         # test the epsilon value tolerance
         
@@ -925,7 +1845,6 @@ class StatisticalAnalysis (StatisticalData) :
         epsilonTolerance = epsilon_failure_tolerance if epsilon_failure_tolerance is not np.nan else epsilon_failure_tolerance_default
 
         # did we fail based on the epsilon?
-        failed_fraction = self.comparison.diff_outside_epsilon_fraction
         passed_epsilon  = None if (epsilonTolerance is None) else (failed_fraction <= epsilonTolerance)
         passValues.append(passed_epsilon)
 
@@ -935,7 +1854,6 @@ class StatisticalAnalysis (StatisticalData) :
         nonfiniteTolerance = non_finite_data_tolerance if non_finite_data_tolerance is not np.nan else non_finite_data_tolerance_default
         
         # did we fail based on nonfinite data
-        non_finite_diff_fraction = self.finiteData.finite_in_only_one_fraction
         passed_nonfinite         = None if (nonfiniteTolerance is None) else (non_finite_diff_fraction <= nonfiniteTolerance)
         passValues.append(passed_nonfinite)
 
@@ -954,7 +1872,7 @@ class StatisticalAnalysis (StatisticalData) :
         min_r_squared = min_acceptable_r_squared if (min_acceptable_r_squared is not np.nan) else min_acceptable_r_squared_default
 
         # did we fail based on the r-squared correlation coefficient?
-        r_squared_value  = None if (min_r_squared is None) else self.comparison.r_squared_correlation
+        r_squared_value  = None if (min_r_squared is None) else r_squared_correlation
         passed_r_squared = None if (min_r_squared is None) else (r_squared_value >= min_r_squared)
         passValues.append(passed_r_squared)
 
@@ -974,6 +1892,11 @@ class StatisticalAnalysis (StatisticalData) :
         """
         get a dictionary form of the statistics
         """
+        
+        # if we were rebuilt from a dictionary, there's nothing to build
+        if self._saved_dictionary is not None :
+            return dict(self._saved_dictionary)
+        
         toReturn = { }
         
         # build a dictionary of all our statistics
@@ -1007,6 +1930,87 @@ class StatisticalAnalysis (StatisticalData) :
         
         return toReturn
 
+# saved statistics are stored in a file with this name in each variable's output directory; the
+# version should be changed whenever the statistics or the layout of their dictionary form change
+STATISTICS_CACHE_FILE_NAME = 'statistics-cache.pickle'
+STATISTICS_CACHE_VERSION   = 'dictionary-form-1'
+
+# the md5 of the statistics code, see get_statistics_code_fingerprint
+_statistics_code_fingerprint = None
+
+def get_statistics_code_fingerprint ( ) :
+    """
+    get an md5 of the STATISTICS_CACHE_VERSION and the source of the modules that calculate
+    the statistics (this one, delta, and data), so that saved statistics are recalculated
+    whenever that code changes, even if no one remembered to change the version
+    """
+    
+    global _statistics_code_fingerprint
+    if _statistics_code_fingerprint is None :
+        digest = hashlib.md5(STATISTICS_CACHE_VERSION)
+        for module in (sys.modules[__name__], delta, dataobj) :
+            try :
+                digest.update(inspect.getsource(module))
+            except (IOError, TypeError), err :
+                LOG.debug("Unable to read the source of " + module.__name__ + " to identify saved statistics (" + str(err) + ")")
+        _statistics_code_fingerprint = digest.hexdigest()
+    
+    return _statistics_code_fingerprint
+
+def load_saved_analysis (cacheDirectory, cacheKey) :
+    """
+    load the StatisticalAnalysis saved in the cacheDirectory by save_analysis, if it was saved
+    with the same cacheKey (a string identifying the data and settings that were analyzed)
+    
+    returns the analysis (see StatisticalAnalysis.withDictionaryForm) and the extra information
+    saved with it, or (None, None) if there is no matching saved analysis
+    """
+    
+    cachePath = os.path.join(cacheDirectory, STATISTICS_CACHE_FILE_NAME)
+    if not os.path.exists(cachePath) :
+        return None, None
+    
+    try :
+        with open(cachePath, 'rb') as cacheFile :
+            saved = cPickle.load(cacheFile)
+    except (IOError, EOFError, ValueError, cPickle.UnpicklingError), err :
+        LOG.warn("Unable to load saved statistics from " + cachePath + " (" + str(err) + "), they will be recalculated.")
+        return None, None
+    
+    if (saved.get('version') != STATISTICS_CACHE_VERSION) or (saved.get('key') != cacheKey) :
+        LOG.debug("Saved statistics in " + cachePath + " are out of date and will be recalculated.")
+        return None, None
+    
+    LOG.info("Using saved statistics from: " + cachePath)
+    
+    return StatisticalAnalysis.withDictionaryForm(saved['statistics']), saved['info']
+
+def save_analysis (cacheDirectory, cacheKey, analysis, extraInfo=None) :
+    """
+    save the dictionary form of a StatisticalAnalysis and any extra information (which must be
+    picklable) in the cacheDirectory, so load_saved_analysis can reuse them for the same cacheKey
+    """
+    
+    cachePath = os.path.join(cacheDirectory, STATISTICS_CACHE_FILE_NAME)
+    toSave    = {
+                 'version':    STATISTICS_CACHE_VERSION,
+                 'key':        cacheKey,
+                 'statistics': analysis.dictionary_form(),
+                 'info':       extraInfo,
+                }
+    
+    # write to a temporary file first so that an interrupted run won't leave a partial file behind
+    tempPath = cachePath + '.' + str(os.getpid()) + '.tmp'
+    try :
+        with open(tempPath, 'wb') as cacheFile :
+            cPickle.dump(toSave, cacheFile, cPickle.HIGHEST_PROTOCOL)
+        os.rename(tempPath, cachePath)
+        LOG.debug("Saved statistics to: " + cachePath)
+    except (IOError, OSError), err :
+        LOG.warn("Unable to save statistics to " + cachePath + " (" + str(err) + ")")
+        if os.path.exists(tempPath) :
+            os.remove(tempPath)
+
 class StatisticalInspectionAnalysis (StatisticalData) :
     """
     This class represents a complete statistical analysis of a data set.
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Things shared by the glance tests: a test case that works in a temporary
+directory and helpers for writing small input files and running the glance
+command line tool.
+
+Every test module should import this module before it imports glance.
+"""
+
+# netCDF4 has to be loaded before h5py so that the HDF5 library it was built
+# against is the one that gets used
+try :
+    import netCDF4
+except ImportError :
+    netCDF4 = None
+
+import os, sys, time, shutil, subprocess, tempfile, threading, unittest
+
+import numpy as np
+
+# the directory that holds the glance package
+PYGLANCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PYGLANCE_DIR not in sys.path :
+    sys.path.insert(0, PYGLANCE_DIR)
+
+# the command line tool, run the same way the glance script runs it
+# (this module is imported first, so netCDF4 gets loaded before h5py there too)
+GLANCE_RUNNER = ('import sys; sys.argv[0] = "glance"; '
+                 'sys.path[0:0] = [' + repr(os.path.dirname(os.path.abspath(__file__))) + ', ' + repr(PYGLANCE_DIR) + ']; '
+                 'import glancetest; import glance.compare as compare; sys.exit(compare.main())')
+
+def write_netcdf4_file (path, seed, shape=(40, 50), fileFormat='NETCDF4') :
+    """
+    write a small NetCDF file with a contiguous float32 variable (which can be memory
+    mapped), a scaled int16 variable (which can't be) and lon/lat
+    """
+    
+    randomState = np.random.RandomState(seed)
+    dataset = netCDF4.Dataset(path, 'w', format=fileFormat)
+    try :
+        dataset.createDimension('y', shape[0])
+        dataset.createDimension('x', shape[1])
+        floatVariable = dataset.createVariable('temperature', np.float32, ('y', 'x'), contiguous=True)
+        floatVariable[:] = randomState.normal(280.0, 10.0, shape).astype(np.float32)
+        scaledVariable = dataset.createVariable('counts', np.int16, ('y', 'x'))
+        scaledVariable.scale_factor = np.float32(0.5)
+        scaledVariable[:] = randomState.randint(0, 1000, shape) * 0.5
+        lon, lat = np.meshgrid(np.linspace(-100.0, -90.0, shape[1]), np.linspace(30.0, 40.0, shape[0]))
+        dataset.createVariable('lon', np.float32, ('y', 'x'))[:] = lon
+        dataset.createVariable('lat', np.float32, ('y', 'x'))[:] = lat
+    finally :
+        dataset.close()
+
+class OneThreadAtATimeFile (object) :
+    """
+    a stand in for a glance file object that notes how many threads were ever in it at
+    once, with each of its variables holding its number of points (plus an offset)
+    """
+    
+    def __init__ (self, names, size=1000, offset=0) :
+        self.names      = list(names)
+        self.size       = size
+        self.offset     = offset
+        self.most_users = 0
+        self._users     = 0
+        self._lock      = threading.Lock()
+    
+    def _use (self, seconds=0.001) :
+        with self._lock :
+            self._users     += 1
+            self.most_users  = max(self.most_users, self._users)
+        time.sleep(seconds)
+        with self._lock :
+            self._users -= 1
+    
+    def __call__ (self) :
+        self._use()
+        return list(self.names)
+    
+    def __getitem__ (self, name) :
+        self._use()
+        return np.arange(self.size, dtype=np.float32) + self.offset
+    
+    def is_loadable_type (self, name) :
+        self._use()
+        return True
+    
+    def missing_value (self, name) :
+        self._use()
+        return None
+    
+    def get_variable_shape (self, name) :
+        self._use()
+        return (self.size,)
+    
+    def get_variable_region (self, name, region) :
+        return self[name][region]
+
+class TempDirTestCase (unittest.TestCase) :
+    """
+    a test case that gets a fresh temporary directory (self.tempDir) for each test
+    """
+    
+    def setUp (self) :
+        self.tempDir = tempfile.mkdtemp()
+    
+    def tearDown (self) :
+        shutil.rmtree(self.tempDir)
+    
+    def temp_path (self, fileName) :
+        return os.path.join(self.tempDir, fileName)
+    
+    def run_glance (self, *args, **kwargs) :
+        """
+        run the glance command line tool with the given arguments in the temporary directory
+        and return its standard output; the run must exit with kwargs['returnCode'] (default 0)
+        """
+        
+        process = subprocess.Popen([sys.executable, '-W', 'ignore', '-c', GLANCE_RUNNER] + list(args),
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=self.tempDir)
+        output, errors = process.communicate()
+        self.assertEqual(process.returncode, kwargs.get('returnCode', 0), errors)
+        
+        return output
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for matching longitude/latitude points between two data sets.
+"""
+
+import glancetest
+
+import glob, unittest
+
+import numpy as np
+
+import glance.collocation as collocation
+
+def _random_lon_lat (seed, size, lonRange=(-180.0, 180.0), latRange=(-90.0, 90.0)) :
+    randomState = np.random.RandomState(seed)
+    return (randomState.uniform(lonRange[0], lonRange[1], size),
+            randomState.uniform(latRange[0], latRange[1], size))
+
+def _brute_force_pairs ((aLongitude, aLatitude), (bLongitude, bLatitude), epsilon) :
+    """
+    compare every A point to every B point using the matching rules documented for
+    create_colocation_index_pairs_within_epsilon, returning the matched pairs as a set
+    """
+    
+    aLongitude, aLatitude = aLongitude.ravel(), aLatitude.ravel()
+    bLongitude, bLatitude = bLongitude.ravel(), bLatitude.ravel()
+    
+    latitudeDifference  = np.abs(bLatitude[np.newaxis, :] - aLatitude[:, np.newaxis])
+    longitudeDifference = np.abs(np.mod((bLongitude[np.newaxis, :] - aLongitude[:, np.newaxis]) + 180.0, 360.0) - 180.0)
+    aIsPolar = np.abs(aLatitude) >= (90.0 - epsilon)
+    bIsPolar = np.abs(bLatitude) >= (90.0 - epsilon)
+    samePolarCap = ( aIsPolar[:, np.newaxis] & bIsPolar[np.newaxis, :] &
+                     (np.sign(aLatitude)[:, np.newaxis] == np.sign(bLatitude)[np.newaxis, :]) )
+    isMatch = (latitudeDifference <= epsilon) & (samePolarCap | (longitudeDifference <= epsilon))
+    
+    aIndexes, bIndexes = np.nonzero(isMatch)
+    return set(zip(aIndexes.tolist(), bIndexes.tolist()))
+
+class ColocationTestCase (unittest.TestCase) :
+    
+    def assertMatchesBruteForce (self, aLonLat, bLonLat, epsilon) :
+        aMatches, bMatches = collocation.create_colocation_index_pairs_within_epsilon(aLonLat, bLonLat, epsilon)
+        
+        # the pairs should come back sorted by A index and then B index, with no repeats
+        pairs = zip(aMatches.tolist(), bMatches.tolist())
+        self.assertEqual(pairs, sorted(set(pairs)))
+        self.assertEqual(set(pairs), _brute_force_pairs(aLonLat, bLonLat, epsilon))
+        
+        return len(pairs)
+
+class IndexPairColocationTests (ColocationTestCase) :
+    
+    def test_matches_brute_force_at_several_epsilons (self) :
+        aLonLat = _random_lon_lat(1, 2000, (-20.0, 20.0), (-20.0, 20.0))
+        bLonLat = _random_lon_lat(2, 2000, (-20.0, 20.0), (-20.0, 20.0))
+        for epsilon in (0.0, 0.05, 0.3, 1.0, 4.0) :
+            self.assertMatchesBruteForce(aLonLat, bLonLat, epsilon)
+    
+    def test_identical_points_match_at_zero_epsilon (self) :
+        aLonLat = _random_lon_lat(3, 300)
+        self.assertEqual(self.assertMatchesBruteForce(aLonLat, aLonLat, 0.0), 300)
+    
+    def test_two_dimensional_data_uses_flat_indexes (self) :
+        aLongitude, aLatitude = _random_lon_lat(4, 600, (0.0, 10.0), (0.0, 10.0))
+        bLongitude, bLatitude = _random_lon_lat(5, 600, (0.0, 10.0), (0.0, 10.0))
+        self.assertMatchesBruteForce((aLongitude.reshape(20, 30), aLatitude.reshape(20, 30)),
+                                     (bLongitude.reshape(30, 20), bLatitude.reshape(30, 20)), 0.5)
+    
+    def test_non_finite_points_never_match (self) :
+        aLongitude, aLatitude = _random_lon_lat(6, 400, (0.0, 5.0), (0.0, 5.0))
+        bLongitude, bLatitude = aLongitude.copy(), aLatitude.copy()
+        aLongitude[::7] = np.nan
+        bLatitude[::5]  = np.inf
+        aMatches, bMatches = collocation.create_colocation_index_pairs_within_epsilon((aLongitude, aLatitude),
+                                                                                      (bLongitude, bLatitude), 0.2)
+        self.assertFalse(np.any(np.isnan(aLongitude[aMatches])))
+        self.assertFalse(np.any(np.isinf(bLatitude[bMatches])))
+        self.assertEqual(set(zip(aMatches.tolist(), bMatches.tolist())),
+                         _brute_force_pairs((aLongitude, aLatitude), (bLongitude, bLatitude), 0.2))
+    
+    def test_small_passes_give_the_same_pairs (self) :
+        aLonLat = _random_lon_lat(7, 1500, (-5.0, 5.0), (-5.0, 5.0))
+        bLonLat = _random_lon_lat(8, 1500, (-5.0, 5.0), (-5.0, 5.0))
+        originalPassSize = collocation.MAX_CANDIDATE_PAIRS_PER_PASS
+        collocation.MAX_CANDIDATE_PAIRS_PER_PASS = 50
+        try :
+            self.assertMatchesBruteForce(aLonLat, bLonLat, 0.5)
+        finally :
+            collocation.MAX_CANDIDATE_PAIRS_PER_PASS = originalPassSize
+
+class CellSizeAndWrappingTests (ColocationTestCase) :
+    
+    def test_points_across_the_antimeridian_match (self) :
+        aLonLat = _random_lon_lat(11, 1500, (170.0, 180.0), (-5.0, 5.0))
+        bLongitude, bLatitude = _random_lon_lat(12, 1500, (175.0, 185.0), (-5.0, 5.0))
+        bLongitude[bLongitude >= 180.0] -= 360.0
+        for epsilon in (0.1, 0.5, 2.0) :
+            self.assertMatchesBruteForce(aLonLat, (bLongitude, bLatitude), epsilon)
+        
+        # the matches right at the seam are the ones a search that didn't wrap would miss
+        aMatches, bMatches = collocation.create_colocation_index_pairs_within_epsilon(aLonLat, (bLongitude, bLatitude), 0.5)
+        self.assertTrue(np.any((aLonLat[0][aMatches] > 179.5) & (bLongitude[bMatches] < -179.5)))
+    
+    def test_longitudes_outside_minus_180_to_180_match (self) :
+        aLongitude, aLatitude = _random_lon_lat(13, 800, (-10.0, 10.0), (0.0, 10.0))
+        bLonLat = (aLongitude + 360.0 + 0.01, aLatitude)
+        self.assertTrue(self.assertMatchesBruteForce((aLongitude, aLatitude), bLonLat, 0.05) >= 800)
+    
+    def test_points_near_the_poles_match_on_latitude (self) :
+        for poleSign in (1.0, -1.0) :
+            aLongitude, aLatitude = _random_lon_lat(14, 1000, latRange=(85.0, 90.0))
+            bLongitude, bLatitude = _random_lon_lat(15, 1000, latRange=(85.0, 90.0))
+            for epsilon in (0.2, 1.0, 3.0) :
+                self.assertMatchesBruteForce((aLongitude, poleSign * aLatitude),
+                                             (bLongitude, poleSign * bLatitude), epsilon)
+    
+    def test_opposite_poles_never_match (self) :
+        aLonLat = _random_lon_lat(16, 200, latRange=( 89.0,  90.0))
+        bLonLat = _random_lon_lat(17, 200, latRange=(-90.0, -89.0))
+        self.assertEqual(self.assertMatchesBruteForce(aLonLat, bLonLat, 2.0), 0)
+    
+    def test_whole_globe_at_large_and_tiny_epsilons (self) :
+        aLonLat = _random_lon_lat(18, 1000)
+        bLonLat = _random_lon_lat(19, 1000)
+        # epsilons this large leave fewer than 3 longitude cells around the globe,
+        # and ones this small use the minimum cell size
+        for epsilon in (collocation.MINIMUM_CELL_SIZE / 10.0, 7.0, 150.0) :
+            self.assertMatchesBruteForce(aLonLat, bLonLat, epsilon)
+    
+    def test_larger_cells_give_the_same_pairs (self) :
+        aLonLat = _random_lon_lat(20, 1000, (-30.0, 30.0), (-30.0, 30.0))
+        bLonLat = _random_lon_lat(21, 1000, (-30.0, 30.0), (-30.0, 30.0))
+        expected = collocation.create_colocation_index_pairs_within_epsilon(aLonLat, bLonLat, 0.5)
+        actual   = collocation.create_colocation_index_pairs_within_epsilon(aLonLat, bLonLat, 0.5, cellSize=3.0)
+        np.testing.assert_array_equal(expected[0], actual[0])
+        np.testing.assert_array_equal(expected[1], actual[1])
+
+class ColocationCacheTests (glancetest.TempDirTestCase) :
+    
+    def setUp (self) :
+        glancetest.TempDirTestCase.setUp(self)
+        self.aLonLat = _random_lon_lat(1, 500, (-10.0, 10.0), (-10.0, 10.0))
+        self.bLonLat = _random_lon_lat(2, 500, (-10.0, 10.0), (-10.0, 10.0))
+        self.originalMatcher = collocation.create_colocation_index_pairs_within_epsilon
+    
+    def tearDown (self) :
+        collocation.create_colocation_index_pairs_within_epsilon = self.originalMatcher
+        glancetest.TempDirTestCase.tearDown(self)
+    
+    def _cache_files (self) :
+        return glob.glob(self.temp_path(collocation.COLOCATION_CACHE_FILE_PREFIX + '*.npz'))
+    
+    def _match (self, epsilon) :
+        return collocation.create_colocation_index_pairs_with_cache(self.aLonLat, self.bLonLat, epsilon, self.tempDir)
+    
+    def _forbid_matching (self) :
+        def _fail (*args, **kwargs) :
+            self.fail("the matching should have come from the cache")
+        collocation.create_colocation_index_pairs_within_epsilon = _fail
+    
+    def test_saved_matching_is_reused (self) :
+        aFirst, bFirst = self._match(0.5)
+        self.assertEqual(len(self._cache_files()), 1)
+        self._forbid_matching()
+        aSecond, bSecond = self._match(0.5)
+        np.testing.assert_array_equal(aFirst, aSecond)
+        np.testing.assert_array_equal(bFirst, bSecond)
+    
+    def test_different_epsilon_is_matched_again (self) :
+        self._match(0.5)
+        self._match(0.25)
+        self.assertEqual(len(self._cache_files()), 2)
+    
+    def test_changed_lon_lat_is_matched_again (self) :
+        self._match(0.5)
+        self.aLonLat[0][0] += 1.0
+        self._match(0.5)
+        self.assertEqual(len(self._cache_files()), 2)
+
+if __name__ == '__main__' :
+    unittest.main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for reusing saved statistics in reportGen reruns and for the batch command.
+"""
+
+import glancetest
+from   glancetest import netCDF4
+
+import os, cPickle, unittest
+
+import glance.compare as compare
+import glance.stats   as statistics
+from   glance.constants import *
+
+class StatisticsCacheKeyTests (unittest.TestCase) :
+    
+    def setUp (self) :
+        self.files       = {A_FILE_TITLE_KEY: {MD5SUM_KEY: 'a-fingerprint'}, B_FILE_TITLE_KEY: {MD5SUM_KEY: 'b-fingerprint'}}
+        self.varRunInfo  = {EPSILON_KEY: 0.0, FILL_VALUE_KEY: -999.0}
+        self.fingerprint = statistics._statistics_code_fingerprint
+    
+    def tearDown (self) :
+        statistics._statistics_code_fingerprint = self.fingerprint
+    
+    def _key (self, glanceVersion='glance, version 1') :
+        return compare._get_statistics_cache_key('temperature', 'temperature', self.varRunInfo, self.files,
+                                                 None, None, glanceVersion)
+    
+    def test_key_is_repeatable (self) :
+        self.assertEqual(self._key(), self._key())
+    
+    def test_key_changes_with_the_glance_version (self) :
+        self.assertNotEqual(self._key('glance, version 2'), self._key())
+    
+    def test_key_changes_with_the_statistics_code (self) :
+        original = self._key()
+        statistics._statistics_code_fingerprint = 'code that changed'
+        self.assertNotEqual(self._key(), original)
+    
+    def test_key_changes_with_the_files_and_settings (self) :
+        original = self._key()
+        self.files[B_FILE_TITLE_KEY][MD5SUM_KEY] = 'another fingerprint'
+        changedFile = self._key()
+        self.varRunInfo[EPSILON_KEY] = 0.5
+        self.assertEqual(len(set([original, changedFile, self._key()])), 3)
+    
+    def test_files_without_fingerprints_are_not_cached (self) :
+        self.files[A_FILE_TITLE_KEY][MD5SUM_KEY] = None
+        self.assertTrue(self._key() is None)
+
+@unittest.skipIf(netCDF4 is None, "netCDF4 is not installed")
+class StatisticsCacheTests (glancetest.TempDirTestCase) :
+    
+    def setUp (self) :
+        glancetest.TempDirTestCase.setUp(self)
+        self.aPath     = self.temp_path('a.nc')
+        self.bPath     = self.temp_path('b.nc')
+        self.cachePath = self.temp_path(os.path.join('out', 'temperature', statistics.STATISTICS_CACHE_FILE_NAME))
+        glancetest.write_netcdf4_file(self.aPath, 1)
+        glancetest.write_netcdf4_file(self.bPath, 2)
+    
+    def _report (self, *extraArgs) :
+        self.run_glance('reportGen', '--statscache', '--nolonlat', '-p', 'out', *(extraArgs + (self.aPath, self.bPath)))
+    
+    def _mark_saved_statistics (self) :
+        """
+        add a marker to the saved statistics, so we can tell whether the next run reused them
+        """
+        
+        with open(self.cachePath, 'rb') as cacheFile :
+            saved = cPickle.load(cacheFile)
+        saved['statistics']['marker'] = {'marked': True}
+        with open(self.cachePath, 'wb') as cacheFile :
+            cPickle.dump(saved, cacheFile)
+    
+    def _saved_statistics_were_reused (self) :
+        with open(self.cachePath, 'rb') as cacheFile :
+            return 'marker' in cPickle.load(cacheFile)['statistics']
+    
+    def test_unchanged_files_reuse_statistics (self) :
+        self._report()
+        self._mark_saved_statistics()
+        self._report()
+        self.assertTrue(self._saved_statistics_were_reused())
+    
+    def test_changed_file_is_analyzed_again (self) :
+        self._report()
+        self._mark_saved_statistics()
+        glancetest.write_netcdf4_file(self.bPath, 3)
+        self._report()
+        self.assertFalse(self._saved_statistics_were_reused())
+    
+    def test_modified_time_changes_the_fast_fingerprint (self) :
+        self._report('--fastfingerprint')
+        self._mark_saved_statistics()
+        stats = os.stat(self.bPath)
+        os.utime(self.bPath, (stats.st_atime, stats.st_mtime + 10))
+        self._report('--fastfingerprint')
+        self.assertFalse(self._saved_statistics_were_reused())
+    
+    def test_changed_size_changes_the_fast_fingerprint (self) :
+        self._report('--fastfingerprint')
+        self._mark_saved_statistics()
+        stats = os.stat(self.bPath)
+        # HDF5 ignores anything past the end of its data, so the file still reads the same
+        with open(self.bPath, 'ab') as bFile :
+            bFile.write('\0' * 1024)
+        os.utime(self.bPath, (stats.st_atime, stats.st_mtime))
+        self._report('--fastfingerprint')
+        self.assertFalse(self._saved_statistics_were_reused())
+
+class BatchManifestTests (glancetest.TempDirTestCase) :
+    
+    def _write_manifest (self, text) :
+        with open(self.temp_path('manifest.txt'), 'w') as manifestFile :
+            manifestFile.write(text)
+        return self.temp_path('manifest.txt')
+    
+    def test_comments_and_blank_lines_are_skipped (self) :
+        manifestPath = self._write_manifest("# a comment\n\n  /data/a1.nc   /data/b1.nc  /out/1\n/data/a2.nc /data/b2.nc /out/2\n")
+        self.assertEqual(compare.read_batch_manifest(manifestPath),
+                         [('/data/a1.nc', '/data/b1.nc', '/out/1'), ('/data/a2.nc', '/data/b2.nc', '/out/2')])
+    
+    def test_incomplete_line_is_an_error (self) :
+        manifestPath = self._write_manifest("/data/a1.nc /data/b1.nc /out/1\n/data/a2.nc /data/b2.nc\n")
+        self.assertRaises(ValueError, compare.read_batch_manifest, manifestPath)
+
+@unittest.skipIf(netCDF4 is None, "netCDF4 is not installed")
+class BatchCommandTests (glancetest.TempDirTestCase) :
+    
+    def setUp (self) :
+        glancetest.TempDirTestCase.setUp(self)
+        self.aPath = self.temp_path('a.nc')
+        self.bPath = self.temp_path('b.nc')
+        glancetest.write_netcdf4_file(self.aPath, 1)
+        glancetest.write_netcdf4_file(self.bPath, 2)
+        self.pairs = [(self.aPath, self.aPath,                       self.temp_path('same')),
+                      (self.aPath, self.bPath,                       self.temp_path('different')),
+                      (self.aPath, self.temp_path('missing.nc'),     self.temp_path('missing'))]
+        with open(self.temp_path('manifest.txt'), 'w') as manifestFile :
+            manifestFile.write("# pairs to compare\n")
+            for pair in self.pairs :
+                manifestFile.write(' '.join(pair) + '\n')
+    
+    def _check_batch_stats (self, *extraArgs) :
+        output = self.run_glance(*(('batch',) + extraArgs + ('stats', 'manifest.txt', 'temperature')), returnCode=1)
+        
+        summary = [line.split('\t') for line in output.splitlines()]
+        self.assertEqual([line[0]  for line in summary], ['PASS', 'FAIL', 'ERROR'])
+        self.assertEqual([tuple(line[2:]) for line in summary], self.pairs)
+        for (aPath, bPath, outputPath), summaryLine in zip(self.pairs[:2], summary) :
+            with open(os.path.join(outputPath, 'stats.txt')) as statsFile :
+                self.assertEqual(statsFile.read(), self.run_glance('stats', '-x', aPath, bPath, 'temperature',
+                                                                   returnCode=int(summaryLine[1])))
+    
+    def test_batch_stats_matches_stats_for_each_pair (self) :
+        self._check_batch_stats()
+    
+    def test_batch_stats_with_workers (self) :
+        self._check_batch_stats('--workers=2')
+
+if __name__ == '__main__' :
+    unittest.main()
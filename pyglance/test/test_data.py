@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for the process-wide pool of opened files.
+"""
+
+import glancetest
+from   glancetest import netCDF4
+
+import os, unittest
+
+import glance.data as dataobj
+
+@unittest.skipIf(netCDF4 is None, "netCDF4 is not installed")
+class FileInfoPoolTests (glancetest.TempDirTestCase) :
+    
+    def setUp (self) :
+        glancetest.TempDirTestCase.setUp(self)
+        self.paths = [self.temp_path(name) for name in ('a.nc', 'b.nc', 'c.nc')]
+        for seed, path in enumerate(self.paths) :
+            glancetest.write_netcdf4_file(path, seed)
+        self.pool = dataobj.FileInfoPool(maxSize=2)
+    
+    def tearDown (self) :
+        self.pool.close_all()
+        glancetest.TempDirTestCase.tearDown(self)
+    
+    def test_missing_file_has_no_file_object (self) :
+        # callers check file_object, since a FileInfo is always returned
+        fileInfo = self.pool.get(self.temp_path('missing.nc'))
+        self.assertTrue(fileInfo is not None)
+        self.assertTrue(fileInfo.file_object is None)
+    
+    def test_same_path_is_opened_once (self) :
+        first = self.pool.get(self.paths[0])
+        self.assertTrue(first.file_object is not None)
+        self.assertTrue(self.pool.get(os.path.relpath(self.paths[0])) is first)
+    
+    def test_fast_and_full_fingerprints_are_pooled_separately (self) :
+        full = self.pool.get(self.paths[0])
+        fast = self.pool.get(self.paths[0], fastFingerprint=True)
+        self.assertTrue(fast is not full)
+        self.assertNotEqual(fast.md5_sum, full.md5_sum)
+        self.assertTrue(self.pool.get(self.paths[0]) is full)
+        self.assertTrue(self.pool.get(self.paths[0], fastFingerprint=True) is fast)
+    
+    def test_modified_file_is_opened_again (self) :
+        first = self.pool.get(self.paths[0])
+        modifiedTime = os.stat(self.paths[0]).st_mtime
+        os.utime(self.paths[0], (modifiedTime + 10, modifiedTime + 10))
+        self.assertTrue(self.pool.get(self.paths[0]) is not first)
+    
+    def test_least_recently_used_file_is_dropped (self) :
+        first  = self.pool.get(self.paths[0])
+        second = self.pool.get(self.paths[1])
+        self.assertTrue(self.pool.get(self.paths[0]) is first) # now the most recently used
+        self.pool.get(self.paths[2])
+        self.assertTrue(self.pool.get(self.paths[0]) is first)
+        self.assertTrue(self.pool.get(self.paths[1]) is not second)
+
+if __name__ == '__main__' :
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for reading NetCDF4 files through the glance io wrappers, including
+reading them from forked worker processes, and for sharing file objects
+between threads.
+
+Run from the pyglance directory with:
+    python -m unittest discover -s test
+"""
+
+import glancetest
+from   glancetest import netCDF4
+
+import threading, unittest
+
+import numpy as np
+
+import glance.io as io
+
+class LockedFileTests (unittest.TestCase) :
+    
+    def test_threads_take_turns_in_the_file (self) :
+        fileObject = glancetest.OneThreadAtATimeFile(['temperature'])
+        # the threads use different wrappers, which still have to share the file's lock
+        def useFile () :
+            lockedFile = io.LockedFile(fileObject)
+            for _ in range(20) :
+                lockedFile.is_loadable_type('temperature')
+                lockedFile.missing_value('temperature')
+                lockedFile.variable('temperature').shape
+                np.array(lockedFile.variable('temperature')[10:20])
+                lockedFile['temperature']
+        threads = [threading.Thread(target=useFile) for _ in range(4)]
+        for thread in threads :
+            thread.start()
+        for thread in threads :
+            thread.join()
+        
+        self.assertEqual(fileObject.most_users, 1)
+    
+    def test_wrappers_share_the_file_lock (self) :
+        fileObject = glancetest.OneThreadAtATimeFile(['temperature'])
+        lockedFile = io.LockedFile(fileObject)
+        rewrapped  = io.LockedFile(lockedFile)
+        self.assertTrue(rewrapped.file_object is fileObject)
+        self.assertTrue(rewrapped.lock is lockedFile.lock)
+        self.assertTrue(io.LockedFile(fileObject).lock is lockedFile.lock)
+        self.assertTrue(io.LockedFile(glancetest.OneThreadAtATimeFile([ ])).lock is not lockedFile.lock)
+    
+    def test_wrapper_reads_like_the_file (self) :
+        fileObject = glancetest.OneThreadAtATimeFile(['temperature', 'counts'], size=30, offset=2)
+        lockedFile = io.LockedFile(fileObject)
+        self.assertEqual(lockedFile(), ['temperature', 'counts'])
+        self.assertEqual(lockedFile.size, 30)
+        handle = lockedFile.variable('counts')
+        self.assertTrue(handle.file_object is lockedFile)
+        self.assertEqual(handle.shape, (30,))
+        np.testing.assert_array_equal(np.array(handle), fileObject['counts'])
+        np.testing.assert_array_equal(handle[5:9], fileObject['counts'][5:9])
+
+class PackedDataTests (unittest.TestCase) :
+    
+    def test_unpacked_points_match_the_unpacked_data (self) :
+        raw       = np.random.RandomState(3).randint(-1000, 30000, (40, 30)).astype(np.int16)
+        raw[::7]  = -999
+        mask      = np.random.RandomState(4).rand(*raw.shape) < 0.2
+        for packing in (io.PackedData(raw, 0.0123, -3.5, -999, np.float32), io.PackedData(raw)) :
+            points = packing.unpack_points(mask)
+            self.assertEqual(points.dtype, packing.unpack().dtype)
+            np.testing.assert_array_equal(points, packing.unpack()[mask])
+
+@unittest.skipIf(netCDF4 is None, "netCDF4 is not installed")
+class NetCDF4ReadingTests (glancetest.TempDirTestCase) :
+    
+    def setUp (self) :
+        glancetest.TempDirTestCase.setUp(self)
+        self.aPath = self.temp_path('a.nc')
+        self.bPath = self.temp_path('b.nc')
+        glancetest.write_netcdf4_file(self.aPath, 1)
+        glancetest.write_netcdf4_file(self.bPath, 2)
+    
+    def test_memory_mapped_variable_matches_file (self) :
+        fileObject = io.nc(self.aPath)
+        try :
+            data = fileObject['temperature']
+            self.assertTrue(isinstance(data, np.memmap))
+            dataset = netCDF4.Dataset(self.aPath)
+            try :
+                np.testing.assert_array_equal(data, dataset.variables['temperature'][:])
+            finally :
+                dataset.close()
+        finally :
+            fileObject.close()
+    
+    def test_stats_with_workers_matches_serial (self) :
+        serialOutput = self.run_glance('stats', self.aPath, self.bPath)
+        self.assertEqual(self.run_glance('stats', '--workers=3', self.aPath, self.bPath), serialOutput)
+    
+    def test_chunked_stats_with_workers_matches_serial (self) :
+        serialOutput = self.run_glance('stats', '--chunked=1000', self.aPath, self.bPath)
+        self.assertEqual(self.run_glance('stats', '--chunked=1000', '--workers=3', self.aPath, self.bPath), serialOutput)
+
+if __name__ == '__main__' :
+    unittest.main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for loading variables a chunk at a time.
+"""
+
+import glancetest
+from   glancetest import netCDF4
+
+import os, unittest
+
+import numpy as np
+
+import glance.io   as io
+import glance.load as load
+
+class ChunkRegionTests (unittest.TestCase) :
+    
+    def assertRegionsCover (self, shape, chunkSize) :
+        """
+        check that the regions each hold no more than chunkSize points
+        and together cover every point exactly once, in order
+        """
+        
+        counts = np.zeros(shape, dtype=np.int32)
+        order  = np.arange(counts.size).reshape(shape)
+        seen   = [ ]
+        for region in load.get_chunk_regions(shape, chunkSize) :
+            self.assertTrue(counts[region].size <= max(chunkSize, 1), (shape, chunkSize, region))
+            counts[region] += 1
+            seen.extend(np.ravel(order[region]).tolist())
+        
+        self.assertTrue(np.all(counts == 1), (shape, chunkSize))
+        self.assertEqual(seen, list(range(counts.size)))
+    
+    def test_regions_cover_the_array (self) :
+        for shape in ((10,), (7, 9), (5, 4, 6), (3, 1, 8)) :
+            for chunkSize in (1, 3, 8, 17, 36, 1000) :
+                self.assertRegionsCover(shape, chunkSize)
+    
+    def test_scalar_is_one_region (self) :
+        self.assertEqual(list(load.get_chunk_regions((), 10)), [()])
+
+@unittest.skipIf(netCDF4 is None, "netCDF4 is not installed")
+class ChunkedLoadingTests (glancetest.TempDirTestCase) :
+    
+    def setUp (self) :
+        glancetest.TempDirTestCase.setUp(self)
+        self.aPath = self.temp_path('a.nc')
+        self.bPath = self.temp_path('b.nc')
+        glancetest.write_netcdf4_file(self.aPath, 1)
+        glancetest.write_netcdf4_file(self.bPath, 2)
+    
+    def test_chunks_match_the_whole_variable (self) :
+        fileObject = io.nc(self.aPath)
+        try :
+            for name in ('temperature', 'counts') :
+                whole   = load.load_variable_data(fileObject, name)
+                rebuilt = np.empty_like(whole)
+                for region, chunk in load.load_variable_chunks(fileObject, name, 130) :
+                    self.assertTrue(chunk.size <= 130)
+                    rebuilt[region] = chunk
+                np.testing.assert_array_equal(rebuilt, whole)
+        finally :
+            fileObject.close()
+    
+    def test_chunked_stats_match_stats (self) :
+        oneShotLines = self.run_glance('stats', self.aPath, self.bPath).splitlines()
+        chunkedLines = self.run_glance('stats', '--chunked=300', self.aPath, self.bPath).splitlines()
+        self.assertEqual(len(chunkedLines), len(oneShotLines))
+        for oneShotLine, chunkedLine in zip(oneShotLines, chunkedLines) :
+            name, _, oneShotValue = oneShotLine.partition(':')
+            self.assertEqual(chunkedLine.partition(':')[0], name)
+            # the medians are estimated and the means summed in a different precision
+            try :
+                np.testing.assert_allclose(float(chunkedLine.partition(':')[2]), float(oneShotValue), rtol=1e-3, err_msg=name)
+            except ValueError :
+                self.assertEqual(chunkedLine, oneShotLine)
+
+@unittest.skipIf(netCDF4 is None, "netCDF4 is not installed")
+class DecodedVariableCacheTests (glancetest.TempDirTestCase) :
+    
+    # each variable in the test files is 40 x 50 four or two byte values
+    TEMPERATURE_BYTES = 40 * 50 * 4
+    
+    def setUp (self) :
+        glancetest.TempDirTestCase.setUp(self)
+        self.path = self.temp_path('a.nc')
+        glancetest.write_netcdf4_file(self.path, 1)
+        self.cache = load.DecodedVariableCache(maxBytes=self.TEMPERATURE_BYTES + 100)
+    
+    def _get (self, name, allowWrite=False) :
+        fileObject = io.open(self.path)
+        # opening a NetCDF file for writing would clear it, so just say it was
+        fileObject.allow_write = allowWrite
+        try :
+            return np.array(self.cache.get(fileObject, name)), self.cache.get(fileObject, name)
+        finally :
+            fileObject.close()
+    
+    def test_variable_is_decoded_once (self) :
+        first, cached = self._get('temperature')
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertFalse(cached.flags.writeable)
+        
+        again, _ = self._get('temperature')
+        self.assertEqual((self.cache.hits, self.cache.misses), (3, 1))
+        np.testing.assert_array_equal(again, first)
+    
+    def test_changed_file_is_read_again (self) :
+        before, _ = self._get('temperature')
+        glancetest.write_netcdf4_file(self.path, 2)
+        # make sure the modification time changes even on coarse file systems
+        stats = os.stat(self.path)
+        os.utime(self.path, (stats.st_atime, stats.st_mtime + 10))
+        
+        after, _ = self._get('temperature')
+        self.assertEqual(self.cache.misses, 2)
+        self.assertFalse(np.array_equal(after, before))
+    
+    def test_least_recently_used_variable_is_evicted (self) :
+        self._get('temperature')
+        self._get('counts')
+        self.assertEqual(self.cache.evictions, 1)
+        self._get('counts')
+        self._get('temperature')
+        self.assertEqual((self.cache.misses, self.cache.evictions), (3, 2))
+    
+    def test_too_large_or_writable_variables_are_not_cached (self) :
+        self.cache.max_bytes = self.TEMPERATURE_BYTES - 1
+        self._get('temperature')
+        self.assertEqual((self.cache.hits, self.cache.misses, self.cache.evictions), (0, 2, 0))
+        
+        self.cache.clear()
+        self.cache.max_bytes = self.TEMPERATURE_BYTES + 100
+        self._get('temperature', allowWrite=True)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 0))
+
+class VariablePrefetcherTests (unittest.TestCase) :
+    
+    def test_files_are_used_by_one_thread_at_a_time (self) :
+        names      = ['variable' + str(number) for number in range(15)]
+        aFile      = glancetest.OneThreadAtATimeFile(names)
+        bFile      = glancetest.OneThreadAtATimeFile(names, offset=1)
+        aFile, bFile = io.LockedFile(aFile), io.LockedFile(bFile)
+        prefetcher = load.VariablePrefetcher([[(aFile, name, False), (bFile, name, False)] for name in names], 3)
+        try :
+            for index, name in enumerate(names) :
+                prefetcher.advance(index)
+                # what the stats command does with the files while the next variables are read
+                for lockedFile in (aFile, bFile) :
+                    lockedFile.is_loadable_type(name)
+                    lockedFile.missing_value(name)
+                    lockedFile.variable(name).shape
+                np.testing.assert_array_equal(prefetcher.get(aFile, name), np.arange(1000))
+                np.testing.assert_array_equal(prefetcher.get(bFile, name), np.arange(1000) + 1)
+        finally :
+            prefetcher.close()
+        
+        self.assertTrue(prefetcher.hits > 0)
+        self.assertEqual((aFile.most_users, bFile.most_users), (1, 1))
+
+if __name__ == '__main__' :
+    unittest.main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for rendering figures in worker processes.
+"""
+
+import glancetest
+
+import os, time, logging, threading, multiprocessing, unittest
+from StringIO import StringIO
+
+# compare picks the non-interactive matplotlib backend the glance tools use, so it has to come first
+import glance.compare as compare
+import glance.plot    as plot
+from   glance.constants import *
+
+def _make_figure (pidPath=None, sleepSeconds=0) :
+    """
+    get a function that makes a small figure, after noting the id of
+    the process that made it in pidPath and sleeping for a while
+    """
+    
+    def makeFigure () :
+        if pidPath is not None :
+            with open(pidPath, 'w') as pidFile :
+                pidFile.write(str(os.getpid()))
+        time.sleep(sleepSeconds)
+        figure = plot.plt.figure(figsize=(1, 1))
+        figure.add_subplot(111).plot([0, 1], [1, 0])
+        return figure
+    
+    return makeFigure
+
+class FigureRendererTests (glancetest.TempDirTestCase) :
+    
+    def setUp (self) :
+        glancetest.TempDirTestCase.setUp(self)
+        self.figuresPerWorker = plot.FIGURES_PER_WORKER
+        self.imageList        = [ ]
+    
+    def tearDown (self) :
+        plot.FIGURES_PER_WORKER = self.figuresPerWorker
+        glancetest.TempDirTestCase.tearDown(self)
+    
+    def _submit (self, renderer, name, figureFunction, **kwargs) :
+        self.imageList.append(name)
+        return renderer.submit(name, figureFunction, self.tempDir, name, imageList=self.imageList, **kwargs)
+    
+    def test_figures_are_rendered_in_this_process (self) :
+        renderer = plot.FigureRenderer(0)
+        goodJob  = self._submit(renderer, 'good.png', _make_figure())
+        badJob   = self._submit(renderer, 'bad.png',  lambda : None)
+        renderer.close()
+        
+        self.assertTrue(goodJob.is_done and (goodJob.error is None))
+        self.assertTrue(os.path.exists(self.temp_path('good.png')))
+        self.assertTrue(badJob.is_done and (badJob.error is not None))
+        self.assertEqual(self.imageList, ['good.png'])
+    
+    def test_timed_out_figure_is_failed_and_unlisted (self) :
+        renderer = plot.FigureRenderer(1, jobTimeout=1.0)
+        slowJob  = self._submit(renderer, 'slow.png', _make_figure(sleepSeconds=60))
+        nextJob  = self._submit(renderer, 'next.png', _make_figure())
+        started  = time.time()
+        renderer.close()
+        
+        self.assertTrue(time.time() - started < 30)
+        self.assertTrue(slowJob.is_done)
+        self.assertTrue('Timed out' in slowJob.error)
+        # the job queued behind the slow one is sent to a new worker
+        self.assertTrue(nextJob.is_done and (nextJob.error is None))
+        self.assertEqual(self.imageList, ['next.png'])
+        self.assertFalse(os.path.exists(self.temp_path('slow.png')))
+        self.assertTrue(os.path.exists(self.temp_path('next.png')))
+    
+    def test_workers_are_replaced_after_their_share_of_figures (self) :
+        plot.FIGURES_PER_WORKER = 2
+        renderer = plot.FigureRenderer(1)
+        jobs     = [self._submit(renderer, 'figure' + str(number) + '.png',
+                                 _make_figure(pidPath=self.temp_path('pid' + str(number))))
+                    for number in range(5)]
+        renderer.close()
+        
+        self.assertTrue(all([job.error is None for job in jobs]))
+        pids = [open(self.temp_path('pid' + str(number))).read() for number in range(5)]
+        self.assertEqual(len(set(pids)), 3)
+        self.assertTrue(str(os.getpid()) not in pids)
+        self.assertEqual(len(renderer._workers), 0)
+    
+    def test_jobs_queued_later_get_a_new_worker (self) :
+        renderer = plot.FigureRenderer(1)
+        self._submit(renderer, 'first.png', _make_figure(pidPath=self.temp_path('pid0')))
+        renderer.wait()
+        self._submit(renderer, 'second.png', _make_figure(pidPath=self.temp_path('pid1')))
+        renderer.close()
+        
+        self.assertNotEqual(open(self.temp_path('pid0')).read(), open(self.temp_path('pid1')).read())
+        self.assertEqual(self.imageList, ['first.png', 'second.png'])
+    
+    def test_workers_can_log_while_another_thread_holds_a_logging_lock (self) :
+        handler  = logging.StreamHandler(StringIO())
+        oldLevel = plot.LOG.level
+        plot.LOG.addHandler(handler)
+        plot.LOG.setLevel(logging.INFO)
+        renderer = plot.FigureRenderer(1, jobTimeout=10.0)
+        job      = self._submit(renderer, 'logged.png', _make_figure())
+        
+        # fork the worker while another thread holds the handler's lock, the worker logs before
+        # making its figure and would hang on its copy of the lock if it didn't make a new one
+        holding, release = threading.Event(), threading.Event()
+        def holdLock () :
+            with handler.lock :
+                holding.set()
+                release.wait()
+        holder = threading.Thread(target=holdLock)
+        holder.start()
+        holding.wait()
+        try :
+            renderer.poll()
+        finally :
+            release.set()
+            holder.join()
+        try :
+            renderer.close()
+        finally :
+            plot.LOG.removeHandler(handler)
+            plot.LOG.setLevel(oldLevel)
+        
+        self.assertTrue(job.is_done and (job.error is None), job.error)
+        self.assertTrue(os.path.exists(self.temp_path('logged.png')))
+    
+    def test_outstanding_data_is_counted_once_per_data_object (self) :
+        renderer   = plot.FigureRenderer(1)
+        sharedData = [0] * 10
+        jobs       = [self._submit(renderer, 'shared' + str(number) + '.png', _make_figure(),
+                                   dataObject=sharedData, dataBytes=100) for number in range(2)]
+        # the jobs hang on to data nothing else refers to, so its id can't be reused by the next job's data
+        jobs      += [self._submit(renderer, 'own' + str(number) + '.png', _make_figure(),
+                                   dataObject=[number] * 10, dataBytes=10) for number in range(3)]
+        self.assertEqual(renderer.outstanding_data_bytes(), 130)
+        renderer.close()
+        
+        self.assertEqual(renderer.outstanding_data_bytes(), 0)
+        self.assertTrue(all([job.data_object is None for job in jobs]))
+
+class FigureWorkerBudgetTests (unittest.TestCase) :
+    
+    def _number_of_workers (self, figureWorkers, sharedBy, doFork=True) :
+        runInfo = {DO_MAKE_FORKS_KEY: doFork, DO_CLEAR_MEM_THREADED_KEY: False, FIGURE_WORKERS_KEY: figureWorkers}
+        return compare._make_figure_renderer(runInfo, sharedBy=sharedBy).number_of_workers
+    
+    def test_figure_workers_are_split_between_report_workers (self) :
+        self.assertEqual(self._number_of_workers(8, 1), 8)
+        self.assertEqual(self._number_of_workers(8, 3), 2)
+        self.assertEqual(self._number_of_workers(2, 4), 1)
+        self.assertEqual(self._number_of_workers(None, 1), multiprocessing.cpu_count())
+        self.assertEqual(self._number_of_workers(None, 2 * multiprocessing.cpu_count()), 1)
+    
+    def test_figures_made_in_process_are_unchanged (self) :
+        self.assertEqual(self._number_of_workers(8, 3, doFork=False), 0)
+
+if __name__ == '__main__' :
+    unittest.main()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Tests for the statistics gathered when two data sets are compared.
+"""
+
+import glancetest
+
+import unittest
+
+import numpy as np
+
+import glance.data  as dataobj
+import glance.io    as io
+import glance.load  as load
+import glance.stats as statistics
+
+def _make_data (seed, shape=(60, 70), dtype=np.float32, fillValue=-999.0) :
+    """
+    make some data that has a few fill values and non-finite values in it
+    """
+    
+    randomState = np.random.RandomState(seed)
+    data = randomState.normal(5.0, 3.0, shape).astype(dtype)
+    data.flat[randomState.randint(0, data.size, data.size // 20)] = fillValue
+    data.flat[randomState.randint(0, data.size, data.size // 50)] = np.nan
+    
+    return data
+
+def _make_diff_info (aData, bData, fillValue=-999.0, epsilon=0.01) :
+    return dataobj.DiffInfoObject(dataobj.DataObject(aData, fillValue=fillValue),
+                                  dataobj.DataObject(bData, fillValue=fillValue),
+                                  epsilonValue=epsilon)
+
+def _assert_same_dictionaries (testCase, expected, actual) :
+    """
+    check that two dictionaries of statistics are exactly the same, counting nan as equal to nan
+    """
+    
+    testCase.assertEqual(sorted(expected.keys()), sorted(actual.keys()))
+    for key in expected :
+        if isinstance(expected[key], dict) :
+            _assert_same_dictionaries(testCase, expected[key], actual[key])
+        elif isinstance(expected[key], (float, np.floating)) and np.isnan(expected[key]) :
+            testCase.assertTrue(np.isnan(actual[key]), key)
+        else :
+            testCase.assertEqual(expected[key], actual[key], "%s: %r != %r" % (key, expected[key], actual[key]))
+
+def _rank_error (values, estimate, quantile) :
+    """
+    get how far (as a fraction of the number of values) the rank of an estimated
+    quantile is from the rank it should have had among the values
+    """
+    
+    sortedValues = np.sort(values)
+    targetRank   = quantile * sortedValues.size
+    lowRank      = np.searchsorted(sortedValues, estimate, side='left')
+    highRank     = np.searchsorted(sortedValues, estimate, side='right')
+    if lowRank <= targetRank <= highRank :
+        return 0.0
+    
+    return min(abs(lowRank - targetRank), abs(highRank - targetRank)) / float(sortedValues.size)
+
+def _flatten_sections (dictionaryForm) :
+    return dict((key, value) for section in dictionaryForm.values() for key, value in section.items())
+
+def _unsummarized_statistics (diffInfo) :
+    """
+    get the dictionary form the statistics classes give when they aren't given a summary
+    (the way all the statistics were calculated before they were gathered in a single pass)
+    """
+    
+    toReturn = { }
+    for statisticsClass in (statistics.GeneralStatistics,      statistics.NotANumberStatistics,
+                            statistics.MissingValueStatistics, statistics.FiniteDataStatistics) :
+        toReturn.update(statisticsClass(diffInfoObject=diffInfo).dictionary_form())
+    toReturn.update(statistics.NumericalComparisonStatistics(diffInfo).dictionary_form())
+    
+    return toReturn
+
+class QuantileSketchTests (unittest.TestCase) :
+    
+    QUANTILES = (0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0)
+    
+    def _values (self, seed, size) :
+        randomState = np.random.RandomState(seed)
+        # a skewed distribution with a lot of repeated values
+        return np.concatenate((randomState.lognormal(0.0, 1.5, size - size // 4),
+                               np.round(randomState.normal(0.0, 2.0, size // 4)))).astype(np.float32)
+    
+    def assertWithinRankError (self, sketch, values, rankError, absolute=False) :
+        compared = np.abs(values) if absolute else values
+        # the ranks of absolute values depend on both tails of the values
+        rankError = 2.0 * rankError if absolute else rankError
+        for quantile in self.QUANTILES :
+            error = _rank_error(compared, sketch.quantile(quantile, absolute=absolute), quantile)
+            self.assertTrue(error <= rankError, "quantile %s is off by %s" % (quantile, error))
+    
+    def test_sketch_is_exact_until_it_is_compacted (self) :
+        values = self._values(8, 150)
+        sketch = statistics.QuantileSketch(0.01, dtype=values.dtype)
+        sketch.update(values)
+        self.assertEqual(len(sketch.levels), 1)
+        for quantile in self.QUANTILES :
+            self.assertEqual(sketch.quantile(quantile), values.dtype.type(np.percentile(values, quantile * 100.0)))
+    
+    def test_quantiles_are_within_the_rank_error (self) :
+        values = self._values(9, 200000)
+        for rankError in (0.001, 0.005, 0.02) :
+            for chunkSize in (1000, 65536) :
+                sketch = statistics.QuantileSketch(rankError, dtype=values.dtype)
+                for start in range(0, values.size, chunkSize) :
+                    sketch.update(values[start:start + chunkSize])
+                self.assertEqual(sketch.count, values.size)
+                self.assertWithinRankError(sketch, values, rankError)
+                self.assertWithinRankError(sketch, values, rankError, absolute=True)
+    
+    def test_sketch_size_is_bounded (self) :
+        values = self._values(10, 200000)
+        for rankError in (0.001, 0.01) :
+            sketch = statistics.QuantileSketch(rankError, dtype=values.dtype)
+            for start in range(0, values.size, 5000) :
+                sketch.update(values[start:start + 5000])
+            self.assertTrue(sum(level.size for level in sketch.levels) <= 3.0 * sketch.k)
+    
+    def test_merged_sketches_are_within_the_rank_error (self) :
+        values   = self._values(11, 120000)
+        sketches = [ ]
+        for seed, part in enumerate(np.array_split(values, 5)) :
+            sketch = statistics.QuantileSketch(0.005, dtype=values.dtype, seed=seed)
+            sketch.update(part)
+            sketches.append(sketch)
+        merged = statistics.QuantileSketch(0.005, dtype=values.dtype)
+        for sketch in sketches :
+            merged.merge(sketch)
+        self.assertEqual(merged.count, values.size)
+        self.assertWithinRankError(merged, values, 0.005)
+        self.assertWithinRankError(merged, values, 0.005, absolute=True)
+    
+    def test_empty_sketch (self) :
+        sketch = statistics.QuantileSketch()
+        sketch.update(np.zeros(0))
+        sketch.merge(statistics.QuantileSketch())
+        self.assertEqual(sketch.count, 0)
+        self.assertTrue(np.isnan(sketch.quantile(0.5)))
+
+class RunningMomentsTests (unittest.TestCase) :
+    
+    def setUp (self) :
+        self.values = np.random.RandomState(1).normal(1000.0, 0.5, 10007).astype(np.float32)
+    
+    def assertMatchesValues (self, moments, values) :
+        self.assertEqual(moments.count, values.size)
+        self.assertAlmostEqual(moments.mean,  np.mean(values, dtype=np.float64), places=9)
+        self.assertAlmostEqual(moments.std(), np.std (values, dtype=np.float64), places=9)
+        self.assertEqual(moments.min, np.min(values))
+        self.assertEqual(moments.max, np.max(values))
+    
+    def test_chunked_moments_match_one_shot_moments (self) :
+        for chunkSize in (1, 7, 1000, self.values.size) :
+            moments = statistics._RunningMoments()
+            for start in range(0, self.values.size, chunkSize) :
+                moments.add(self.values[start:start + chunkSize])
+            self.assertMatchesValues(moments, self.values)
+    
+    def test_merged_moments_match_one_shot_moments (self) :
+        first, second = statistics._RunningMoments(), statistics._RunningMoments()
+        first.add(self.values[:3])
+        second.add(self.values[3:])
+        first.merge(second)
+        self.assertMatchesValues(first, self.values)
+    
+    def test_empty_moments_change_nothing (self) :
+        moments = statistics._RunningMoments()
+        moments.add(self.values[:0])
+        moments.merge(statistics._RunningMoments())
+        self.assertEqual(moments.count, 0)
+        
+        moments.add(self.values)
+        moments.merge(statistics._RunningMoments())
+        moments.add(self.values[:0])
+        self.assertMatchesValues(moments, self.values)
+
+class RunningCoMomentsTests (unittest.TestCase) :
+    
+    def setUp (self) :
+        randomState = np.random.RandomState(2)
+        self.x = randomState.normal(300.0, 2.0, 5003).astype(np.float32)
+        self.y = (self.x + randomState.normal(0.0, 0.5, self.x.size)).astype(np.float32)
+        self.expected = np.corrcoef(self.x.astype(np.float64), self.y.astype(np.float64))[0, 1]
+    
+    def test_chunked_correlation_matches_one_shot_correlation (self) :
+        for chunkSize in (2, 333, self.x.size) :
+            moments = statistics._RunningCoMoments()
+            for start in range(0, self.x.size, chunkSize) :
+                moments.add(self.x[start:start + chunkSize], self.y[start:start + chunkSize])
+            self.assertEqual(moments.count, self.x.size)
+            self.assertAlmostEqual(moments.correlation(), self.expected, places=10)
+    
+    def test_merged_correlation_matches_one_shot_correlation (self) :
+        parts = [statistics._RunningCoMoments() for _ in range(3)]
+        for part, indexes in zip(parts, np.array_split(np.arange(self.x.size), 3)) :
+            part.add(self.x[indexes], self.y[indexes])
+        parts[0].merge(parts[1])
+        parts[0].merge(parts[2])
+        self.assertAlmostEqual(parts[0].correlation(), self.expected, places=10)
+    
+    def test_too_few_or_constant_values_have_no_correlation (self) :
+        moments = statistics._RunningCoMoments()
+        moments.add(self.x[:1], self.y[:1])
+        self.assertTrue(np.isnan(moments.correlation()))
+        
+        moments = statistics._RunningCoMoments()
+        moments.add(np.ones(10, dtype=np.float32), self.y[:10])
+        self.assertTrue(np.isnan(moments.correlation()))
+
+class ComparisonSummaryTests (unittest.TestCase) :
+    
+    def setUp (self) :
+        self.aData = _make_data(3)
+        self.bData = self.aData + np.random.RandomState(4).normal(0.0, 0.01, self.aData.shape).astype(np.float32)
+        self.originalChunkSize = statistics.STATISTICS_CHUNK_SIZE
+        # use a lot of chunks, so the merging is exercised
+        statistics.STATISTICS_CHUNK_SIZE = 97
+    
+    def tearDown (self) :
+        statistics.STATISTICS_CHUNK_SIZE = self.originalChunkSize
+    
+    def test_summarized_statistics_match_unsummarized_statistics (self) :
+        # the same float32 values should give exactly the same output as before they were summarized
+        diffInfo = _make_diff_info(self.aData, self.bData)
+        expected = _unsummarized_statistics(diffInfo)
+        actual   = statistics.StatisticalAnalysis.withDataObjects(diffInfo.a_data_object, diffInfo.b_data_object,
+                                                                  epsilon=0.01).dictionary_form()
+        _assert_same_dictionaries(self, expected, _flatten_sections(actual))
+    
+    def test_summarized_statistics_of_integers_match_unsummarized_statistics (self) :
+        aData    = np.random.RandomState(5).randint(-200, 200, (30, 40)).astype(np.int16)
+        bData    = aData.copy()
+        bData[::3] += 1
+        diffInfo = _make_diff_info(aData, bData, fillValue=-200, epsilon=0)
+        expected = _unsummarized_statistics(diffInfo)
+        actual   = statistics.StatisticalAnalysis.withDataObjects(diffInfo.a_data_object, diffInfo.b_data_object).dictionary_form()
+        _assert_same_dictionaries(self, expected, _flatten_sections(actual))
+    
+    def test_no_valid_data (self) :
+        aData = np.zeros((10, 10), dtype=np.float32) - 999.0
+        analysis = statistics.StatisticalAnalysis.withSimpleData(aData, aData.copy(), -999.0, -999.0)
+        self.assertTrue(np.isnan(analysis.comparison.rms_val))
+        self.assertTrue(np.isnan(analysis.dictionary_form()['General Statistics']['mean_a']))
+
+class PackedComparisonTests (unittest.TestCase) :
+    
+    def setUp (self) :
+        randomState = np.random.RandomState(12)
+        aRaw        = randomState.randint(0, 30000, (70, 60)).astype(np.int16)
+        bRaw        = aRaw.copy()
+        changed     = randomState.rand(*aRaw.shape) < 0.3
+        bRaw[changed] += randomState.randint(-20, 20, np.count_nonzero(changed)).astype(np.int16)
+        aRaw[::13] = -999
+        bRaw[:, ::17] = -999
+        self.aPacking = io.PackedData(aRaw, 0.0123, -3.5, -999, np.float32)
+        self.bPacking = io.PackedData(bRaw, 0.0123, -3.5, -999, np.float32)
+    
+    def _diff_info (self, packed, epsilon, epsilonPercent) :
+        return dataobj.DiffInfoObject(dataobj.DataObject(self.aPacking.unpack(), fillValue=-999.0,
+                                                         packing=self.aPacking if packed else None),
+                                      dataobj.DataObject(self.bPacking.unpack(), fillValue=-999.0,
+                                                         packing=self.bPacking if packed else None),
+                                      epsilonValue=epsilon, epsilonPercent=epsilonPercent)
+    
+    def test_packed_comparison_matches_unpacked_comparison (self) :
+        for epsilon, epsilonPercent in ((0.0, None), (0.05, None), (None, 0.5)) :
+            packedInfo = self._diff_info(True, epsilon, epsilonPercent)
+            self.assertTrue(packedInfo.shared_packing is not None)
+            packed     = statistics.StatisticalAnalysis.withDataObjects(packedInfo.a_data_object, packedInfo.b_data_object,
+                                                                        epsilon=epsilon, epsilon_percent=epsilonPercent)
+            _assert_same_dictionaries(self, _unsummarized_statistics(self._diff_info(False, epsilon, epsilonPercent)),
+                                      _flatten_sections(packed.dictionary_form()))
+
+class ChunkedAnalysisTests (unittest.TestCase) :
+    
+    # statistics whose chunked values are estimated rather than exact
+    MEDIANS = ('median_a', 'median_b', 'median_delta', 'median_diff')
+    
+    def setUp (self) :
+        self.aData = _make_data(6, shape=(90, 80))
+        self.bData = self.aData + np.random.RandomState(7).normal(0.0, 0.05, self.aData.shape).astype(np.float32)
+        self.bData[::11] = -999.0
+        self.oneShot = _flatten_sections(statistics.StatisticalAnalysis.withSimpleData(self.aData, self.bData,
+                                                                                       -999.0, -999.0,
+                                                                                       epsilon=0.02).dictionary_form())
+    
+    def _chunks (self, chunkSize) :
+        for region in load.get_chunk_regions(self.aData.shape, chunkSize) :
+            yield self.aData[region], self.bData[region]
+    
+    def _chunked (self, chunkSize, quantileError=statistics.DEFAULT_QUANTILE_ERROR) :
+        return _flatten_sections(statistics.StatisticalAnalysis.withChunkedData(self._chunks(chunkSize), self.aData.shape,
+                                                                                -999.0, -999.0, epsilon=0.02,
+                                                                                quantile_error=quantileError).dictionary_form())
+    
+    def test_chunked_analysis_matches_one_shot_analysis (self) :
+        for chunkSize in (50, 1000, 5000) :
+            chunked = self._chunked(chunkSize)
+            self.assertEqual(sorted(chunked.keys()), sorted(self.oneShot.keys()))
+            for key, expected in self.oneShot.items() :
+                if key in self.MEDIANS :
+                    continue
+                if isinstance(expected, (float, np.floating)) :
+                    # the running moments are in double precision, the one shot sums in float32
+                    np.testing.assert_allclose(chunked[key], expected, rtol=1e-5, err_msg=key)
+                else :
+                    self.assertEqual(chunked[key], expected, key)
+    
+    def test_chunked_medians_are_within_the_rank_error (self) :
+        aValid = self.aData[np.isfinite(self.aData) & (self.aData != -999.0)]
+        for quantileError in (0.001, 0.01, 0.05) :
+            chunked = self._chunked(300, quantileError=quantileError)
+            self.assertTrue(_rank_error(aValid, chunked['median_a'], 0.5) <= quantileError)
+    
+    def test_chunked_summaries_of_parts_merge (self) :
+        regions   = list(load.get_chunk_regions(self.aData.shape, 1000))
+        summaries = [statistics.summarize_data_chunks([(self.aData[region], self.bData[region])], -999.0, -999.0,
+                                                      epsilon=0.02, seed=seed)
+                     for seed, region in enumerate(regions)]
+        merged    = _flatten_sections(statistics.StatisticalAnalysis.withChunkSummaries(summaries, self.aData.shape,
+                                                                                        -999.0, -999.0,
+                                                                                        epsilon=0.02).dictionary_form())
+        for key in ('a_finite_count', 'common_finite_count', 'perfect_match_count', 'max_diff', 'min_b') :
+            self.assertEqual(merged[key], self.oneShot[key], key)
+        np.testing.assert_allclose(merged['rms_val'], self.oneShot['rms_val'], rtol=1e-5)
+
+if __name__ == '__main__' :
+    unittest.main()